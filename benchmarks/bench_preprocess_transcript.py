@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# *_* coding: utf-8 *_*
+
+"""
+Benchmark for preprocessing transcripts for the dictionary check and the
+aligner:  compares the old replace-by-replace pipeline with the precompiled
+one in fave.align.transcriptprocessor on a synthetic transcript, and checks
+that both give the same words.
+
+Usage: python benchmarks/bench_preprocess_transcript.py [n_lines]
+"""
+
+import logging
+import random
+import re
+import sys
+import time
+
+from fave.align.transcriptprocessor import TranscriptProcessor
+
+WORDS = ["the", "and", "i", "you", "know", "like", "it's", "daughter-in-law",
+         "uh-huh", "'cause", "goin'", "high", "school", "tes-", "+test",
+         "wes2t", "sort-of", "o'clock", "’em", "“yeah”", "((maybe))",
+         "(( ))", "((i think))", "-", "--", "well,", "so.", "what?", "no!",
+         "100%", "a:", "b;"]
+
+
+def make_lines(n, seed=0):
+    """n lines of random transcript text"""
+    rng = random.Random(seed)
+    return ["\t".join(["A", "Speaker", "%.2f" % i, "%.2f" % (i + 1),
+                       " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 15)))]) + "\n"
+            for i in range(n)]
+
+
+class LegacyProcessor():
+    """the preprocessing TranscriptProcessor used to do"""
+    start_uncertain = re.compile(r'(\(\()')
+    end_uncertain = re.compile(r'(\)\))')
+    hyphenated = re.compile(r'(\w+)-(\w+)')
+    unclear = re.compile(r'\(\(\s*\)\)')
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.flag_uncertain = False
+
+    @staticmethod
+    def replace_smart_quotes(all_input):
+        cleaned_lines = []
+        for line in all_input:
+            line = line.replace(u'‘', "'")
+            line = line.replace(u'’', "'")
+            line = line.replace(u'‚', "'")
+            line = line.replace(u'‛', "'")
+            line = line.replace(u'“', '"')
+            line = line.replace(u'”', '"')
+            line = line.replace(u'„', '"')
+            line = line.replace(u'‟', '"')
+            cleaned_lines.append(line)
+        return cleaned_lines
+
+    def preprocess_transcription(self, line):
+        self.logger.debug("Preprocessing transcript line:")
+        self.logger.debug(f"    {line}")
+        line = line.replace('high school', 'highschool')
+        line = self.start_uncertain.sub(r' (( ', line)
+        line = self.end_uncertain.sub(r' )) ', line)
+        line = line.replace(' - ', ' -- ')
+        for p in [',', '.', ':', ';', '!', '?', '"', '%', '--']:
+            line = line.replace(p, ' ')
+        line = re.compile(r"(\s|^)'\b").sub(" ", line)
+        line = re.compile(r"\d\w(\w)?").sub(" ", line)
+        line = self.unclear.sub('((xxxx))', line)
+        line = line.replace(' - ', '')
+        line = self.hyphenated.sub(r'\1 \2', line)
+        line = self.hyphenated.sub(r'\1 \2', line)
+        words = line.split()
+        self.logger.debug(words)
+        newwords = []
+        for word in words:
+            self.logger.debug(word)
+            self.logger.debug(self.flag_uncertain)
+            if word == "((":
+                self.flag_uncertain = True
+                continue
+            if word == "))":
+                self.flag_uncertain = False
+                continue
+            newwords.append("((" + word + "))" if self.flag_uncertain else word)
+        return newwords
+
+
+def preprocess(processor, lines):
+    lines = processor.replace_smart_quotes(lines)
+    return [processor.preprocess_transcription(line.rstrip().split('\t')[4].strip().upper())
+            for line in lines]
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    lines = make_lines(n)
+    processor = TranscriptProcessor.__new__(TranscriptProcessor)
+    processor.flag_uncertain = False
+    processor.last_beg_uncertain = processor.last_end_uncertain = ''
+    print("%d lines, %d words" % (n, sum(len(line.split()) for line in lines) - 4 * n))
+    results = {}
+    for (label, run) in [("legacy", lambda: preprocess(LegacyProcessor(), lines)),
+                         ("precompiled", lambda: preprocess(processor, lines))]:
+        seconds = []
+        for _ in range(3):
+            start = time.perf_counter()
+            results[label] = run()
+            seconds.append(time.perf_counter() - start)
+        print("%-12s %8.3f s %12.0f lines/s" % (label, min(seconds), n / min(seconds)))
+    assert results["legacy"] == results["precompiled"], "word lists differ"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# *_* coding: utf-8 *_*
+
+"""
+Benchmark for writing large TextGrids: compares the long, short and
+binary formats of fave.praat, and the size of the files they produce.
+
+Usage: python benchmarks/bench_textgrid_write.py [n_intervals]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from fave import praat
+
+
+def make_textgrid(n):
+    """TextGrid with a phone tier of n intervals and a word tier of n/3"""
+    tg = praat.TextGrid()
+    phone = praat.IntervalTier("A - phone", 0, n * 0.05)
+    for i in range(n):
+        phone.append(praat.Interval(i * 0.05, (i + 1) * 0.05, "AE1"))
+    word = praat.IntervalTier("A - word", 0, n * 0.05)
+    for i in range(0, n, 3):
+        word.append(praat.Interval(i * 0.05, (i + 3) * 0.05, "TAT"))
+    tg.append(phone)
+    tg.append(word)
+    tg.change_times(0, n * 0.05)
+    return tg
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    function(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    tg = make_textgrid(n)
+    total = sum(len(tier) for tier in tg)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filename = os.path.join(tmpdir, "bench.TextGrid")
+        runs = [("long", lambda: tg.write(filename)),
+                ("short", lambda: tg.write(filename, format="short")),
+                ("short, 3 decimals", lambda: tg.write(filename, format="short", precision=3)),
+                ("binary", lambda: tg.write(filename, format="binary"))]
+        print("%d intervals" % total)
+        for (label, run) in runs:
+            seconds = min(timed(run) for _ in range(3))
+            print("%-20s %8.3f s %12.0f intervals/s %10d bytes"
+                  % (label, seconds, total / seconds, os.path.getsize(filename)))
+
+
+if __name__ == "__main__":
+    main()
@@ -35,6 +35,14 @@ import os
 import logging
 from shutil import which
 from fave.align.aligner import Aligner
+from fave.align import batchcheck
+
+def positive_int(value):
+    """argparse type of the number of jobs:  an integer of at least 1"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError("%s is not a positive number" % value)
+    return number
 
 def defineArguments(parser): # pylint: disable=W0621
     """Define command line arguments"""
@@ -49,6 +57,18 @@ def defineArguments(parser): # pylint: disable=W0621
         transcription file can be found in the CMU Pronouncing Dictionary.
         Writes the unknown words to the specified file as tab delimited text."""
     )
+    parser.add_argument(
+        '-b',
+        '--batch',
+        action='store_true',
+        help="""With --check, checks a whole corpus of transcripts at once:
+        the transcription argument is a directory of transcripts (.txt files)
+        or a manifest file listing one transcript per line.  The dictionary is
+        loaded once and the transcripts are checked in --jobs processes.  All
+        unknown words are written to the --check file; how often each of them
+        occurs in each transcript is written next to it, to a file ending in
+        "_files"."""
+    )
     parser.add_argument(
         '-i',
         '--import',
@@ -81,6 +101,108 @@ def defineArguments(parser): # pylint: disable=W0621
         executable files are located.  If not specified, the user's path will
         be searched for the location of the executable."""
     )
+    parser.add_argument(
+        '-f',
+        '--format',
+        choices=['long', 'short', 'binary'],
+        default='long',
+        help="""File format of the output TextGrid: Praat's long text format
+        (default), Praat's short text format, or Praat's binary format, which
+        stores times at full precision."""
+    )
+    parser.add_argument(
+        '-p',
+        '--precision',
+        type=int,
+        default=6,
+        help="""Number of decimals written for times in long and short text
+        TextGrids.  Default is 6."""
+    )
+    parser.add_argument(
+        '-j',
+        '--jobs',
+        type=positive_int,
+        default=1,
+        help="""Number of breath groups to align in parallel (or of
+        transcripts to check, with --batch).  Default is 1."""
+    )
+    parser.add_argument(
+        '--features',
+        choices=['hcopy', 'numpy'],
+        default='hcopy',
+        help="""How the PLP features of the breath groups are computed:  by
+        HTK's HCopy (default), or in memory by FAVE's own implementation of
+        the same front end, which saves writing a sound file and running
+        HCopy for every breath group."""
+    )
+    parser.add_argument(
+        '--model-rate',
+        type=int,
+        choices=[8000, 11025, 16000],
+        help="""Sampling rate of the acoustic models to align with.  By default,
+        the models with the highest sampling rate that does not exceed the
+        sampling rate of the sound file are used (the 8000 Hz models for
+        telephone recordings, for example), so that the sound file never
+        needs to be upsampled."""
+    )
+    parser.add_argument(
+        '--pruning',
+        choices=['none', 'balanced', 'fast'],
+        default='none',
+        help="""Beam pruning of the alignment search.  With "balanced" or "fast",
+        every breath group is first aligned with a narrow beam (HVite's -t),
+        which is much faster for long breath groups; breath groups that fail
+        are aligned again with wider beams, and finally without pruning.  The
+        number of breath groups aligned with each beam is written to the
+        .FAAVlog file.  Default is "none" (no pruning)."""
+    )
+    parser.add_argument(
+        '--split',
+        type=float,
+        metavar='SECONDS',
+        help="""Breath groups longer than this many seconds are split at the
+        pauses in their audio and aligned in pieces, which is much faster
+        for very long breath groups (and more of them can be aligned at all).
+        The text is split in proportion to the duration of the pieces, and
+        again if the alignments show that a word ended up on the wrong side
+        of a pause.  By default, breath groups are never split."""
+    )
+    parser.add_argument(
+        '--cache',
+        metavar='DIRECTORY',
+        help="""Directory to keep the alignments of the breath groups in.  When
+        the same sound file is aligned again (after changes to the transcript
+        or the dictionary, for example), the breath groups whose audio, text,
+        pronunciations, models and alignment options are unchanged are not
+        aligned again.  The features of the breath groups are kept there as
+        well, so breath groups whose audio is unchanged are not coded again.
+        By default, nothing is cached."""
+    )
+    parser.add_argument(
+        '--feature-cache-size',
+        type=float,
+        metavar='MB',
+        default=1024,
+        help="""Maximum size of the cached features (with --cache), in MB; the
+        least recently used features are removed first.  Default is 1024."""
+    )
+    parser.add_argument(
+        '--scratch',
+        metavar='DIRECTORY',
+        help="""Directory to keep the temporary files of each alignment in (a
+        new subdirectory for every run, removed afterwards).  A directory on a
+        RAM-backed file system such as /dev/shm saves writing the sound files
+        and features of the breath groups to disk.  By default, the system's
+        temporary directory is used."""
+    )
+    parser.add_argument(
+        '--backend',
+        choices=['hvite', 'numpy'],
+        default='hvite',
+        help="""How the breath groups are aligned with the acoustic models:  by
+        HTK's HVite (default), or by FAVE's own Viterbi aligner in NumPy.  With
+        --features numpy as well, the HTK Toolkit is not needed."""
+    )
     parser.add_argument(
         "soundfile",
         nargs='?')
@@ -106,8 +228,12 @@ def defineArguments(parser): # pylint: disable=W0621
 
 def parseArgs(**kwargs):
     """Check that the user input is sane and ideally handle errors before they happen"""
+    if kwargs.get('batch') and not kwargs['check']:
+        raise ValueError('--batch can only be used with --check')
     for key in kwargs:
         if key in ['dict', 'import', 'soundfile', 'transcription'] and kwargs[key]:
+            if kwargs.get('batch') and key == 'soundfile' and os.path.isdir(kwargs[key]):
+                continue
             if not os.path.isfile(kwargs[key]):
                 raise FileNotFoundError(kwargs[key])
     if kwargs['verbose'] == 1:
@@ -125,7 +251,8 @@ def parseArgs(**kwargs):
     if not kwargs['htktoolspath'] and not kwargs['check']:
         if 'HTKTOOLSPATH' in os.environ:
             kwargs['htktoolspath'] = '$HTKTOOLSPATH'
-        elif which('HVite') is None or which('HCopy') is None:
+        elif (which('HVite') is None and kwargs.get('backend') != 'numpy') or (
+                which('HCopy') is None and kwargs.get('features') != 'numpy'):
             raise ValueError('HTK Toolkit cannot be found. Unable to force align.')
     return kwargs
 
@@ -135,6 +262,16 @@ def main(**kwargs):
     logging.basicConfig(
         format='%(name)s - %(levelname)s:%(message)s',
         level=kwargs['verbose'])
+    if kwargs.get('batch'):
+        batchcheck.check_corpus(
+            kwargs['transcription'],
+            kwargs['check'],
+            dictionary_file=kwargs['dict'],
+            jobs=kwargs['jobs'],
+            import_file=kwargs['import'],
+            verbose=kwargs['verbose']
+        )
+        return
     aligner = Aligner(
         kwargs['soundfile'],
         kwargs['transcription'],
@@ -35,13 +35,52 @@ import os  # replace with subprocess one day
 import re
 import subprocess
 import shutil
+import tempfile
 import time
+import collections
+import concurrent.futures
 import logging
 import wave
+import json
 import pkg_resources
 from . import transcriptprocessor
+from . import plp
+from . import viterbi
+from . import cache
 from fave import cmudictionary
 from fave import praat
+from fave import audio
+
+# a breath group to be aligned
+Chunk = collections.namedtuple('Chunk', ['number', 'name', 'speaker', 'beg', 'dur', 'text'])
+
+
+class AlignmentResult():
+    """
+    The outcome of one call of Aligner.align:  the statistics written to the
+    .FAAVlog file, the breath groups that could not be aligned and the files
+    written.  Every call has its own, so that the same Aligner can
+    align in several threads at once.
+    """
+    # pylint: disable=too-many-instance-attributes,too-few-public-methods
+
+    def __init__(self, textgrid, logfile, model_dir):
+        self.textgrid = textgrid
+        self.logfile = logfile
+        # acoustic models used, and their sampling rate
+        self.model_dir = model_dir
+        self.sampling_rate = None
+        # file of the pronunciations used (in the scratch directory of the run)
+        self.dictionary = None
+        self.duration = 0.0
+        self.count_words = 0
+        self.count_uncertain = 0
+        self.count_unclear = 0
+        self.count_chunks = 0
+        # number of chunks aligned with each beam width
+        self.count_beams = collections.Counter()
+        # [number, beginning, end, speaker, text] of each failed chunk
+        self.failed_alignment = []
 
 
 class Aligner():
@@ -54,6 +93,20 @@ class Aligner():
     # Code debt: most of the instance attributes should be passed to functions
 
     STYLE = ["style", "Style", "STYLE"]
+    # pruning presets:  the beam widths (HVite's -t) a chunk is aligned with,
+    # in turn, until its alignment succeeds (None:  no pruning)
+    PRUNING = {
+        'none': (None,),
+        'balanced': (300.0, 1000.0, None),
+        'fast': (150.0, 300.0, 1000.0, None),
+    }
+    # pieces of split chunks should begin and end with at least this much
+    # silence (in seconds); if not, the text is split again, at most
+    # SPLIT_RETRIES times
+    SPLIT_SILENCE = 0.03
+    SPLIT_RETRIES = 2
+    # version of the cached alignments (see cache_key)
+    CACHE_VERSION = 1
     uncertain = re.compile(r"\(\(([\*\+]?['\w]+\-?)\)\)")
 
     def __init__(
@@ -63,24 +116,22 @@ class Aligner():
             tgfile,
             **kwargs
     ):
+        # (logging is configured by the program using the Aligner)
         self.logger = logging.getLogger(__name__)
-        logging.basicConfig(
-            format='%(name)s - %(levelname)s:%(message)s',
-            level=kwargs['verbose'])
 
-        self.count_unclear = 0
-        self.count_uncertain = 0
-        self.count_words = 0
-        self.audio = wavfile
+        # all paths are absolute, so that nothing depends on the working
+        # directory (which the program may change while aligning)
+        # (there is no sound file when only checking the transcript)
+        self.audio = os.path.abspath(wavfile) if wavfile else None
         default_dict = pkg_resources.resource_filename('fave.align', 'model/dict')
         if trsfile:
-            self.transcript = trsfile
+            self.transcript = os.path.abspath(trsfile)
         else:
-            self.transcript = os.path.splitext(wavfile)[0] + '.txt'
+            self.transcript = os.path.splitext(self.audio)[0] + '.txt'
         if tgfile:
-            self.textgrid = tgfile
+            self.textgrid = os.path.abspath(tgfile)
         else:
-            self.textgrid = os.path.splitext(trsfile)[0] + '.TextGrid'
+            self.textgrid = os.path.splitext(self.transcript)[0] + '.TextGrid'
 
         self.__config(**kwargs)
 
@@ -103,6 +154,42 @@ class Aligner():
     def __config(self,**kwargs):
         self.htktoolspath = kwargs['htktoolspath']
         self.check = kwargs['check']
+        # file format of the output TextGrid ("long" or "short" text, or "binary")
+        self.textgrid_format = kwargs.get('format') or 'long'
+        # number of decimals written for times in text TextGrids
+        self.textgrid_precision = 6 if kwargs.get('precision') is None else kwargs['precision']
+        # number of breath groups aligned in parallel
+        self.jobs = kwargs.get('jobs') or 1
+        # how the features of the chunks are computed:  by HTK's HCopy, or
+        # in memory by fave.align.plp
+        self.features = kwargs.get('features') or 'hcopy'
+        # how the chunks are aligned:  by HTK's HVite, or by fave.align.viterbi
+        self.backend = kwargs.get('backend') or 'hvite'
+        # sampling rate of the acoustic models to use (None:  the best match
+        # for the sound file, see select_model_rate)
+        self.model_rate = kwargs.get('model_rate') or None
+        # beam widths to try for each chunk (see PRUNING)
+        self.pruning = kwargs.get('pruning') or 'none'
+        self.beams = self.PRUNING[self.pruning]
+        # chunks longer than this (in seconds) are split at pauses and
+        # aligned in pieces (None:  never)
+        self.split_length = kwargs.get('split') or None
+        # alignments of breath groups from earlier runs (None:  not cached)
+        # and features of the audio of breath groups (at most
+        # feature_cache_size MB, least recently used ones are removed first)
+        if kwargs.get('cache'):
+            self.cache = cache.DiskCache(os.path.join(kwargs['cache'], 'alignments'))
+            self.feature_cache = cache.DiskCache(
+                os.path.join(kwargs['cache'], 'features'),
+                max_size=int((kwargs.get('feature_cache_size') or 1024) * 1024 * 1024))
+        else:
+            self.cache = None
+            self.feature_cache = None
+        # directory to make the scratch directory of each run in (e.g. on a
+        # tmpfs such as /dev/shm; None:  the system's temporary directory)
+        self.scratch = os.path.abspath(kwargs['scratch']) if kwargs.get('scratch') else None
+        # directory containing the acoustic models
+        self.model_dir = pkg_resources.resource_filename('fave.align', 'model')
 
     def read_transcript(self):
         """Interface with TranscriptProcessor to read a file"""
@@ -147,11 +234,13 @@ class Aligner():
 
         return duration
 
-    def align(self, tempdir='', FADIR=''):
-        """Main alignment function
+    def align(self, tempdir='', FADIR='', textgrid=None, logfile=None):
+        """Main alignment function; returns its AlignmentResult.  The Aligner
+        itself is not changed, so it can align in several threads at once
+        (writing the TextGrid and .FAAVlog to other files than the Aligner's,
+        if given).
         """
         self.logger.info('Starting alignment')
-        failed_alignment = []
         trans_lines = self.transcript.trans_lines
         all_input = self.transcript.lines
         wavfile = self.audio
@@ -163,15 +252,13 @@ class Aligner():
         if len(trans_lines) != len(all_input):
             raise ValueError('Remove empty lines from transcript')
 
-        if FADIR:
-            tmpdir = os.path.join(FADIR, 'tmp')
-        else:
-            tmpdir = os.path.join('.', 'tmp')
-        if not os.path.isdir(tmpdir):
-            self.logger.info(
-                f'No temporary directory, creating one at {tmpdir}')
-            os.mkdir(tmpdir)
-        # start alignment of breathgroups
+        result = AlignmentResult(
+            os.path.abspath(textgrid) if textgrid else self.textgrid,
+            os.path.abspath(logfile) if logfile else os.path.splitext(wavfile)[0] + ".FAAVlog",
+            os.path.join(os.path.abspath(FADIR), 'align', 'model') if FADIR else self.model_dir)
+        result.duration = duration
+        # collect the breath groups to align
+        chunks = []
         for (text, line) in zip(trans_lines, all_input):
             entries = line.strip().split('\t')
             # start counting chunks (as part of the output file names) at 1
@@ -202,70 +289,350 @@ class Aligner():
             except ValueError:
                 continue
 
-            # call SoX to cut the corresponding chunk out of the sound file
-            chunkname_sound = "_".join([os.path.splitext(os.path.basename(wavfile))[
-                0], speaker.replace(" ", "_"), "chunk", str(count_chunks)]) + ".wav"
-            self.__cut_chunk(
-                os.path.join(
-                    tempdir,
-                    chunkname_sound),
-                beg,
-                dur,
-                SOXPATH)
-            # generate name for output TextGrid
-            self.logger.debug("Creating chunk textgrid")
-            chunkname_textgrid = os.path.splitext(
-                chunkname_sound)[0] + ".TextGrid"
-
-            # Should add exception handling here
-            # align chunk
-            self.__align(
-                os.path.join(
-                    tempdir,
-                    chunkname_sound),
-                [text],
-                os.path.join(
-                    tempdir,
-                    chunkname_textgrid),
-                FADIR,
-                SOXPATH,
-                self.htktoolspath)
-            # read TextGrid output of forced alignment
-            new_textgrid = praat.TextGrid()
-            new_textgrid.read(os.path.join(tempdir, chunkname_textgrid))
-            # re-insert uncertain and unclear transcriptions
-            new_textgrid = self.__reinsert_uncertain(new_textgrid, text)
-            # change time offset of chunk
-            new_textgrid.change_offset(beg)
-            self.logger.debug("Offset changed by {beg} seconds.")
-
-            # add TextGrid for new chunk to main TextGrid
-            main_textgrid = self.merge_textgrids(
-                main_textgrid, new_textgrid, speaker, chunkname_textgrid)
-
-            # remove sound "chunk" and TextGrid from tempdir
-            os.remove(os.path.join(tempdir, chunkname_sound))
-            os.remove(os.path.join(tempdir, chunkname_textgrid))
-        counts = [
-            self.count_words,
-            self.count_uncertain,
-            self.count_unclear,
-            count_chunks
-        ]
+            chunkname = "_".join([os.path.splitext(os.path.basename(wavfile))[
+                0], speaker.replace(" ", "_"), "chunk", str(count_chunks)])
+            chunks.append(Chunk(count_chunks, chunkname, speaker, beg, dur, text))
+
+        # every run gets its own scratch directory (and every batch its own
+        # subdirectory), so that batches and concurrent runs cannot collide
+        scratch = tempfile.mkdtemp(
+            prefix='fave_align_', dir=os.path.abspath(tempdir) if tempdir else self.scratch)
+        self.logger.debug(f"Scratch directory is {scratch}")
+        try:
+            # convert the whole recording to the sampling rate of the models
+            # once and keep it in memory; chunks are sliced out of it
+            (samples, SR) = self.__prep_wav(wavfile, scratch, result.model_dir, SOXPATH)
+            # the pronunciations the aligner can need for this transcription
+            # (in the scratch directory, so that runs cannot overwrite them)
+            result.dictionary = os.path.join(scratch, 'dict')
+            self.cmu_dict.write_dict(result.dictionary, words=self.transcript.dictionary_words)
+        except BaseException:
+            shutil.rmtree(scratch, ignore_errors=True)
+            raise
+        result.sampling_rate = SR
+        self.logger.info(f"Using the {SR} Hz acoustic models")
+        # each job aligns a contiguous batch of chunks with a single
+        # HCopy/HVite run, so the models are loaded once per batch
+        size = max(1, -(-len(chunks) // self.jobs))
+        batches = [chunks[i:i + size] for i in range(0, len(chunks), size)]
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.jobs) as pool:
+                # results come back in transcript order
+                results = pool.map(
+                    lambda batch: self.__align_batch(scratch, batch, samples, SR, result),
+                    batches)
+                for (batch, batch_results) in zip(batches, results):
+                    for (chunk, (new_textgrid, counts, beam)) in zip(batch, batch_results):
+                        result.count_words += counts[0]
+                        result.count_uncertain += counts[1]
+                        result.count_unclear += counts[2]
+                        if new_textgrid is None:
+                            result.failed_alignment.append([
+                                str(chunk.number), str(chunk.beg),
+                                str(round(chunk.beg + chunk.dur, 3)),
+                                chunk.speaker, ' '.join(chunk.text)])
+                            continue
+                        result.count_beams[beam] += 1
+                        # add TextGrid for new chunk to main TextGrid, shifted
+                        # to the beginning of the chunk
+                        main_textgrid = self.merge_textgrids(
+                            main_textgrid, new_textgrid, chunk.speaker,
+                            chunk.name + ".TextGrid", chunk.beg)
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+        result.count_chunks = count_chunks
         self.__cleanup(
             style_tier,
             main_textgrid,
-            failed_alignment,
-            duration,
-            counts)
+            result)
+        return result
+
+    def __align_batch(self, scratch, batch, samples, SR, result):
+        """cuts a batch of breath groups out of the (converted) recording and
+        aligns them; returns the aligned TextGrid, word counts and beam width
+        it was aligned with for each chunk, with TextGrid None if its
+        alignment failed"""
+        # chunks aligned before (with the same audio, text, pronunciations,
+        # models and options) are not aligned again
+        found = {}
+        if self.cache:
+            keys = [self.cache_key(samples, SR, chunk, result.model_dir) for chunk in batch]
+            for (k, key) in enumerate(keys):
+                value = self.cache.get(key)
+                if value is not None:
+                    found[k] = json.loads(value.decode('utf-8'))
+            if found:
+                self.logger.info(f"Reusing the cached alignments of {len(found)} chunks")
+        todo = [k for k in range(len(batch)) if k not in found]
+        if todo:
+            workdir = os.path.join(scratch, 'batch' + str(batch[0].number))
+            os.mkdir(workdir)
+            aligned = self.__align_chunks(
+                [batch[k] for k in todo], workdir, samples, SR, result)
+            # remove sound "chunks" and HTK files
+            shutil.rmtree(workdir)
+            for (k, (lines, chunk_counts, beam)) in zip(todo, aligned):
+                found[k] = (lines, chunk_counts, beam)
+                if self.cache and lines:
+                    self.cache.put(keys[k], json.dumps(found[k]).encode('utf-8'))
+
+        results = []
+        for (k, chunk) in enumerate(batch):
+            (lines, chunk_counts, beam) = found[k]
+            if not lines:
+                self.logger.warning(f"Could not align chunk {chunk.name}")
+                results.append((None, tuple(chunk_counts), None))
+                continue
+            self.logger.debug(f"Aligned chunk {chunk.name} with beam {beam}")
+            # convert output of forced alignment to a TextGrid
+            new_textgrid = self.aligned_to_TextGrid(lines, SR)
+            # re-insert uncertain and unclear transcriptions
+            new_textgrid = self.reinsert_uncertain(
+                new_textgrid, chunk.text, self.cmu_dict.cmu_dict)
+            results.append((new_textgrid, tuple(chunk_counts), beam))
+        return results
+
+    def cache_key(self, samples, SR, chunk, model_dir=None):
+        """the key of the cached alignment of a chunk:  the samples of the
+        chunk, its text, the pronunciations of its words, the acoustic models
+        (in model_dir, by default the Aligner's) and the options of the
+        alignment"""
+        model_dir = model_dir or self.model_dir
+        pronunciations = {}
+        for word in chunk.text + ['sp']:
+            # (as in the master label file)
+            word = "{NS}" if word == "((xxxx))" else self.uncertain.sub(r'\1', word).lstrip('*')
+            pronunciations[word] = self.cmu_dict.cmu_dict.get(word)
+        model = [cache.file_digest(os.path.join(model_dir, name))
+                 for name in (os.path.join(str(SR), 'config'), os.path.join(str(SR), 'macros'),
+                              os.path.join(str(SR), 'hmmdefs'), 'monophones')]
+        options = [self.CACHE_VERSION, self.backend, self.features, self.beams,
+                   self.split_length, '-a -m -p 0.0 -s 5.0']
+        return cache.key(
+            self.__chunk_samples(samples, SR, chunk.beg, chunk.dur).tobytes(), SR,
+            ' '.join(chunk.text), pronunciations, model, options)
+
+    def __align_chunks(self, batch, workdir, samples, SR, result):
+        """aligns a batch of breath groups; returns the aligned label lines
+        (None if the alignment failed), word counts and beam width of each"""
+        # the pieces (beginning, duration, words) each chunk is aligned in:
+        # over-long chunks are split at pauses
+        plans = [self.__split_chunk(samples, SR, chunk) for chunk in batch]
+        # align all chunks of the batch at once
+        pieces = self.__align_pieces(
+            [piece for plan in plans for piece in plan], workdir, samples, SR, result)
+        aligned = []
+        for plan in plans:
+            aligned.append(pieces[:len(plan)])
+            pieces = pieces[len(plan):]
+
+        # split the text of split chunks again where it does not fit the
+        # pauses the audio was split at
+        for _ in range(self.SPLIT_RETRIES):
+            redo = []
+            for (k, plan) in enumerate(plans):
+                if len(plan) > 1 and all(lines for (lines, _, _) in aligned[k]):
+                    new_plan = self.resplit_text(plan, [lines for (lines, _, _) in aligned[k]])
+                    if new_plan:
+                        plans[k] = new_plan
+                        redo.append(k)
+            if not redo:
+                break
+            self.logger.debug(f"Splitting the text of {len(redo)} chunks again")
+            pieces = self.__align_pieces(
+                [piece for k in redo for piece in plans[k]], workdir, samples, SR, result)
+            for k in redo:
+                aligned[k] = pieces[:len(plans[k])]
+                pieces = pieces[len(plans[k]):]
+        # split chunks with pieces that cannot be aligned are aligned whole
+        redo = [k for (k, plan) in enumerate(plans)
+                if len(plan) > 1 and not all(lines for (lines, _, _) in aligned[k])]
+        if redo:
+            pieces = self.__align_pieces(
+                [(batch[k].beg, batch[k].dur, batch[k].text) for k in redo],
+                workdir, samples, SR, result)
+            for (k, piece) in zip(redo, pieces):
+                plans[k] = [(batch[k].beg, batch[k].dur, batch[k].text)]
+                aligned[k] = [piece]
+
+        results = []
+        for (plan, chunk_pieces) in zip(plans, aligned):
+            lines = self.join_pieces(plan, [lines for (lines, _, _) in chunk_pieces], SR)
+            chunk_counts = tuple(sum(c) for c in zip(*[c for (_, c, _) in chunk_pieces]))
+            beams = [beam for (_, _, beam) in chunk_pieces]
+            # (the widest beam any piece needed)
+            beam = None if None in beams else max(beams)
+            results.append((lines, chunk_counts, beam))
+        return results
+
+    def __align_pieces(self, pieces, workdir, samples, SR, result):
+        """cuts pieces (beginning, duration, words) out of the (converted)
+        recording and aligns them; returns the aligned label lines (None if
+        the alignment failed), word counts and beam width of each"""
+        modelconfig = os.path.join(result.model_dir, str(SR), 'config')
+        utterances = []
+        # feature files to add to the cache
+        coded = []
+        for (n, (beg, dur, words)) in enumerate(pieces, 1):
+            # temp files are named after the position of the piece in the batch
+            chunkname_plp = os.path.join(workdir, 'tmp' + str(n) + '.plp')
+            if self.feature_cache:
+                # features of the same audio, coded the same way
+                key = cache.key(self.__chunk_samples(samples, SR, beg, dur).tobytes(), SR,
+                                self.features, cache.file_digest(modelconfig))
+                features = self.feature_cache.get(key)
+                if features is not None:
+                    with open(chunkname_plp, 'wb') as f:
+                        f.write(features)
+                    utterances.append((chunkname_plp, [words]))
+                    continue
+                coded.append((chunkname_plp, key))
+            if self.features == 'numpy':
+                # code the piece directly, without a sound file for HCopy
+                plp.convert(
+                    self.__chunk_samples(samples, SR, beg, dur),
+                    chunkname_plp,
+                    plp.read_config(modelconfig))
+                utterances.append((chunkname_plp, [words]))
+                continue
+            chunkname_sound = os.path.join(workdir, 'tmp' + str(n) + '.wav')
+            self.__cut_chunk(samples, SR, chunkname_sound, beg, dur)
+            utterances.append((chunkname_sound, [words]))
+        if self.feature_cache and len(coded) < len(pieces):
+            self.logger.debug(f"Reusing the cached features of {len(pieces) - len(coded)} chunks")
+
+        # Should add exception handling here
+        (aligned, counts, beams) = self.__align(
+            utterances, workdir, SR, result, self.htktoolspath)
+        for (chunkname_plp, key) in coded:
+            if os.path.exists(chunkname_plp):
+                with open(chunkname_plp, 'rb') as f:
+                    self.feature_cache.put(key, f.read())
+        return list(zip(aligned, counts, beams))
+
+    def __split_chunk(self, samples, SR, chunk):
+        """the pieces (beginning, duration, words) a chunk is aligned in:  if
+        it is longer than split_length, it is split at the pauses in its audio
+        (see split_points) and its text in proportion (see split_text)"""
+        whole = [(chunk.beg, chunk.dur, chunk.text)]
+        if not self.split_length or chunk.dur <= self.split_length:
+            return whole
+        points = self.split_points(
+            chunk.dur,
+            audio.pauses(self.__chunk_samples(samples, SR, chunk.beg, chunk.dur), SR),
+            self.split_length)
+        if not points:
+            return whole
+        bounds = [0.0] + points + [chunk.dur]
+        durations = [b - a for (a, b) in zip(bounds, bounds[1:])]
+        texts = self.split_text(chunk.text, durations)
+        if texts is None:
+            return whole
+        self.logger.debug(f"Splitting chunk {chunk.name} into {len(texts)} pieces")
+        return [(round(chunk.beg + a, 3), round(b - a, 3), words)
+                for (a, b, words) in zip(bounds, bounds[1:], texts)]
+
+    @staticmethod
+    def split_points(duration, pauses, length):
+        """times (in seconds) to split a chunk of the given duration at, so that
+        its pieces are at most length long where possible:  the middle of the
+        pause (start, end) closest to the middle of each longer piece, in turn"""
+        def split(start, end):
+            if end - start <= length:
+                return []
+            middles = [(a + b) / 2 for (a, b) in pauses if a > start and b < end]
+            if not middles:
+                return []
+            middle = round(min(middles, key=lambda m: abs(m - (start + end) / 2)), 3)
+            return split(start, middle) + [middle] + split(middle, end)
+        return split(0.0, duration)
+
+    @staticmethod
+    def split_text(words, durations):
+        """splits the words of a chunk into pieces of the given durations, in
+        proportion to their length in characters; returns the words of each
+        piece, or None if there are not enough words for every piece"""
+        if len(words) < len(durations):
+            return None
+        characters = [0]
+        for word in words:
+            characters.append(characters[-1] + len(word))
+        bounds = [0]
+        elapsed = 0.0
+        for (k, duration) in enumerate(durations[:-1]):
+            elapsed += duration
+            target = elapsed / sum(durations) * characters[-1]
+            # every piece gets at least one word
+            candidates = range(bounds[-1] + 1, len(words) - (len(durations) - k - 2))
+            bounds.append(min(candidates, key=lambda b: abs(characters[b] - target)))
+        bounds.append(len(words))
+        return [words[a:b] for (a, b) in zip(bounds, bounds[1:])]
+
+    @classmethod
+    def resplit_text(cls, plan, aligned):
+        """checks the aligned label lines of the pieces of a split chunk:  as the
+        audio was split in pauses, every piece should end and the next one
+        begin with silence.  If a piece ends with speech while the next one
+        begins with silence, its last word is moved to the next piece (and the
+        other way round).  Returns the new pieces, or None if they fit."""
+        def silence(lines):
+            total = 0
+            for line in lines:
+                fields = line.split()
+                if fields[2] not in ('sp', 'sil'):
+                    break
+                total += int(fields[1]) - int(fields[0])
+            return total / 1.0e7 >= cls.SPLIT_SILENCE
+
+        texts = [list(words) for (_, _, words) in plan]
+        changed = False
+        for k in range(len(plan) - 1):
+            ends = silence(reversed(aligned[k]))
+            begins = silence(aligned[k + 1])
+            if not ends and begins and len(texts[k]) > 1:
+                texts[k + 1].insert(0, texts[k].pop())
+                changed = True
+            elif ends and not begins and len(texts[k + 1]) > 1:
+                texts[k].append(texts[k + 1].pop(0))
+                changed = True
+        if not changed:
+            return None
+        return [(beg, dur, words) for ((beg, dur, _), words) in zip(plan, texts)]
+
+    @staticmethod
+    def join_pieces(plan, aligned, SR=None):
+        """joins the aligned label lines of the pieces of a chunk into the lines
+        of the whole chunk (None if any piece failed); the last phone of each
+        piece lasts until the next piece begins"""
+        if not all(aligned):
+            return None
+        if len(aligned) == 1:
+            return aligned[0]
+
+        def stamp(seconds):
+            # time stamps of the 11,025 Hz models are scaled by 11000/11025
+            # in aligned_to_TextGrid, so the offsets of the pieces must be too
+            if SR == 11025:
+                seconds = seconds * 11025.0 / 11000.0
+            return int(round(seconds * 1.0e7))
+
+        lines = []
+        for (k, ((beg, dur, _), piece)) in enumerate(zip(plan, aligned)):
+            offset = stamp(beg - plan[0][0])
+            for line in piece:
+                fields = line.split()
+                fields[0] = str(int(fields[0]) + offset)
+                fields[1] = str(int(fields[1]) + offset)
+                lines.append(fields)
+            if k < len(plan) - 1:
+                lines[-1][1] = str(stamp(plan[k + 1][0] - plan[0][0]))
+        return [' '.join(fields) + '\n' for fields in lines]
 
     def __cleanup(
             self,
             style_tier,
             main_textgrid,
-            failed_alignment,
-            duration,
-            counts):
+            result):
         # add style tier to main TextGrid, if applicable
         if style_tier:
             self.logger.debug('Added style tier back')
@@ -273,77 +640,53 @@ class Aligner():
 
         # tidy up main TextGrid (extend durations, insert empty intervals etc.)
         try:
-            main_textgrid = self.__tidyup(main_textgrid, 0, duration)
+            main_textgrid = self.__tidyup(main_textgrid, 0, result.duration, result.textgrid)
         except BaseException: # pylint: disable=W0703
             self.logger.warning("Could not tidy the TextGrid output")
 
         # append information on alignment failure to errorlog file
-        if failed_alignment:
+        if result.failed_alignment:
             self.logger.warning('Some alignments failed')
             self.__write_alignment_errors_to_log(
-                self.textgrid, failed_alignment)
+                result.textgrid, result.failed_alignment)
 
         # write main TextGrid to file
         try:
-            main_textgrid.write(self.textgrid)
+            main_textgrid.write(
+                result.textgrid,
+                format=self.textgrid_format,
+                precision=self.textgrid_precision)
         except OSError as e:
             self.logger.error('Could not write TextGrid!')
             raise e
         else:
             self.logger.debug(
                 "Successfully written TextGrid %s to file.",
-                os.path.basename(self.textgrid))
+                os.path.basename(result.textgrid))
 
-        # remove temporary CMU dictionary
-        try:
-            os.remove(self.transcript.temp_dict_dir)
-        except OSError as e:
-            self.logger.error(
-                'Could not remove temporary dictionary directory!')
-            raise e
-        else:
-            self.logger.debug("Deleted temporary copy of the CMU dictionary.")
-
-        wavfile = self.audio
         # write log file
         # This should be replaced by proper use of self.logger
         try:
-            self.__write_log(
-                os.path.splitext(wavfile)[0] +
-                ".FAAVlog",
-                wavfile,
-                duration,
-                counts)
+            self.__write_log(result.logfile, self.audio, result)
         except BaseException: # pylint: disable=broad-except
             self.logger.error('Unable to write .FAAVlog')
         else:
             self.logger.debug(
                 "Written log file %s.",
-                os.path.basename(
-                    os.path.splitext(wavfile)[0] +
-                    ".FAAVlog"))
+                os.path.basename(result.logfile))
+
+    @staticmethod
+    def __chunk_samples(samples, SR, start, dur):
+        """returns a portion of the (converted) recording in memory"""
+        first = int(round(start * SR))
+        last = first + int(round(dur * SR))
+        return samples[first:last]
 
-    def __cut_chunk(self, outfile, start, dur, SOXPATH):
-        """uses SoX to cut a portion out of a sound file"""
+    def __cut_chunk(self, samples, SR, outfile, start, dur):
+        """writes a portion of the (converted) recording in memory to a sound file"""
         self.logger.debug(f"Cutting chunk {outfile} from {start}s to {dur}s")
-        wavfile = self.audio
-        if SOXPATH:
-            command_cut_sound = " ".join([SOXPATH,
-                                          '\"' + wavfile + '\"',
-                                          '\"' + outfile + '\"',
-                                          "trim",
-                                          str(start),
-                                          str(dur)])
-        else:
-            command_cut_sound = " ".join(["sox",
-                                          '\"' + wavfile + '\"',
-                                          '\"' + outfile + '\"',
-                                          "trim",
-                                          str(start),
-                                          str(dur)])
         try:
-            self.logger.debug(f"Cut command is:\n{command_cut_sound}")
-            os.system(command_cut_sound)
+            audio.write(outfile, self.__chunk_samples(samples, SR, start, dur), SR)
             self.logger.debug(
                 f"Sound chunk {outfile} successfully extracted.")
         except Exception as e:
@@ -352,93 +695,49 @@ class Aligner():
             raise e
 
     # This was the main body of Jiahong Yuan's original align.py
-    def __align(self, chunk, trs_input, outfile,
-                FADIR='', SOXPATH='', HTKTOOLSPATH=''):
-        """calls the forced aligner"""
-        # chunk = sound file to be aligned
-        # trsfile = corresponding transcription file
-        # outfile = output TextGrid
-
-        self.logger.info(f"Aligning chunk {chunk}")
-        self.logger.debug(f"input transcript: {trs_input}")
-        self.logger.debug(f"output file: {outfile}")
-
-        # change to Forced Alignment Toolkit directory for all the temp and
-        # preparation files
-        if FADIR:
-            self.logger.debug(f"Changing working directory to {FADIR}")
-            os.chdir(FADIR)
-
-        self.logger.debug("Current working directory is: %s", os.getcwd())
-        # derive unique identifier for tmp directory and all its file (from
-        # name of the sound "chunk")
-        identifier = re.sub(
-            r'\W|_|chunk', '', os.path.splitext(
-                os.path.split(chunk)[1])[0])
+    def __align(self, utterances, workdir, SR, result, HTKTOOLSPATH=''):
+        """calls the forced aligner once for several sound files (and again
+        for the ones that failed, with each wider beam of the pruning preset);
+        returns the aligned label lines, the word counts and the beam width
+        used for each of them"""
+        # utterances = list of (sound file to be aligned, corresponding
+        #   transcription) pairs; sound files are named tmp<identifier>.wav
+        #   and already have sampling rate SR (or, if their features are not
+        #   computed by HCopy, are the feature files tmp<identifier>.plp)
+        # workdir = directory for all the temp and preparation files (not
+        #   shared with any other batch)
+        # result = AlignmentResult of the run (for its models and dictionary)
+
+        self.logger.info(f"Aligning {len(utterances)} chunks in {workdir}")
+
+        # unique identifier for the temp files of each sound "chunk"
+        # (its position in the batch)
         # old names:  --> will have identifier added
-        ## - "tmp"
-        ## - "aligned.mlf"
-        ## - "aligned.results"
-        ## - "codetr.scp"
-        ## - "test.scp"
-        ## - "tmp.mlf"
         ## - "tmp.plp"
         ## - "tmp.wav"
-
-        tempdir = os.path.join('.', 'tmp', identifier)
-        tempwav = os.path.join('.', 'tmp', identifier, identifier + '.wav')
-        tempmlf = os.path.join('.', 'tmp', identifier, identifier + '.mlf')
-        tempalignedmlf = os.path.join(
-            '.', 'tmp', identifier, 'aligned' + identifier + '.mlf')
-        self.logger.info(f"Creating directory {tempdir}")
-        try:
-            os.mkdir(tempdir)
-        except FileExistsError:
-            self.logger.warning("Directory already exists? Reusing")
-        except OSError as e:
-            self.logger.critical("Could not create directory!")
-            raise e
-        # create working directory
-        # prepare wavefile
-        SR = self.__prep_wav(
-            chunk,
-            tempwav,
-            SOXPATH)
+        identifiers = [str(n) for n in range(1, len(utterances) + 1)]
+
+        tempmlf = os.path.join(workdir, 'tmp.mlf')
+        tempalignedmlf = os.path.join(workdir, 'aligned.mlf')
+        tempscp = os.path.join(workdir, 'codetr.scp')
+        testscp = os.path.join(workdir, 'test.scp')
+        codetr = []
+        test = {}
+        for ((chunk, _), identifier) in zip(utterances, identifiers):
+            tempplp = os.path.join(workdir, 'tmp' + identifier + '.plp')
+            if chunk != tempplp:
+                codetr.append('"' + chunk + '" "' + tempplp + '"\n')
+            test[identifier] = '"' + tempplp + '"\n'
 
         # prepare mlfile
-        self.__prep_mlf(
-            trs_input,
-            tempmlf,
-            identifier)
+        counts = self.__prep_mlf(
+            [(identifier, trs_input) for ((_, trs_input), identifier) in zip(utterances, identifiers)],
+            tempmlf)
 
         # prepare scp files
-        tempscp = os.path.join(
-            '.',
-            'tmp',
-            identifier,
-            'codetr' +
-            identifier +
-            '.scp')
-        testscp = os.path.join(
-            '.',
-            'tmp',
-            identifier,
-            'test' +
-            identifier +
-            '.scp')
-        tempplp = os.path.join(
-            '.',
-            'tmp',
-            identifier,
-            'tmp' +
-            identifier +
-            '.plp')
         with open(tempscp, 'w') as f:
             self.logger.debug(f"Writing {tempscp}")
-            f.write(tempwav + ' ' + tempplp + '\n')
-        with open(testscp, 'w') as f:
-            self.logger.debug(f"Writing {testscp}")
-            f.write(tempplp + '\n')
+            f.write(''.join(codetr))
 
         try:
             # call plp.sh and align.sh
@@ -451,75 +750,116 @@ class Aligner():
                 HVite = 'HVite'
             self.logger.debug(f'HCopy is "{HCopy}"')
             self.logger.debug(f'HVite is "{HVite}"')
-            modelconfig = os.path.join(
-                '.', 'align', 'model', str(SR), 'config')
-            modelmacros = os.path.join(
-                '.', 'align', 'model', str(SR), 'macros')
-            modelhmmdef = os.path.join(
-                '.', 'align', 'model', str(SR), 'hmmdefs')
-            modelmonophones = os.path.join('.', 'align', 'model', 'monophones')
-            pipedest = os.path.join(
-                '.', 'tmp', identifier, 'blubbeldiblubb.txt')
-            HCopyCommand = HCopy + ' -T 1 -C ' + modelconfig + \
-                ' -S ' + tempscp + ' >> ' + pipedest
+            modelconfig = os.path.join(result.model_dir, str(SR), 'config')
+            modelmacros = os.path.join(result.model_dir, str(SR), 'macros')
+            modelhmmdef = os.path.join(result.model_dir, str(SR), 'hmmdefs')
+            modelmonophones = os.path.join(result.model_dir, 'monophones')
+            pipedest = os.path.join(workdir, 'blubbeldiblubb.txt')
+            HCopyCommand = (HCopy + ' -T 1 -C "' + modelconfig +
+                            '" -S "' + tempscp + '" >> "' + pipedest + '"')
+            # (pruning options go after the first part)
             HViteCommand = (HVite +
-                            ' -T 1 -a -m -I ' +
+                            ' -T 1 -a -m',
+                            ' -I "' +
                             tempmlf +
-                            ' -H ' +
+                            '" -H "' +
                             modelmacros +
-                            ' -H ' +
+                            '" -H "' +
                             modelhmmdef +
-                            ' -S ' +
+                            '" -S "' +
                             testscp +
-                            ' -i ' +
+                            '" -i "' +
                             tempalignedmlf +
-                            ' -p 0.0 -s 5.0 ' +
-                            self.cmu_dict.dict_dir +
-                            ' ' +
+                            '" -p 0.0 -s 5.0 "' +
+                            result.dictionary +
+                            '" "' +
                             modelmonophones +
-                            ' > ' +
-                            os.path.join(tempdir, identifier + '.results'))
-
-            self.logger.debug(f'HViteCommand is "{HViteCommand}"')
-
-            os.system(HCopyCommand)
-            os.system(HViteCommand)
-
-            # write result of alignment to TextGrid file
-            self.__aligned_to_TextGrid(
-                tempalignedmlf,
-                outfile,
-                SR)
+                            '" > "' +
+                            os.path.join(workdir, 'aligned.results') + '"')
+
+            if codetr:
+                os.system(HCopyCommand)
+            aligned = {}
+            beams = {}
+            pending = identifiers
+            # chunks that fail with a beam are aligned again with the next
+            # (wider) one
+            for beam in self.beams:
+                if beam != self.beams[0]:
+                    self.logger.info(f"Retrying {len(pending)} chunks in {workdir} with " +
+                                     ("beam %.1f" % beam if beam is not None else "no pruning"))
+                with open(testscp, 'w') as f:
+                    self.logger.debug(f"Writing {testscp}")
+                    f.write(''.join(test[identifier] for identifier in pending))
+                if os.path.exists(tempalignedmlf):
+                    os.remove(tempalignedmlf)
+                if self.backend == 'numpy':
+                    viterbi.align_files(
+                        tempmlf, testscp, tempalignedmlf,
+                        result.dictionary, [modelmacros, modelhmmdef], beam)
+                else:
+                    command = (HViteCommand[0] +
+                               ('' if beam is None else ' -t %.1f' % beam) +
+                               HViteCommand[1])
+                    self.logger.debug(f'HViteCommand is "{command}"')
+                    os.system(command)
+
+                # split result of alignment into the chunks
+                found = self.read_aligned_mlf(tempalignedmlf)
+                for identifier in pending:
+                    if 'tmp' + identifier in found:
+                        aligned['tmp' + identifier] = found['tmp' + identifier]
+                        beams['tmp' + identifier] = beam
+                pending = [i for i in pending if 'tmp' + i not in aligned]
+                if not pending:
+                    break
             self.logger.debug(
-                "Forced alignment called successfully for file %s",
-                os.path.basename(chunk))
+                "Forced alignment called successfully in %s", workdir)
         except Exception as e:
-            FA_error = "Error in aligning file %s:  %s." % (
-                os.path.basename(chunk), e)
-            # clean up temporary alignment files
-            shutil.rmtree(tempdir)
+            FA_error = "Error in aligning chunks in %s:  %s." % (workdir, e)
             self.logger.error(FA_error)
             raise e
             # errorhandler(FA_error)
 
-        # remove tmp directory and all files
-        # This may create a race condition
-        shutil.rmtree(tempdir)
+        return ([aligned.get('tmp' + identifier) for identifier in identifiers], counts,
+                [beams.get('tmp' + identifier) for identifier in identifiers])
+
+    def model_rates(self, model_dir=None):
+        """the sampling rates of the acoustic models in the model directory
+        (by default the Aligner's)"""
+        model_dir = model_dir or self.model_dir
+        return sorted(
+            int(name) for name in os.listdir(model_dir)
+            if name.isdigit() and os.path.isfile(os.path.join(model_dir, name, 'config')))
+
+    @staticmethod
+    def select_model_rate(rate, rates):
+        """the sampling rate of the acoustic models (out of rates) for a sound
+        file with the given sampling rate:  the highest one that does not need
+        upsampling (upsampling adds no information), or the lowest one if all
+        do"""
+        rates = sorted(rates)
+        lower = [r for r in rates if r <= rate]
+        return max(lower) if lower else rates[0]
 
     # This function is from Jiahong Yuan's align.py
-    # (but adapted so that we're forcing a SR of 16,000 Hz; mono)
-    def __prep_wav(self, orig_wav, out_wav, SOXPATH=''):
-        """adjusts sampling rate  and number of channels of sound file to 16,000 Hz, mono."""
-
-    # NOTE:  the wave.py module may cause problems, so we'll just copy the file
-    # to 16,000 Hz mono no matter what the original file format!
-    ##    f = wave.open(orig_wav, 'r')
-    ##    SR = f.getframerate()
-    ##    channels = f.getnchannels()
-    # f.close()
-    # if not (SR == 16000 and channels == 1):  ## this is changed
-        SR = 16000
-    # SR = 11025
+    # (but adapted so that the sampling rate fits the available models; mono)
+    def __prep_wav(self, orig_wav, tempdir, model_dir, SOXPATH=''):
+        """adjusts sampling rate and number of channels of sound file to the
+        acoustic models (see select_model_rate), mono; returns the 16-bit
+        samples and the sampling rate"""
+        try:
+            with wave.open(orig_wav, 'rb') as f:
+                SR = self.model_rate or self.select_model_rate(
+                    f.getframerate(), self.model_rates(model_dir))
+            # resampled and mixed down in memory; files that already are
+            # mono at the rate of the models are read as they are
+            return audio.load(orig_wav, SR), SR
+        except (wave.Error, EOFError):
+            self.logger.info(f"Converting {orig_wav} with SoX")
+        # the wave module cannot read some files (e.g. floating point WAV), so
+        # fall back to SoX for those (keeping their sampling rate)
+        out_wav = os.path.join(tempdir, 'recording.wav')
         # if FAAValign is used as a CGI script, the path to SoX needs to
         # be specified explicitly
         if SOXPATH:
@@ -527,225 +867,180 @@ class Aligner():
                 SOXPATH +
                 ' \"' +
                 orig_wav +
-                '\" -c 1 -r 16000 ' +
-                out_wav)
+                '\" -b 16 -c 1 \"' +
+                out_wav + '\"')
         else:  # otherwise, rely on the shell to find the correct path
-            os.system("sox" + ' \"' + orig_wav + '\" -c 1 -r 16000 ' + out_wav)
-            #os.system("sox " + orig_wav + " -c 1 -r 11025 " + out_wav + " polyphase")
-    # else:
-    ##        os.system("cp -f " + '\"' + orig_wav + '\"' + " " + out_wav)
-
-        return SR
+            os.system("sox" + ' \"' + orig_wav + '\" -b 16 -c 1 \"' + out_wav + '\"')
+        with wave.open(out_wav, 'rb') as f:
+            SR = self.model_rate or self.select_model_rate(
+                f.getframerate(), self.model_rates(model_dir))
+        samples = audio.load(out_wav, SR)
+        os.remove(out_wav)
+        return samples, SR
 
     # This function originally is from Jiahong Yuan's align.py
     # (very much modified by Ingrid...)
-    def __prep_mlf(self, transcription, mlffile, identifier):
-        """writes transcription to the master label file for forced alignment"""
+    def __prep_mlf(self, utterances, mlffile):
+        """writes transcriptions to the master label file for forced alignment"""
         # INPUT:
-        # list transcription = list of list of (preprocessed) words
-        # string mlffile = name of master label file
-        # string identifier = unique identifier of process/sound file
+        # list utterances = list of (identifier, transcription) pairs, where
+        #   string identifier = unique identifier of the sound "chunk"
         #   (can't just call everything "tmp")
+        #   list transcription = list of list of (preprocessed) words
+        # string mlffile = name of master label file
         # OUTPUT:
-        # none, but writes master label file to disk
+        # list of tuples (words, uncertain, unclear) = number of words,
+        #   uncertain and unclear transcriptions written for each utterance
 
+        counts = []
         fw = open(mlffile, 'w')
         fw.write('#!MLF!#\n')
-        fw.write('"*/tmp' + identifier + '.lab"\n')
-        fw.write('sp\n')
-        for line in transcription:
-            for word in line:
-                # change unclear transcription ("((xxxx))") to noise
-                if word == "((xxxx))":
-                    word = "{NS}"
-                    self.count_unclear += 1
-                # get rid of parentheses for uncertain transcription
-                if self.uncertain.search(word):
-                    word = self.uncertain.sub(r'\1', word)
-                    self.count_uncertain += 1
-                # delete initial asterisks
-                if word[0] == "*":
-                    word = word[1:]
-                # check again that word is in CMU dictionary because of "noprompt" option,
-                # or because the user might select "skip" in interactive prompt
-                if word in self.cmu_dict.cmu_dict:
-                    fw.write(word + '\n')
-                    fw.write('sp\n')
-                    self.count_words += 1
-                else:
-                    self.logger.warning(
-                        f"Word '{word}' not in CMU dict!")
-        fw.write('.\n')
+        for (identifier, transcription) in utterances:
+            count_words = count_uncertain = count_unclear = 0
+            fw.write('"*/tmp' + identifier + '.lab"\n')
+            fw.write('sp\n')
+            for line in transcription:
+                for word in line:
+                    # change unclear transcription ("((xxxx))") to noise
+                    if word == "((xxxx))":
+                        word = "{NS}"
+                        count_unclear += 1
+                    # get rid of parentheses for uncertain transcription
+                    if self.uncertain.search(word):
+                        word = self.uncertain.sub(r'\1', word)
+                        count_uncertain += 1
+                    # delete initial asterisks
+                    if word[0] == "*":
+                        word = word[1:]
+                    # check again that word is in CMU dictionary because of "noprompt" option,
+                    # or because the user might select "skip" in interactive prompt
+                    if word in self.cmu_dict.cmu_dict:
+                        fw.write(word + '\n')
+                        fw.write('sp\n')
+                        count_words += 1
+                    else:
+                        self.logger.warning(
+                            f"Word '{word}' not in CMU dict!")
+            fw.write('.\n')
+            counts.append((count_words, count_uncertain, count_unclear))
         fw.close()
+        return counts
+
+    @staticmethod
+    def read_aligned_mlf(mlffile):
+        """splits an aligned master label file into the label lines of each
+        utterance, keyed by the utterance name (e.g. "tmp12" for "*/tmp12.rec")"""
+        utterances = {}
+        lines = None
+        with open(mlffile, 'r') as f:
+            for line in f:
+                if line.startswith('"'):
+                    name = os.path.splitext(os.path.basename(line.strip().strip('"')))[0]
+                    lines = utterances[name] = []
+                elif line.strip() == '.':
+                    lines = None
+                elif lines is not None:
+                    lines.append(line)
+        return utterances
 
     # This function is from Jiahong Yuan's align.py
     # (originally called "TextGrid(infile, outfile, SR)")
-    def __aligned_to_TextGrid(self, infile, outfile, SR):
+    @staticmethod
+    def aligned_to_TextGrid(lines, SR):
         """
-        writes the results of the forced alignment (file "aligned.mlf") to file
-        as a Praat TextGrid file
+        converts the results of the forced alignment (the lines of one
+        utterance in file "aligned.mlf") to a praat.TextGrid with a "phone"
+        and a "word" tier
         """
 
-        f = open(infile, 'rU')
-        lines = f.readlines()
-        f.close()
-        fw = open(outfile, 'w')
-        j = 2
+        def seconds(stamp):
+            # convert time stamps from 100ns units to seconds
+            # fix overlapping intervals:  divide time stamp by ten first
+            # and round!
+            if SR == 11025:  # adjust rounding error for 11,025 Hz sampling rate
+                return round((round(float(stamp) / 10.0, 0) / 1000000.0) * (11000.0 / 11025.0) + 0.0125, 3)
+            return round(round(float(stamp) / 10.0, 0) / 1000000.0 + 0.0125, 3)
+
         phons = []
         wrds = []
-    # try:
-        while lines[j] != '.\n':
-            ph = lines[j].split()[2]  # phone
-            if SR == 11025:  # adjust rounding error for 11,025 Hz sampling rate
-                # convert time stamps from 100ns units to seconds
-                # fix overlapping intervals:  divide time stamp by ten first
-                # and round!
-                st = round((round(float(lines[j].split()[
-                    0]) / 10.0, 0) / 1000000.0) * (11000.0 / 11025.0) + 0.0125, 3)  # start time
-                en = round((round(float(lines[j].split()[
-                    1]) / 10.0, 0) / 1000000.0) * (11000.0 / 11025.0) + 0.0125, 3)  # end time
-            else:
-                st = round(
-                    round(
-                        float(
-                            lines[j].split()[0]) /
-                        10.0,
-                        0) /
-                    1000000.0 +
-                    0.0125,
-                    3)
-                en = round(
-                    round(
-                        float(
-                            lines[j].split()[1]) /
-                        10.0,
-                        0) /
-                    1000000.0 +
-                    0.0125,
-                    3)
+        for line in lines:
+            fields = line.split()
+            st = seconds(fields[0])  # start time
+            en = seconds(fields[1])  # end time
             if st != en:  # 'sp' states between words can have zero duration
                 # list of phones with start and end times in seconds
-                phons.append([ph, st, en])
-
-            if len(lines[j].split()) == 5:  # entry on word tier
-                wrd = lines[j].split()[4].replace('\n', '')
-                if SR == 11025:
-                    st = round((round(float(lines[j].split()[
-                        0]) / 10.0, 0) / 1000000.0) * (11000.0 / 11025.0) + 0.0125, 3)
-                    en = round((round(float(lines[j].split()[
-                        1]) / 10.0, 0) / 1000000.0) * (11000.0 / 11025.0) + 0.0125, 3)
-                else:
-                    st = round(
-                        round(
-                            float(
-                                lines[j].split()[0]) /
-                            10.0,
-                            0) /
-                        1000000.0 +
-                        0.0125,
-                        3)
-                    en = round(
-                        round(
-                            float(
-                                lines[j].split()[1]) /
-                            10.0,
-                            0) /
-                        1000000.0 +
-                        0.0125,
-                        3)
-                if st != en:
-                    wrds.append([wrd, st, en])
-
-            j += 1
-        fw.write('File type = "ooTextFile short"\n')
-        fw.write('"TextGrid"\n')
-        fw.write('\n')
-        fw.write(str(phons[0][1]) + '\n')
-        fw.write(str(phons[-1][2]) + '\n')
-        fw.write('<exists>\n')
-        fw.write('2\n')
-        fw.write('"IntervalTier"\n')
-        fw.write('"phone"\n')
-        fw.write(str(phons[0][1]) + '\n')
-        fw.write(str(phons[-1][-1]) + '\n')
-        fw.write(str(len(phons)) + '\n')
-        for k in range(len(phons)):
-            fw.write(str(phons[k][1]) + '\n')
-            fw.write(str(phons[k][2]) + '\n')
-            fw.write('"' + phons[k][0] + '"' + '\n')
-        # write the word interval tier
-        fw.write('"IntervalTier"\n')
-        fw.write('"word"\n')
-        fw.write(str(phons[0][1]) + '\n')
-        fw.write(str(phons[-1][-1]) + '\n')
-        fw.write(str(len(wrds)) + '\n')
+                phons.append([fields[2], st, en])
+                if len(fields) == 5:  # entry on word tier
+                    wrds.append([fields[4], st, en])
+
+        tg = praat.TextGrid()
+        phone_tier = praat.IntervalTier("phone", phons[0][1], phons[-1][2])
+        for (ph, st, en) in phons:
+            phone_tier.append(praat.Interval(st, en, ph))
+        # words last until the beginning of the next word
+        word_tier = praat.IntervalTier("word", phons[0][1], phons[-1][2])
         for k in range(len(wrds) - 1):
-            fw.write(str(wrds[k][1]) + '\n')
-            fw.write(str(wrds[k + 1][1]) + '\n')
-            fw.write('"' + wrds[k][0] + '"' + '\n')
-        fw.write(str(wrds[-1][1]) + '\n')
-        fw.write(str(phons[-1][2]) + '\n')
-        fw.write('"' + wrds[-1][0] + '"' + '\n')
-
-        fw.close()
+            word_tier.append(praat.Interval(wrds[k][1], wrds[k + 1][1], wrds[k][0]))
+        word_tier.append(praat.Interval(wrds[-1][1], phons[-1][2], wrds[-1][0]))
+        tg.append(phone_tier)
+        tg.append(word_tier)
+        tg.change_times(phons[0][1], phons[-1][2])
+        return tg
 
-    def __reinsert_uncertain(self, tg, text):
+    @classmethod
+    def reinsert_uncertain(cls, tg, text, dictionary):
         """compares the original transcription with the word tier of a TextGrid and
         re-inserts markup for uncertain and unclear transcriptions"""
         # INPUT:
         # praat.TextGrid tg = TextGrid that was output by the forced aligner for this "chunk"
         # list text = list of words that should correspond to entries on word
         #   tier of tg (original transcription WITH parentheses, asterisks etc.)
+        # dictionary = the words known to the pronunciation dictionary
         # OUTPUT:
         # praat.TextGrid tg = TextGrid with original uncertain and unclear
         # transcriptions
 
+        # if "noprompt" option is selected, or if the user chooses the
+        # "skip" option in the interactive prompt,
+        # forced alignment ignores unknown words & indexes will not match!
+        # -> make an index of the words in the transcription that were aligned
+        # (automatically generated "in'" entries will be in dict file by now,
+        # so only need to strip original word of uncertainty
+        # parentheses and asterisks)
+        aligned = []
+        for (n, word) in enumerate(text):
+            stripped = cls.uncertain.sub(r'\1', word).lstrip('*')
+            if stripped in dictionary or word == "((xxxx))":
+                aligned.append((n, stripped))
+
         # forced alignment may or may not insert "sp" intervals between words
-        # -> make an index of "real" words and their index on the word tier of the TextGrid first
-        tgwords = []
-        for (n, interval) in enumerate(tg[1]):  # word tier
-            if interval.mark() not in ["sp", "SP"]:
-                tgwords.append((interval.mark(), n))
-
-        # for all "real" (non-"sp") words in transcription:
-        for (n, entry) in enumerate(tgwords):
-            # interval entry on word tier of FA output TextGrid
-            tgword = entry[0]
-            # corresponding position of that word in the TextGrid tier
-            tgposition = entry[1]
-
-            # if "noprompt" option is selected, or if the user chooses the
-            # "skip" option in the interactive prompt,
-            # forced alignment ignores unknown words & indexes will not match!
-            # -> count how many words have been ignored up to here and
-            # adjust n accordingly (n = n + ignored)
-            i = 0
-            while i <= n:
-                # (automatically generated "in'" entries will be in dict file by now,
-                # so only need to strip original word of uncertainty
-                # parentheses and asterisks)
-                if (self.uncertain.sub(r'\1', text[i]).lstrip(
-                        '*') not in self.cmu_dict.cmu_dict and text[i] != "((xxxx))"):
-                    n += 1  # !!! adjust n for every ignored word that is found !!!
-                i += 1
+        # -> walk through the "real" words on the word tier of the TextGrid and
+        # the aligned words of the transcription together
+        k = 0
+        for interval in tg[1]:  # word tier
+            tgword = interval.mark()
+            if tgword in ["sp", "SP"]:
+                continue
+            # corresponding position of that word in the transcription
+            (n, test) = aligned[k]
+            k += 1
 
             # original transcription contains unclear transcription:
             if text[n] == "((xxxx))":
                 # corresponding interval in TextGrid must have "{NS}"
-                if tgword == "{NS}" and tg[1][tgposition].mark() == "{NS}":
-                    tg[1][tgposition].change_text(text[n])
+                if tgword == "{NS}":
+                    interval.change_text(text[n])
                 else:  # This should not happen!
                     raise ValueError(
                         "Something went wrong in the substitution" +
                         " of unclear transcriptions for the forced alignment!")
 
             # original transcription contains uncertain transcription:
-            elif self.uncertain.search(text[n]):
+            elif cls.uncertain.search(text[n]):
                 # corresponding interval in TextGrid must have transcription
                 # without parentheses (and, if applicable, without asterisk)
-                test = self.uncertain.sub(r'\1', text[n]).lstrip('*')
-                if tgword == test and tg[1][tgposition].mark() == test:
-                    tg[1][tgposition].change_text(text[n])
+                if tgword == test:
+                    interval.change_text(text[n])
                 else:  # This should not happen!
                     raise ValueError(
                         "Something went wrong in the substitution" +
@@ -755,9 +1050,8 @@ class Aligner():
             elif text[n][0] == "*":
                 # corresponding interval in TextGrid must have transcription
                 # without the asterisk
-                test = text[n].lstrip('*')
-                if tgword == test and tg[1][tgposition].mark() == test:
-                    tg[1][tgposition].change_text(text[n])
+                if tgword == test:
+                    interval.change_text(text[n])
                 else:  # This should not happen!
                     raise ValueError(
                         "Something went wrong in the substitution of " +
@@ -766,21 +1060,13 @@ class Aligner():
         return tg
 
     def merge_textgrids(self, main_textgrid, new_textgrid,
-                        speaker, chunkname_textgrid):
-        """adds the contents of TextGrid new_textgrid to TextGrid main_textgrid"""
-
-        for tier in new_textgrid:
-            # change tier names to reflect speaker names
-            # (output of FA program is "phone", "word" -> "Speaker - phone", "Speaker - word")
-            tier.rename(speaker + " - " + tier.name())
-            # check if tier already exists:
-            for existing_tier in main_textgrid:
-                if tier.name() == existing_tier.name():
-                    for interval in tier:
-                        existing_tier.append(interval)
-                    break
-            else:
-                main_textgrid.append(tier)
+                        speaker, chunkname_textgrid, offset=0):
+        """adds the contents of TextGrid new_textgrid, shifted by offset, to TextGrid main_textgrid"""
+
+        # change tier names to reflect speaker names
+        # (output of FA program is "phone", "word" -> "Speaker - phone", "Speaker - word")
+        main_textgrid.merge(
+            [tier.view(offset) for tier in new_textgrid], speaker + " - ")
         self.logger.debug(
             f"Successfully added {chunkname_textgrid} to main TextGrid.")
         return main_textgrid
@@ -799,13 +1085,14 @@ class Aligner():
 
         return style_tier
 
-    def __write_log(self, filename, wavfile, duration, counts):
+    def __write_log(self, filename, wavfile, result):
         """writes a log file on alignment statistics"""
 
-        count_words = counts[0]
-        count_uncertain = counts[1]
-        count_unclear = counts[2]
-        count_chunks = counts[3]
+        count_words = result.count_words
+        count_uncertain = result.count_uncertain
+        count_unclear = result.count_unclear
+        count_chunks = result.count_chunks
+        duration = result.duration
 
         f = open(filename, 'w')
         t_stamp = time.asctime()
@@ -818,15 +1105,18 @@ class Aligner():
         #version = __version__
 
         # For development, it's helpful to know if there's anything in the repo that has been
-        # changed. This block checks to see if we're in a git repo. If we are, then use git diff
-        # to get the changes and write to the log file.
+        # changed. This block checks to see if FAVE is in a git repo (whatever the working
+        # directory is). If it is, then use git diff to get the changes and write to the log file.
         #
         # code debt: this block is repeated in extractFormants.py and the code should be consolidated.
+        fave_dir = os.path.dirname(os.path.abspath(__file__))
         try:
-            subprocess.run(['git', 'rev-parse', '--is-inside-work-tree'], check=True, capture_output=True)
+            subprocess.run(['git', 'rev-parse', '--is-inside-work-tree'], check=True,
+                           capture_output=True, cwd=fave_dir)
             try:
                 check_changes = subprocess.Popen(
-                    ["git", "diff", "--stat"], stdout=subprocess.PIPE)
+                    ["git", "diff", "--stat"], stdout=subprocess.PIPE, cwd=fave_dir,
+                    universal_newlines=True)
                 changes, err = check_changes.communicate() # pylint: disable=unused-variable
             except OSError:
                 changes = ''
@@ -847,6 +1137,13 @@ class Aligner():
         f.write("\n")
         f.write("Number of breath groups aligned:\t%i\n" % count_chunks)
         f.write("Duration of sound file:\t\t\t%.3f seconds\n" % duration)
+        f.write("Acoustic models used:\t\t\t%i Hz\n" % result.sampling_rate)
+        f.write("Pruning:\t\t\t\t%s\n" % self.pruning)
+        for beam in self.beams:
+            if result.count_beams[beam]:
+                f.write("->\tbreath groups aligned with %s:\t%i\n" % (
+                    "beam %.1f" % beam if beam is not None else "no pruning",
+                    result.count_beams[beam]))
         # The following is timing data that should be reinserted but is not
         #   critical to port right now.
         # pylint: disable=pointless-string-statement
@@ -895,15 +1192,12 @@ class Aligner():
             "Alignment failed for the following annotation units:  \n")
         errorlog.write("#\tbeginning\tend\tspeaker\ttext\n")
         for f in failed_alignment:
-            #        try:
-            errorlog.write('\t'.join(f).encode('ascii', 'replace'))
-    #        except UnicodeDecodeError:
-    #            errorlog.write('\t'.join(f))
+            errorlog.write('\t'.join(f))
             errorlog.write('\n')
         errorlog.close()
         self.logger.info(f"Alignment errors saved to file {logname}")
 
-    def __tidyup(self, tg, beg, end):
+    def __tidyup(self, tg, beg, end, tgfile):
         """extends the duration of a TextGrid and all its tiers from beg to end;
         inserts empty/"SP" intervals; checks for overlapping intervals"""
 
@@ -924,15 +1218,14 @@ class Aligner():
         # write errorlog if overlapping intervals detected
         if len(overlaps) != 0:
             self.logger.warning("Overlapping intervals detected!")
-            self.__write_errorlog(overlaps)
+            self.__write_errorlog(tgfile, overlaps)
 
         return tg
 
-    def __write_errorlog(self, overlaps):
+    def __write_errorlog(self, tgfile, overlaps):
         """writes log file with details on overlapping interval boundaries to file"""
 
         # write log file for overlapping intervals from FA
-        tgfile = self.textgrid
         logname = os.path.splitext(tgfile)[0] + ".errorlog"
         errorlog = open(logname, 'w')
         errorlog.write("Overlapping intervals in file %s:  \n" % tgfile)
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# *_* coding: utf-8 *_*
+
+"""
+Checks a whole corpus of FAAV transcripts against the pronunciation
+dictionary in parallel, and collects the unknown words of all transcripts
+in one report.
+"""
+
+__version__ = "2.0.0"
+__author__ = ("Rosenfelder, Ingrid; " +  # Only code writers
+              "Fruehwald, Josef; " +
+              "Evanini, Keelan; " +
+              "Seyfarth, Scott; " +
+              "Gorman, Kyle; " +
+              "Prichard, Hilary; " +
+              "Yuan, Jiahong; " +
+              "Brickhouse, Christian")
+__email__ = "brickhouse@stanford.edu"
+# should be the person who will fix bugs and make improvements
+__maintainer__ = "Christian Brickhouse"
+__copyright__ = "Copyright 2020, FAVE contributors"
+__license__ = "GPLv3"
+__status__ = "Development"  # Prototype, Development or Production
+# also include contributors that wrote no code
+__credits__ = ["Brandon Waldon"]
+
+# --------------------------------------------------------------------------------
+
+# Import built-in modules first
+# followed by third-party modules
+# followed by any changes to the path
+# your own modules.
+
+import os
+import logging
+import multiprocessing
+import concurrent.futures
+import pkg_resources
+from fave import cmudictionary
+from . import transcriptprocessor
+
+logger = logging.getLogger(__name__)
+
+# the dictionary the transcripts are checked against (in each worker process)
+_dictionary = None
+
+
+def transcript_files(source, exclude=()):
+    """returns the transcripts in source:  the .txt files in a directory, or
+    the files listed in a manifest file (one per line, relative to the
+    manifest; empty lines and lines starting with # are skipped), except
+    the files in exclude"""
+    if os.path.isdir(source):
+        files = sorted(os.path.join(source, f) for f in os.listdir(source)
+                       if f.endswith('.txt'))
+    else:
+        base = os.path.dirname(source)
+        files = []
+        with open(source) as manifest:
+            for line in manifest:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    files.append(os.path.join(base, line))
+    exclude = {os.path.abspath(f) for f in exclude}
+    return [f for f in files if os.path.abspath(f) not in exclude]
+
+
+def load_dictionary(dictionary_file=None, import_file=None, verbose=logging.WARNING):
+    """loads the dictionary for checking transcripts, with the entries of
+    import_file (if any) added"""
+    dictionary = cmudictionary.CMU_Dictionary(
+        dictionary_file or pkg_resources.resource_filename('fave.align', 'model/dict'),
+        verbose=verbose, prompt=False, check=True)
+    if import_file:
+        dictionary.add_dictionary_entries(import_file)
+    return dictionary
+
+
+def _init_worker(dictionary_file, entries, verbose):
+    global _dictionary  # pylint: disable=W0603
+    if _dictionary is None:
+        # not inherited from the parent process:  load it again, with the
+        # entries the parent imported (without writing any file)
+        _dictionary = load_dictionary(dictionary_file, verbose=verbose)
+        _dictionary.add_entries(entries)
+
+
+def check_transcript(filename):
+    """checks a transcript against the dictionary; returns its unknown words
+    (as for write_unknown_words) and how often each of them occurs, or a
+    message if the transcript cannot be checked"""
+    processor = transcriptprocessor.TranscriptProcessor(
+        filename, _dictionary, prompt=False, check=True, verbose=_dictionary.verbose)
+    try:
+        processor.read_transcription_file()
+        processor.check_transcription_file()
+        processor.check_words()
+    except (OSError, ValueError, IndexError) as err:
+        return "%s: %s" % (filename, err)
+    return processor.unknown, dict(processor.unknown_counts)
+
+
+def check_corpus(source, report, dictionary_file=None, jobs=1,
+                 import_file=None, verbose=logging.WARNING):
+    """checks all transcripts in source (a directory or a manifest file, see
+    transcript_files) against the dictionary, in jobs processes.
+
+    The dictionary is loaded once, with the entries of import_file (if any)
+    added.  The unknown words of all transcripts are written to report in
+    the format of write_unknown_words, in order of first appearance and with
+    the clue and line of their last appearance.
+    How often each of them occurs in each transcript, and the line it last
+    occurs in there, is written to <report>_files<ext>.
+
+    Returns the unknown words and, for each of them, a dict of (count, line)
+    per transcript."""
+    global _dictionary  # pylint: disable=W0603
+    (root, ext) = os.path.splitext(report)
+    by_file = root + '_files' + ext
+    files = transcript_files(source, exclude=[report, by_file])
+    logger.info("Checking %i transcripts in %s", len(files), source)
+
+    _dictionary = load_dictionary(dictionary_file, verbose=verbose)
+    # (imported once, here; the workers get the entries)
+    imported = _dictionary.add_dictionary_entries(import_file) if import_file else {}
+    if jobs > 1 and len(files) > 1:
+        # forked workers share the dictionary that is already loaded
+        if 'fork' in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context('fork')
+        else:
+            context = multiprocessing.get_context()
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=jobs, mp_context=context, initializer=_init_worker,
+                initargs=(dictionary_file, imported, verbose)) as pool:
+            results = list(pool.map(check_transcript, files,
+                                    chunksize=max(1, len(files) // (4 * jobs))))
+    else:
+        results = [check_transcript(f) for f in files]
+
+    unknown = {}
+    counts = {}
+    for (filename, result) in zip(files, results):
+        if isinstance(result, str):
+            logger.error("Could not check transcript %s", result)
+            continue
+        (file_unknown, file_counts) = result
+        for (word, entry) in file_unknown.items():
+            unknown[word] = entry
+            counts.setdefault(word, {})[filename] = (file_counts[word], entry[2])
+
+    _dictionary.write_unknown_words(unknown, report)
+    lines = []
+    for word in unknown:
+        for (filename, (count, line)) in counts[word].items():
+            lines.append('%s\t%s\t%i\t%s\n' % (word, filename, count, line))
+    with open(by_file, 'w') as f:
+        f.write(''.join(lines))
+    logger.info("Written %i unknown words in %i transcripts to %s and %s.",
+                len(unknown), len(files), report, by_file)
+    return unknown, counts
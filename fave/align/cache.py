@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# *_* coding: utf-8 *_*
+
+"""
+Caches on disk for the results of aligning breath groups and for their
+features, so that re-running the aligner after a few changes to a
+transcript (or the dictionary) only aligns the breath groups that changed,
+and codes none of them again.
+"""
+
+__version__ = "2.0.0"
+__author__ = ("Rosenfelder, Ingrid; " +  # Only code writers
+              "Fruehwald, Josef; " +
+              "Evanini, Keelan; " +
+              "Seyfarth, Scott; " +
+              "Gorman, Kyle; " +
+              "Prichard, Hilary; " +
+              "Yuan, Jiahong; " +
+              "Brickhouse, Christian")
+__email__ = "brickhouse@stanford.edu"
+# should be the person who will fix bugs and make improvements
+__maintainer__ = "Christian Brickhouse"
+__copyright__ = "Copyright 2020, FAVE contributors"
+__license__ = "GPLv3"
+__status__ = "Development"  # Prototype, Development or Production
+# also include contributors that wrote no code
+__credits__ = ["Brandon Waldon"]
+
+# --------------------------------------------------------------------------------
+
+# Import built-in modules first
+# followed by third-party modules
+# followed by any changes to the path
+# your own modules.
+
+import os
+import json
+import hashlib
+import tempfile
+import functools
+import threading
+
+
+def key(*parts):
+    """the key of a cache entry:  a digest of its parts (byte strings, or
+    anything that can be written as JSON)"""
+    digest = hashlib.sha256()
+    for part in parts:
+        if not isinstance(part, bytes):
+            part = json.dumps(part, sort_keys=True).encode('utf-8')
+        # (the length keeps the parts apart)
+        digest.update(b'%i:' % len(part))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def file_digest(filename):
+    """the digest of the content of a file (only read again when the file
+    changes), or None if it does not exist"""
+    try:
+        stat = os.stat(filename)
+    except FileNotFoundError:
+        return None
+    return _file_digest(os.path.abspath(filename), stat.st_mtime_ns, stat.st_size)
+
+
+@functools.lru_cache(maxsize=None)
+def _file_digest(filename, mtime, size):  # pylint: disable=unused-argument
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DiskCache():
+    """
+    A cache of byte strings in a directory, by key (see key).  Entries are
+    written atomically, so that several threads and processes can share the
+    same cache.  With max_size (in bytes), the least recently used entries
+    are removed whenever the entries take up more space, until they take up
+    at most LOW_WATER of it (so that the directory is not scanned again for
+    every entry added to a full cache).
+    """
+    LOW_WATER = 0.9
+
+    def __init__(self, directory, max_size=None):
+        self.directory = os.path.abspath(directory)
+        os.makedirs(self.directory, exist_ok=True)
+        self.max_size = max_size
+        self.__lock = threading.Lock()
+        # (estimated between evictions)
+        self.__size = sum(size for (_, _, size) in self.entries()) if max_size else 0
+
+    def entries(self):
+        """the file, time of last use and size of every entry"""
+        entries = []
+        for subdirectory in os.listdir(self.directory):
+            subdirectory = os.path.join(self.directory, subdirectory)
+            if not os.path.isdir(subdirectory):
+                continue
+            for name in os.listdir(subdirectory):
+                if name.startswith('.tmp'):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(subdirectory, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((os.path.join(subdirectory, name), stat.st_mtime_ns, stat.st_size))
+        return entries
+
+    def path(self, key):  # pylint: disable=redefined-outer-name
+        """the file of an entry"""
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key):  # pylint: disable=redefined-outer-name
+        """the value of an entry, or None if it is not in the cache"""
+        try:
+            with open(self.path(key), 'rb') as f:
+                value = f.read()
+            if self.max_size:
+                # (last used now)
+                os.utime(self.path(key))
+        except FileNotFoundError:
+            return None
+        return value
+
+    def put(self, key, value):  # pylint: disable=redefined-outer-name
+        """stores the value of an entry"""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        (fd, temp) = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(value)
+            os.replace(temp, path)
+        except BaseException:
+            os.remove(temp)
+            raise
+        if self.max_size:
+            with self.__lock:
+                self.__size += len(value)
+                if self.__size > self.max_size:
+                    self.__evict()
+
+    def __evict(self):
+        """removes the least recently used entries until the others take up
+        at most LOW_WATER of max_size"""
+        entries = sorted(self.entries(), key=lambda entry: entry[1])
+        self.__size = sum(size for (_, _, size) in entries)
+        for (path, _, size) in entries:
+            if self.__size <= self.max_size * self.LOW_WATER:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self.__size -= size
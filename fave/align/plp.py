@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+# *_* coding: utf-8 *_*
+
+"""
+Computes the PLP features of the acoustic models with NumPy, the way HTK's
+HCopy does for the coding parameters in fave/align/model/<SR>/config, and
+reads and writes them as HTK parameter files, so that chunks can be coded
+without running HCopy.
+"""
+
+__version__ = "2.0.0"
+__author__ = ("Rosenfelder, Ingrid; " +  # Only code writers
+              "Fruehwald, Josef; " +
+              "Evanini, Keelan; " +
+              "Seyfarth, Scott; " +
+              "Gorman, Kyle; " +
+              "Prichard, Hilary; " +
+              "Yuan, Jiahong; " +
+              "Brickhouse, Christian")
+__email__ = "brickhouse@stanford.edu"
+# should be the person who will fix bugs and make improvements
+__maintainer__ = "Christian Brickhouse"
+__copyright__ = "Copyright 2020, FAVE contributors"
+__license__ = "GPLv3"
+__status__ = "Development"  # Prototype, Development or Production
+# also include contributors that wrote no code
+__credits__ = ["Brandon Waldon"]
+
+# --------------------------------------------------------------------------------
+
+# Import built-in modules first
+# followed by third-party modules
+# followed by any changes to the path
+# your own modules.
+
+import functools
+import struct
+import numpy as np
+
+# HTK parameter kinds and qualifiers
+PLP = 11
+QUALIFIERS = {'E': 0o100, 'N': 0o200, 'D': 0o400, 'A': 0o1000, 'C': 0o2000,
+              'Z': 0o4000, 'K': 0o10000, '0': 0o20000}
+
+# HTK's defaults for the parameters the model configs do not set
+DEFAULTS = {
+    'PREEMCOEF': 0.97,
+    'USEHAMMING': True,
+    'ZMEANSOURCE': False,
+    'NUMCHANS': 20,
+    'LPCORDER': 12,
+    'NUMCEPS': 12,
+    'CEPLIFTER': 22,
+    'COMPRESSFACT': 0.33,
+    'USEPOWER': False,
+    'DELTAWINDOW': 2,
+    'ACCWINDOW': 2,
+}
+
+# header of an HTK parameter file:  number of frames, frame period (in
+# 100 ns), bytes per frame, parameter kind
+HEADER = struct.Struct('>iihh')
+
+
+@functools.lru_cache(maxsize=None)
+def read_config(filename):
+    """reads an HTK config file; returns a dict of the parameters (with
+    HTK's defaults for the ones it does not set)"""
+    config = dict(DEFAULTS)
+    with open(filename) as f:
+        for line in f:
+            line = line.split('#')[0].strip()
+            if '=' not in line:
+                continue
+            (key, value) = [s.strip() for s in line.split('=', 1)]
+            key = key.split(':')[-1].upper()
+            if value.upper() in ('T', 'TRUE'):
+                config[key] = True
+            elif value.upper() in ('F', 'FALSE'):
+                config[key] = False
+            else:
+                try:
+                    config[key] = float(value) if '.' in value else int(value)
+                except ValueError:
+                    config[key] = value
+    return config
+
+
+def parameter_kind(kind):
+    """returns the HTK code of a parameter kind such as PLP_0_D_A_Z; only
+    PLP features (with any of the qualifiers _0, _D, _A and _Z) are supported"""
+    (base, *qualifiers) = kind.upper().split('_')
+    if base != 'PLP' or not set(qualifiers) <= {'0', 'D', 'A', 'Z'}:
+        raise ValueError("unsupported parameter kind: %s" % kind)
+    code = PLP
+    for qualifier in qualifiers:
+        code |= QUALIFIERS[qualifier]
+    return code
+
+
+def features(samples, config):
+    """computes the features of 16-bit samples for the parameters in an HTK
+    config (as returned by read_config); returns an array of shape
+    (frames, coefficients)"""
+    kind = parameter_kind(config['TARGETKIND'])
+    period = config['SOURCERATE']
+    # (truncated, like HTK does)
+    window = int(config['WINDOWSIZE'] / period)
+    shift = int(config['TARGETRATE'] / period)
+    samples = np.asarray(samples, dtype=float)
+    n = (len(samples) - window) // shift + 1 if len(samples) >= window else 0
+    frames = np.lib.stride_tricks.as_strided(
+        samples, shape=(n, window), strides=(samples.strides[0] * shift, samples.strides[0]))
+    frames = frames.copy()
+
+    if config['ZMEANSOURCE']:
+        frames -= frames.mean(axis=1, keepdims=True)
+    k = config['PREEMCOEF']
+    if k:
+        frames[:, 1:] -= k * frames[:, :-1]
+        frames[:, 0] *= 1 - k
+    if config['USEHAMMING']:
+        frames *= 0.54 - 0.46 * np.cos(2 * np.pi * np.arange(window) / (window - 1))
+
+    # filterbank (power) spectrum, floored as in HTK's FBank2ASpec
+    fbank = np.maximum(_filterbank_spectrum(frames, period, config), 1.0)
+    (eql, cm) = _plp_tables(window, period, config['NUMCHANS'], config['LPCORDER'])
+    # equal-loudness curve and intensity-loudness power law
+    aspec = (fbank * eql) ** config['COMPRESSFACT']
+    aspec = np.concatenate([aspec[:, :1], aspec, aspec[:, -1:]], axis=1)
+    # autocorrelation (inverse DFT of the auditory spectrum)
+    autocorrelation = aspec @ cm.T / (2.0 * (aspec.shape[1] - 1))
+    (lp, error) = _durbin(autocorrelation)
+    cepstra = _lpc_to_cepstrum(lp, config['NUMCEPS'])
+    lifter = config['CEPLIFTER']
+    if lifter > 0:
+        cepstra *= 1.0 + lifter / 2.0 * np.sin(
+            np.arange(1, config['NUMCEPS'] + 1) * np.pi / lifter)
+    if kind & QUALIFIERS['0']:
+        cepstra = np.concatenate([cepstra, np.log(error)[:, None]], axis=1)
+    if kind & QUALIFIERS['Z']:
+        cepstra -= cepstra.mean(axis=0)
+    vectors = [cepstra]
+    if kind & QUALIFIERS['D']:
+        vectors.append(deltas(vectors[-1], config['DELTAWINDOW']))
+        if kind & QUALIFIERS['A']:
+            vectors.append(deltas(vectors[-1], config['ACCWINDOW']))
+    return np.concatenate(vectors, axis=1)
+
+
+def deltas(coefficients, window):
+    """HTK's regression coefficients of an array of shape (frames,
+    coefficients), with the first and last frames repeated at the edges"""
+    padded = np.concatenate([coefficients[:1]] * window + [coefficients] +
+                            [coefficients[-1:]] * window)
+    n = len(coefficients)
+    d = np.zeros_like(coefficients)
+    for theta in range(1, window + 1):
+        d += theta * (padded[window + theta:window + theta + n] -
+                      padded[window - theta:window - theta + n])
+    return d / (2 * sum(theta * theta for theta in range(1, window + 1)))
+
+
+def write(filename, vectors, period, kind):
+    """writes features to an uncompressed HTK parameter file; period is the
+    frame period in 100 ns, kind the parameter kind (e.g. PLP_0_D_A_Z)"""
+    vectors = np.asarray(vectors, dtype='>f4')
+    with open(filename, 'wb') as f:
+        f.write(HEADER.pack(len(vectors), int(round(period)), 4 * vectors.shape[1],
+                            parameter_kind(kind)))
+        f.write(vectors.tobytes())
+
+
+def read(filename):
+    """reads an HTK parameter file (as written by write, or compressed, as
+    HCopy writes them for the model configs); returns the features, the
+    frame period (in 100 ns) and the parameter kind code"""
+    with open(filename, 'rb') as f:
+        (n, period, size, kind) = HEADER.unpack(f.read(HEADER.size))
+        if not kind & QUALIFIERS['C']:
+            vectors = np.frombuffer(f.read(n * size), dtype='>f4').reshape(n, size // 4)
+            return vectors.astype(float), period, kind
+        # compressed:  16-bit integers x of each coefficient, scaled by A and
+        # offset by B as (x + B) / A; A and B count as 4 frames (and a CRC
+        # checksum may follow the frames)
+        dimension = size // 2
+        scale = np.frombuffer(f.read(4 * dimension), dtype='>f4').astype(float)
+        offset = np.frombuffer(f.read(4 * dimension), dtype='>f4').astype(float)
+        n -= 4
+        vectors = np.frombuffer(f.read(n * size), dtype='>i2').reshape(n, dimension)
+    return (vectors + offset) / scale, period, kind
+
+
+def convert(samples, filename, config):
+    """codes 16-bit samples as in the config and writes them to an HTK
+    parameter file"""
+    write(filename, features(samples, config), config['TARGETRATE'], config['TARGETKIND'])
+
+
+def _filterbank_spectrum(frames, period, config):
+    """mel filterbank of the power (or magnitude) spectra of the frames, as
+    HTK's Wave2FBank computes it"""
+    window = frames.shape[1]
+    fft_size = 2
+    while fft_size < window:
+        fft_size *= 2
+    (weights, low_channel) = _filterbank(fft_size, period, config['NUMCHANS'])
+    spectrum = np.abs(np.fft.rfft(frames, fft_size)[:, :fft_size // 2])
+    if config['USEPOWER']:
+        spectrum = spectrum ** 2
+    fbank = np.zeros((len(frames), config['NUMCHANS'] + 2))
+    # each FFT bin adds to the channels on either side of it
+    for (k, channel) in enumerate(low_channel):
+        if channel >= 0:
+            fbank[:, channel] += weights[k] * spectrum[:, k]
+            fbank[:, channel + 1] += (1 - weights[k]) * spectrum[:, k]
+    return fbank[:, 1:config['NUMCHANS'] + 1]
+
+
+@functools.lru_cache(maxsize=None)
+def _filterbank(fft_size, period, channels):
+    """HTK's mel filterbank:  the weight of the lower channel and the lower
+    channel (or -1 if the bin is not used) of each FFT bin"""
+    half = fft_size // 2
+    resolution = 1.0e7 / (period * fft_size * 700.0)
+
+    def mel(k):
+        return 1127 * np.log(1 + (k - 1) * resolution)
+
+    centres = [0.0] + [c / (channels + 1) * mel(half + 1) for c in range(1, channels + 2)]
+    weights = np.zeros(half)
+    low_channel = -np.ones(half, dtype=int)
+    channel = 1
+    for k in range(2, half + 1):  # HTK's bins count from 1; bin 1 is DC
+        m = mel(k)
+        while channel <= channels + 1 and centres[channel] < m:
+            channel += 1
+        low_channel[k - 1] = channel - 1
+        if channel - 1 > 0:
+            weights[k - 1] = (centres[channel] - m) / (centres[channel] - centres[channel - 1])
+        else:
+            weights[k - 1] = (centres[1] - m) / centres[1]
+    return weights, low_channel
+
+
+@functools.lru_cache(maxsize=None)
+def _plp_tables(window, period, channels, order):
+    """HTK's equal-loudness curve for the filterbank channels and cosine
+    matrix for the inverse DFT (see InitPLP)"""
+    fft_size = 2
+    while fft_size < window:
+        fft_size *= 2
+    resolution = 1.0e7 / (period * fft_size * 700.0)
+    top = 1127 * np.log(1 + fft_size // 2 * resolution)
+    centres = np.arange(1, channels + 1) / (channels + 1) * top
+    hz = 700 * (np.exp(centres / 1127) - 1)
+    fsq = hz * hz
+    fsub = fsq / (fsq + 1.6e5)
+    eql = fsub * fsub * ((fsq + 1.44e6) / (fsq + 9.61e6))
+    n = channels + 2
+    angles = np.pi / (n - 1) * np.outer(np.arange(order + 1), np.arange(n))
+    cm = 2.0 * np.cos(angles)
+    cm[:, 0] = 1.0
+    cm[:, -1] = np.cos(angles[:, -1])
+    return eql, cm
+
+
+def _durbin(autocorrelation):
+    """Durbin's recursion (as in HTK) for each row of autocorrelation
+    coefficients r[0..p]; returns the LP coefficients a[1..p] and the
+    prediction errors"""
+    (frames, p) = (autocorrelation.shape[0], autocorrelation.shape[1] - 1)
+    r = autocorrelation
+    a = np.zeros((frames, p))
+    error = r[:, 0].copy()
+    for i in range(1, p + 1):
+        k = r[:, i] + np.sum(a[:, :i - 1] * r[:, i - 1:0:-1], axis=1)
+        k /= error
+        error *= 1 - k * k
+        new = a.copy()
+        new[:, i - 1] = -k
+        if i > 1:
+            new[:, :i - 1] = a[:, :i - 1] - k[:, None] * a[:, i - 2::-1]
+        a = new
+    return a, error
+
+
+def _lpc_to_cepstrum(a, n):
+    """HTK's LPC2Cepstrum:  the first n cepstral coefficients of the LP
+    coefficients a[1..p] (n at most p)"""
+    c = np.zeros((a.shape[0], n))
+    for m in range(1, n + 1):
+        total = np.zeros(a.shape[0])
+        for i in range(1, m):
+            total += (m - i) * a[:, i - 1] * c[:, m - i - 1]
+        c[:, m - 1] = -(a[:, m - 1] + total / m)
+    return c
@@ -32,8 +32,8 @@ __credits__ = ["Brandon Waldon"]
 
 import re
 import sys
-import os
 import logging
+from collections import Counter
 from fave import cmudictionary
 
 
@@ -43,6 +43,13 @@ class TranscriptProcessor():
     start_uncertain = re.compile(r'(\(\()')
     end_uncertain = re.compile(r'(\)\))')  # end of uncertain transcription
     hyphenated = re.compile(r'(\w+)-(\w+)')  # hyphenated words
+    # hyphen inside a word (splitting at all of these is the same as
+    # splitting hyphenated words twice)
+    word_hyphen = re.compile(r'(?<=\w)-(?=\w)')
+    # initial apostrophe
+    initial_apostrophe = re.compile(r"(\s|^)'\b")
+    # variable coding for consonant cluster reduction
+    cluster_coding = re.compile(r"\d\w(\w)?")
     # intended word (inserted by transcribers after truncated word)
     intended = re.compile(r'^\+\w+')
     # uncertain transcription (single word)
@@ -64,9 +71,6 @@ class TranscriptProcessor():
         # uncertain section of transcription (switched on and off by the
         # beginning or end of double parentheses:  "((", "))")
         self.logger = logging.getLogger(__name__)
-        logging.basicConfig(
-            format='%(levelname)s:%(message)s',
-            level=kwargs['verbose'])
 
         self.file = transript_file
         self.__config_flags(**kwargs)
@@ -74,10 +78,15 @@ class TranscriptProcessor():
         self.flag_uncertain = False
         self.last_beg_uncertain = ''
         self.last_end_uncertain = ''
-        self.temp_dict_dir = None
+        # the words the aligner can need pronunciations for
+        self.dictionary_words = set()
         self.lines = []
         self.trans_lines = []
         self.delete_lines = None
+        # unknown words found in "check transcription" mode, and how often
+        # each of them occurs
+        self.unknown = {}
+        self.unknown_counts = Counter()
         if not isinstance(
                 pronunciation_dictionary,
                 cmudictionary.CMU_Dictionary):
@@ -91,11 +100,11 @@ class TranscriptProcessor():
             self.unknownFile = kwargs['check']
         self.check = bool(kwargs['check'])
 
-    def check_dictionary_entries(self, wavfile):
+    def check_dictionary_entries(self, wavfile=None):  # pylint: disable=unused-argument
         """checks that all words in lines have an entry in the CMU dictionary;
         if not, prompts user for Arpabet transcription and adds it to the dict
         file. If "check transcription" option is selected, writes list of
-        unknown words to file and exits."""
+        unknown words to file and exits.  (wavfile is no longer used.)"""
         # INPUT:  list of lines to check against CMU dictionary
         # OUTPUT:  list newlines = list of list of words for each line (processed)
         # - prompts user to modify CMU dictionary (cmudict) and writes updated
@@ -103,27 +112,8 @@ class TranscriptProcessor():
         # - if "check transcription" option is selected, writes list of unknown
         #       words to file and exits
         self.logger.debug('Checking dictionary entries')
-        newlines = []
-        unknown = {}
-
-        for line in self.trans_lines:
-            newwords = []
-            # get list of preprocessed words in each line
-            # This may lead to a race condition -CB
-            words = self.preprocess_transcription(line.strip().upper())
-            # check each word in transcription as to whether it is in the CMU dictionary:
-            # (if "check transcription" option is not set, dict unknown will simply remain empty)
-            for i, w in enumerate(words):
-                if i < len(words) - 1:
-                    unknown = self.dictionary.check_word(
-                        w, words[i + 1], unknown, line)
-                else:
-                    unknown = self.dictionary.check_word(
-                        w, '', unknown, line)  # last word in line
-                # take "clue words" out of transcription:
-                if not self.intended.search(self.uncertain.sub(r'\1', w)):
-                    newwords.append(w)
-            newlines.append(newwords)
+        newlines = self.check_words()
+        unknown = self.unknown
 
         # write new version of the CMU dictionary to file
         # (do this here so that new entries to dictionary will still be saved
@@ -136,18 +126,14 @@ class TranscriptProcessor():
         # to be checked manually and merged with the main dictionary at certain
         # intervals
 
-        # write temporary version of the CMU dict to file for use in alignment
+        # keep the words the aligner can need for this transcription; the
+        # aligner writes their entries of the (updated) CMU dict to a
+        # temporary file of its own for every alignment
         if not self.check:
-            temp_dict = os.path.join(
-                os.path.dirname(wavfile), '_'.join(
-                    os.path.basename(wavfile).split('_')[
-                        :2]) + "_" + "dict")
-            self.logger.debug(f"temp_dict is {temp_dict}")
-            self.dictionary.write_dict(temp_dict)
-            self.logger.debug(
-                    "Written updated temporary version of CMU dictionary.")
-            # forced alignment must use updated cmudict, not original one
-            self.temp_dict_dir = temp_dict
+            words = self.word_types(newlines)
+            words.update(self.dictionary.SPECIAL_ENTRIES)
+            self.logger.debug("Found %i word types for the aligner.", len(words))
+            self.dictionary_words = words
 
         # "CHECK TRANSCRIPTION" OPTION:
         # write list of unknown words and suggested transcriptions for
@@ -165,13 +151,69 @@ class TranscriptProcessor():
             # return new transcription (list of lists of words, for each line)
             self.trans_lines = newlines
 
+    def check_words(self):
+        """checks the words in the transcription lines against the CMU
+        dictionary; returns the list of preprocessed words for each line,
+        without clue words.  In "check transcription" mode, the unknown words
+        (as written by write_unknown_words) are kept in self.unknown, and how
+        often each of them occurs in self.unknown_counts."""
+        newlines = []
+        # (word, clue, next word, line) for every word in the transcription
+        tokens = []
+        # the result of check_word depends only on the word and, for truncated
+        # words, on an intended word after it, so each such word type is
+        # checked only once (in order of first appearance)
+        types = {}
+
+        for line in self.trans_lines:
+            # get list of preprocessed words in each line
+            # This may lead to a race condition -CB
+            words = self.preprocess_transcription(line.strip().upper())
+            for i, w in enumerate(words):
+                next_word = words[i + 1] if i < len(words) - 1 else ''  # last word in line
+                clue = next_word if self.intended.search(next_word) else ''
+                tokens.append((w, clue, next_word, line))
+                types.setdefault((w, clue), line)
+            # take "clue words" out of transcription:
+            newlines.append([w for w in words
+                             if not self.intended.search(self.uncertain.sub(r'\1', w))])
+
+        # check each word type as to whether it is in the CMU dictionary,
+        # keeping the unknown word check_word reports for it (if any)
+        for (w, clue), line in types.items():
+            types[(w, clue)] = list(self.dictionary.check_word(w, clue, {}, line))
+        self.logger.debug(
+            "Checked %i word types for %i words.", len(types), len(tokens))
+        # (if "check transcription" option is not set, dict unknown will simply remain empty)
+        if self.check:
+            # list unknown words in order of first appearance, with the clue
+            # and line of their last appearance
+            for (w, clue, next_word, line) in tokens:
+                for word in types[(w, clue)]:
+                    self.unknown[word] = ("", self.dictionary.clue(next_word), line)
+                    self.unknown_counts[word] += 1
+        return newlines
+
+    def word_types(self, lines):
+        """returns the set of words in lines (lists of preprocessed words) as
+        they are passed to the aligner, i.e. without uncertainty markup and
+        asterisks, and with unclear transcriptions as noise"""
+        words = set()
+        for line in lines:
+            for word in line:
+                if word == "((xxxx))":
+                    word = "{NS}"
+                word = self.uncertain.sub(r'\1', word)
+                if word[0] == "*":
+                    word = word[1:]
+                words.add(word)
+        return words
+
     def preprocess_transcription(self, line):
         """preprocesses transcription input for CMU dictionary lookup and forced alignment"""
         # INPUT:  string line = line of orthographic transcription
         # OUTPUT:  list words = list of individual words in transcription
 
-        self.logger.debug("Preprocessing transcript line:")
-        self.logger.debug(f"    {line}")
         flag_uncertain = self.flag_uncertain
         last_beg_uncertain = self.last_beg_uncertain
         last_end_uncertain = self.last_end_uncertain
@@ -183,19 +225,24 @@ class TranscriptProcessor():
 
         # make beginning and end of uncertain transcription spans into separate
         # words
-        line = self.start_uncertain.sub(r' (( ', line)
-        line = self.end_uncertain.sub(r' )) ', line)
+        # (the checks for characters skip patterns that cannot match)
+        if '((' in line or '))' in line:
+            line = line.replace('((', ' (( ').replace('))', ' )) ')
         # correct a common transcription error (one dash instead of two)
         line = line.replace(' - ', ' -- ')
         # delete punctuation marks
-        for p in [',', '.', ':', ';', '!', '?', '"', '%', '--']:
-            line = line.replace(p, ' ')
+        # (chained replace is faster than str.translate for lines this short)
+        line = line.replace(',', ' ').replace('.', ' ').replace(':', ' ').replace(
+            ';', ' ').replace('!', ' ').replace('?', ' ').replace('"', ' ').replace(
+                '%', ' ').replace('--', ' ')
         # delete initial apostrophes
-        line = re.compile(r"(\s|^)'\b").sub(" ", line)
+        if "'" in line:
+            line = self.initial_apostrophe.sub(" ", line)
         # delete variable coding for consonant cluster reduction
-        line = re.compile(r"\d\w(\w)?").sub(" ", line)
+        line = self.cluster_coding.sub(" ", line)
         # replace unclear transcription markup (empty parentheses):
-        line = self.unclear.sub('((xxxx))', line)
+        if '((' in line:
+            line = self.unclear.sub('((xxxx))', line)
         # correct another transcription error:  truncation dash outside of
         # double parentheses will become a word
         line = line.replace(' - ', '')
@@ -203,19 +250,16 @@ class TranscriptProcessor():
         # split hyphenated words (but keep truncated words as they are!)
         # NOTE:  This also affects the interjections "huh-uh", "uh-huh" and "uh-oh".
         # However, should work fine just aligning individual components.
-        line = self.hyphenated.sub(r'\1 \2', line)
-        # do this twice for words like "daughter-in-law"
-        line = self.hyphenated.sub(r'\1 \2', line)
-
-        # split line into words:
-        words = line.split()
-        self.logger.debug(words)
+        # (also splits words like "daughter-in-law" completely)
+        if '-' in line:
+            line = self.word_hyphen.sub(' ', line)
 
+        # split line into words
+        if not self.flag_uncertain and '((' not in line and '))' not in line:
+            return line.split()
         # add uncertainty parentheses around every word individually
         newwords = []
-        for word in words:
-            self.logger.debug(word)
-            self.logger.debug(flag_uncertain)
+        for word in line.split():
             if word == "((":  # beginning of uncertain transcription span
                 if not self.flag_uncertain:
                     self.flag_uncertain = True
@@ -264,14 +308,11 @@ class TranscriptProcessor():
         """Replace fancy quotes with straight quotes"""
         cleaned_lines = []
         for line in all_input:
-            line = line.replace(u'\u2018', "'")
-            line = line.replace(u'\u2019', "'")
-            line = line.replace(u'\u201a', "'")
-            line = line.replace(u'\u201b', "'")
-            line = line.replace(u'\u201c', '"')
-            line = line.replace(u'\u201d', '"')
-            line = line.replace(u'\u201e', '"')
-            line = line.replace(u'\u201f', '"')
+            if not line.isascii():
+                line = line.replace(u'\u2018', "'").replace(u'\u2019', "'").replace(
+                    u'\u201a', "'").replace(u'\u201b', "'").replace(
+                        u'\u201c', '"').replace(u'\u201d', '"').replace(
+                            u'\u201e', '"').replace(u'\u201f', '"')
             cleaned_lines.append(line)
         return cleaned_lines
 
@@ -0,0 +1,498 @@
+#!/usr/bin/env python3
+# *_* coding: utf-8 *_*
+
+"""
+Forced alignment with the HTK acoustic models in fave/align/model, done in
+NumPy instead of by HTK's HVite:  reads the HMM definitions, builds the
+network of the words (with their alternative pronunciations and the
+optional short pauses) of each utterance, and finds the most likely state
+sequence with the Viterbi algorithm.  The result is written as the aligned
+master label file HVite writes with the options -a -m.
+"""
+
+__version__ = "2.0.0"
+__author__ = ("Rosenfelder, Ingrid; " +  # Only code writers
+              "Fruehwald, Josef; " +
+              "Evanini, Keelan; " +
+              "Seyfarth, Scott; " +
+              "Gorman, Kyle; " +
+              "Prichard, Hilary; " +
+              "Yuan, Jiahong; " +
+              "Brickhouse, Christian")
+__email__ = "brickhouse@stanford.edu"
+# should be the person who will fix bugs and make improvements
+__maintainer__ = "Christian Brickhouse"
+__copyright__ = "Copyright 2020, FAVE contributors"
+__license__ = "GPLv3"
+__status__ = "Development"  # Prototype, Development or Production
+# also include contributors that wrote no code
+__credits__ = ["Brandon Waldon"]
+
+# --------------------------------------------------------------------------------
+
+# Import built-in modules first
+# followed by third-party modules
+# followed by any changes to the path
+# your own modules.
+
+import os
+import re
+import collections
+import functools
+import logging
+import numpy as np
+from . import plp
+
+logger = logging.getLogger(__name__)
+
+# tokens of HTK's text MMF format:  keywords in angle brackets (which may
+# follow a number directly, as in "39<NULLD>"), quoted macro names, macro
+# types and numbers
+_TOKEN = re.compile(r'<[^>]*>|"[^"]*"|~[a-zA-Z]|[^\s<>"]+')
+
+# an emitting state:  the means and inverse variances of its mixture
+# components (one row per component) and, for each component, its log
+# weight minus half its GCONST
+State = collections.namedtuple('State', ['means', 'precisions', 'constants'])
+# an HMM:  its emitting states (HTK's states 2 to N-1) and its log
+# transition matrix (N x N, with the non-emitting entry and exit states)
+HMM = collections.namedtuple('HMM', ['states', 'transitions'])
+
+# successor of the last phones of an utterance
+_END = -1
+
+
+class _MMFReader():
+    """reads the macros and HMMs of HTK MMF files in text format (single
+    stream, diagonal covariances)"""
+
+    def __init__(self):
+        self.tokens = []
+        self.position = 0
+        self.macros = {}
+
+    def read(self, filename):
+        with open(filename) as f:
+            self.tokens = _TOKEN.findall(f.read())
+        self.position = 0
+        while self.peek() is not None:
+            token = self.next()
+            if token == '~o':
+                self.options()
+            elif token in ('~v', '~u', '~m', '~s', '~t', '~h'):
+                name = self.next().strip('"')
+                self.macros[(token[1], name)] = {
+                    '~v': lambda: self.vector('<VARIANCE>'),
+                    '~u': lambda: self.vector('<MEAN>'),
+                    '~m': self.gaussian,
+                    '~s': self.state,
+                    '~t': self.transitions,
+                    '~h': self.hmm,
+                }[token]()
+            else:
+                raise ValueError("unsupported HMM definition %s in %s" % (token, filename))
+
+    def peek(self):
+        if self.position < len(self.tokens):
+            return self.tokens[self.position].upper()
+        return None
+
+    def next(self):
+        self.position += 1
+        return self.tokens[self.position - 1]
+
+    def expect(self, keyword):
+        token = self.next()
+        if token.upper() != keyword:
+            raise ValueError("expected %s, found %s" % (keyword, token))
+
+    def numbers(self, n):
+        return np.array([float(self.next()) for _ in range(n)])
+
+    def macro(self, kind):
+        """the value of a macro reference (~<kind> "name")"""
+        self.next()
+        return self.macros[(kind, self.next().strip('"'))]
+
+    def options(self):
+        # only single stream diagonal covariance models are supported
+        while self.peek() is not None and not self.peek().startswith('~'):
+            token = self.next().upper()
+            if token == '<STREAMINFO>' and self.numbers(1)[0] != 1:
+                raise ValueError("multiple streams are not supported")
+            if token in ('<FULLC>', '<LLTC>', '<INVDIAGC>', '<XFORMC>'):
+                raise ValueError("covariance kind %s is not supported" % token)
+
+    def vector(self, keyword):
+        self.expect(keyword)
+        return self.numbers(int(self.next()))
+
+    def gaussian(self):
+        if self.peek() == '~M':
+            return self.macro('m')
+        mean = self.macro('u') if self.peek() == '~U' else self.vector('<MEAN>')
+        variance = self.macro('v') if self.peek() == '~V' else self.vector('<VARIANCE>')
+        if self.peek() == '<GCONST>':
+            self.next()
+            gconst = float(self.next())
+        else:
+            gconst = len(variance) * np.log(2 * np.pi) + np.sum(np.log(variance))
+        return (mean, variance, gconst)
+
+    def state(self):
+        if self.peek() == '~S':
+            return self.macro('s')
+        if self.peek() == '<NUMMIXES>':
+            self.next()
+            self.next()
+        components = []
+        if self.peek() == '<MIXTURE>':
+            while self.peek() == '<MIXTURE>':
+                self.next()
+                self.next()
+                weight = float(self.next())
+                components.append((weight, self.gaussian()))
+        else:
+            components.append((1.0, self.gaussian()))
+        # components with zero weight are never used
+        components = [c for c in components if c[0] > 0]
+        return State(
+            np.array([mean for (_, (mean, _, _)) in components]),
+            np.array([1.0 / variance for (_, (_, variance, _)) in components]),
+            np.array([np.log(weight) - 0.5 * gconst for (weight, (_, _, gconst)) in components]))
+
+    def transitions(self):
+        if self.peek() == '~T':
+            return self.macro('t')
+        self.expect('<TRANSP>')
+        n = int(self.next())
+        with np.errstate(divide='ignore'):
+            return np.log(self.numbers(n * n).reshape(n, n))
+
+    def hmm(self):
+        if self.peek() == '~H':
+            return self.macro('h')
+        self.expect('<BEGINHMM>')
+        # (global options may be repeated here)
+        while self.peek() != '<NUMSTATES>':
+            self.next()
+        self.next()
+        states = [None] * (int(self.next()) - 2)
+        while self.peek() == '<STATE>':
+            self.next()
+            index = int(self.next()) - 2
+            states[index] = self.state()
+        transitions = self.transitions()
+        self.expect('<ENDHMM>')
+        return HMM(states, transitions)
+
+
+@functools.lru_cache(maxsize=None)
+def read_models(*filenames):
+    """reads the HMMs defined in HTK MMF files (e.g. the macros and hmmdefs
+    of a model directory); returns a dict of the HMMs by name"""
+    reader = _MMFReader()
+    for filename in filenames:
+        reader.read(filename)
+    return {name: hmm for ((kind, name), hmm) in reader.macros.items() if kind == 'h'}
+
+
+def read_dictionary(filename):
+    """reads an HTK pronunciation dictionary (like the ones written by
+    CMU_Dictionary.write_dict); returns a dict of the pronunciations (tuples
+    of phones) of each word"""
+    dictionary = {}
+    with open(filename) as f:
+        for line in f:
+            fields = line.split()
+            if not fields:
+                continue
+            phones = fields[1:]
+            # (output symbol)
+            if phones and phones[0].startswith('['):
+                phones = phones[1:]
+            pronunciations = dictionary.setdefault(fields[0], [])
+            if phones and tuple(phones) not in pronunciations:
+                pronunciations.append(tuple(phones))
+    return dictionary
+
+
+def read_mlf(filename):
+    """reads the words of the utterances in a master label file, keyed by
+    the utterance name (e.g. "tmp12" for "*/tmp12.lab")"""
+    utterances = {}
+    words = None
+    with open(filename) as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith('"'):
+                name = os.path.splitext(os.path.basename(line.strip('"')))[0]
+                words = utterances[name] = []
+            elif line == '.':
+                words = None
+            elif words is not None and line:
+                words.append(line.split()[-1])
+    return utterances
+
+
+# number of frames whose output probabilities are computed at once
+BLOCK = 4096
+
+
+def log_likelihoods(features, states):
+    """log output probabilities of the states for each frame of the
+    features; returns an array of shape (frames, states)"""
+    means = np.concatenate([s.means for s in states])
+    precisions = np.concatenate([s.precisions for s in states])
+    constants = np.concatenate([s.constants for s in states])
+    if features.shape[1] != means.shape[1]:
+        raise ValueError("features have %i coefficients, models %i" %
+                         (features.shape[1], means.shape[1]))
+    scaled = (means * precisions).T
+    offsets = constants - 0.5 * np.sum(means * means * precisions, axis=1)
+    first = np.cumsum([0] + [len(s.constants) for s in states[:-1]])
+    result = np.empty((len(features), len(states)))
+    # log densities of all mixture components of all states at once, for a
+    # block of frames at a time (so that long utterances need little memory)
+    for block in range(0, len(features), BLOCK):
+        frames = features[block:block + BLOCK]
+        components = offsets - 0.5 * ((frames * frames) @ precisions.T) + frames @ scaled
+        result[block:block + BLOCK] = np.logaddexp.reduceat(components, first, axis=1)
+    return result
+
+
+def network(words, dictionary, models):
+    """the phones of the network of an utterance:  every pronunciation of a
+    word can follow every pronunciation of the word before it.  Returns the
+    model name, word label (for the first phone of a word, else None) and
+    successors of each phone, and the phones the utterance can start with;
+    phones are numbered in order, the end of the utterance is _END"""
+    phones = []
+    labels = []
+    successors = []
+    start = []
+    last = None
+    for word in words:
+        if not dictionary.get(word):
+            raise ValueError("no pronunciation for %s" % word)
+        (firsts, lasts) = ([], [])
+        for pronunciation in dictionary[word]:
+            firsts.append(len(phones))
+            for (k, phone) in enumerate(pronunciation):
+                if phone not in models:
+                    raise ValueError("no model for phone %s" % phone)
+                phones.append(phone)
+                labels.append(word if k == 0 else None)
+                successors.append([len(phones)] if k < len(pronunciation) - 1 else [])
+            lasts.append(len(phones) - 1)
+        if last is None:
+            start = firsts
+        else:
+            for phone in last:
+                successors[phone].extend(firsts)
+        last = lasts
+    for phone in last or []:
+        successors[phone].append(_END)
+    return phones, labels, successors, start
+
+
+def _compile(phones, successors, start, models):
+    """compiles the phone network into transitions between emitting states
+    only (so that phones with a transition from their entry to their exit
+    state, like "sp", can be skipped).  Returns the phone of each state and
+    a dict of (log probability, skipped phones) for the initial states, for
+    the transitions into each state (by previous state) and for the final
+    states"""
+    offsets = np.cumsum([0] + [len(models[p].states) for p in phones])
+    # where the network can continue (state or _END) after each phone
+    follow = [None] * len(phones)
+
+    def add(targets, target, score, skipped):
+        if target not in targets or targets[target][0] < score:
+            targets[target] = (score, skipped)
+
+    def entries(phone):
+        transitions = models[phones[phone]].transitions
+        targets = {}
+        for j in range(1, len(transitions) - 1):
+            if np.isfinite(transitions[0, j]):
+                add(targets, offsets[phone] + j - 1, transitions[0, j], ())
+        if np.isfinite(transitions[0, -1]):
+            for (target, (score, skipped)) in follow[phone].items():
+                add(targets, target, transitions[0, -1] + score, (phone,) + skipped)
+        return targets
+
+    def continuations(nexts):
+        targets = {}
+        for phone in nexts:
+            if phone == _END:
+                add(targets, _END, 0.0, ())
+                continue
+            for (target, (score, skipped)) in enter[phone].items():
+                add(targets, target, score, skipped)
+        return targets
+
+    # successors always come later in the network
+    enter = [None] * len(phones)
+    for phone in reversed(range(len(phones))):
+        follow[phone] = continuations(successors[phone])
+        enter[phone] = entries(phone)
+
+    state_phones = np.repeat(np.arange(len(phones)), np.diff(offsets))
+    incoming = [{} for _ in range(offsets[-1])]
+    final = {}
+    for (phone, name) in enumerate(phones):
+        transitions = models[name].transitions
+        for i in range(1, len(transitions) - 1):
+            source = offsets[phone] + i - 1
+            for j in range(1, len(transitions) - 1):
+                if np.isfinite(transitions[i, j]):
+                    incoming[offsets[phone] + j - 1][source] = (transitions[i, j], ())
+            if not np.isfinite(transitions[i, -1]):
+                continue
+            for (target, (score, skipped)) in follow[phone].items():
+                if target == _END:
+                    final[source] = (transitions[i, -1] + score, skipped)
+                else:
+                    add(incoming[target], source, transitions[i, -1] + score, skipped)
+    initial = continuations(start)
+    initial.pop(_END, None)
+    return state_phones, initial, incoming, final
+
+
+def viterbi(likelihoods, initial, incoming, final, beam=None):
+    """the most likely state sequence for the log output probabilities
+    (frames x states) and the transitions of a compiled network; returns the
+    states and, for each frame, the index of the transition into it (in the
+    order of incoming) or None if no state sequence ends in a final state.
+    With a beam, state sequences that fall more than beam below the best one
+    at any frame are pruned (like HVite's -t)."""
+    (frames, n) = likelihoods.shape
+    # predecessors and their log probabilities, padded to the same number
+    # for every state
+    width = max(1, max(len(sources) for sources in incoming))
+    previous = np.zeros((n, width), dtype=int)
+    scores = np.full((n, width), -np.inf)
+    for (state, sources) in enumerate(incoming):
+        for (k, (source, (score, _))) in enumerate(sources.items()):
+            previous[state, k] = source
+            scores[state, k] = score
+    delta = np.full(n, -np.inf)
+    for (state, (score, _)) in initial.items():
+        delta[state] = score
+    delta += likelihoods[0]
+    back = np.zeros((frames, n), dtype=np.int32)
+    rows = np.arange(n)
+    for t in range(1, frames):
+        candidates = delta[previous] + scores
+        back[t] = candidates.argmax(axis=1)
+        delta = candidates[rows, back[t]] + likelihoods[t]
+        if beam is not None:
+            delta[delta < delta.max() - beam] = -np.inf
+    ends = np.full(n, -np.inf)
+    for (state, (score, _)) in final.items():
+        ends[state] = score
+    delta = delta + ends
+    state = int(delta.argmax())
+    if not np.isfinite(delta[state]):
+        return None
+    path = [state]
+    arcs = [None] * frames
+    for t in range(frames - 1, 0, -1):
+        arcs[t] = int(back[t, state])
+        state = int(previous[state, arcs[t]])
+        path.append(state)
+    return path[::-1], arcs
+
+
+def align(features, words, dictionary, models, period, likelihoods=None, beam=None):
+    """aligns the words of an utterance with its features; returns the
+    label lines HVite writes for it with the options -a -m (start and end
+    time in 100 ns, phone, score and, for the first phone of a word, the
+    word), or None if it cannot be aligned.  period is the frame period in
+    100 ns; the log output probabilities of the states can be passed as a
+    function of the list of states.  For the beam, see viterbi."""
+    (phones, labels, successors, start) = network(words, dictionary, models)
+    (state_phones, initial, incoming, final) = _compile(phones, successors, start, models)
+    states = [s for p in phones for s in models[p].states]
+    if likelihoods is None:
+        likelihoods = log_likelihoods(features, states)
+    else:
+        likelihoods = likelihoods(states)
+    if not len(likelihoods):
+        return None
+    result = viterbi(likelihoods, initial, incoming, final, beam)
+    if result is None:
+        return None
+    (path, arcs) = result
+
+    lines = []
+
+    def label(phone, first, last, score):
+        lines.append("%i %i %s %f" % (first * period, last * period, phones[phone], score) +
+                     (" " + labels[phone] if labels[phone] else "") + "\n")
+
+    def skip(skipped, t):
+        # skipped phones take no time
+        for phone in skipped:
+            label(phone, t, t, models[phones[phone]].transitions[0, -1])
+
+    skip(initial[path[0]][1], 0)
+    (first, score) = (0, initial[path[0]][0] + likelihoods[0, path[0]])
+    for t in range(1, len(path)):
+        (transition, skipped) = list(incoming[path[t]].values())[arcs[t]]
+        if state_phones[path[t]] != state_phones[path[t - 1]]:
+            label(state_phones[path[t - 1]], first, t, score)
+            skip(skipped, t)
+            (first, score) = (t, 0.0)
+        score += transition + likelihoods[t, path[t]]
+    label(state_phones[path[-1]], first, len(path), score)
+    skip(final[path[-1]][1], len(path))
+    return lines
+
+
+def align_files(mlffile, scpfile, outfile, dictionary_file, model_files, beam=None):
+    """aligns the utterances in the feature files listed in scpfile with
+    their words in mlffile, as HVite -a -m does, and writes the aligned
+    label lines to the master label file outfile; utterances that cannot
+    be aligned (with the beam, see viterbi) are left out.  The utterances
+    are read and aligned one at a time; the output probabilities of the
+    (distinct, as states can be tied) states each utterance can use are
+    computed for all its frames at once."""
+    models = read_models(*model_files)
+    dictionary = read_dictionary(dictionary_file)
+    transcriptions = read_mlf(mlffile)
+    with open(scpfile) as f:
+        feature_files = [line.strip().strip('"') for line in f if line.strip()]
+
+    with open(outfile, 'w') as f:
+        f.write('#!MLF!#\n')
+        for filename in feature_files:
+            try:
+                (features, period, _) = plp.read(filename)
+            except (OSError, ValueError) as err:
+                logger.warning("Could not read %s: %s", filename, err)
+                continue
+            name = os.path.splitext(os.path.basename(filename))[0]
+            try:
+                lines = align(
+                    features, transcriptions[name], dictionary, models, period,
+                    functools.partial(_distinct_likelihoods, features), beam)
+            except (KeyError, ValueError) as err:
+                logger.warning("Could not align %s: %s", filename, err)
+                continue
+            if lines is None:
+                logger.warning("Could not align %s", filename)
+                continue
+            f.write('"' + os.path.splitext(filename)[0] + '.rec"\n')
+            f.write(''.join(lines))
+            f.write('.\n')
+
+
+def _distinct_likelihoods(features, states):
+    """log_likelihoods, computed once for each distinct state"""
+    columns = {}
+    for state in states:
+        columns.setdefault(id(state), (len(columns), state))
+    table = log_likelihoods(features, [state for (_, state) in columns.values()])
+    return table[:, [columns[id(state)][0] for state in states]]
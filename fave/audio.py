@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# *_* coding: utf-8 *_*
+
+"""
+Reading, converting and slicing WAV files with NumPy, so that preparing
+audio for HTK and Praat does not need SoX.
+"""
+
+__version__ = "2.0.0"
+__author__ = ("Rosenfelder, Ingrid; " +  # Only code writers
+              "Fruehwald, Josef; " +
+              "Evanini, Keelan; " +
+              "Seyfarth, Scott; " +
+              "Gorman, Kyle; " +
+              "Prichard, Hilary; " +
+              "Yuan, Jiahong; " +
+              "Brickhouse, Christian")
+__email__ = "brickhouse@stanford.edu"
+# should be the person who will fix bugs and make improvements
+__maintainer__ = "Christian Brickhouse"
+__copyright__ = "Copyright 2020, FAVE contributors"
+__license__ = "GPLv3"
+__status__ = "Development"  # Prototype, Development or Production
+# also include contributors that wrote no code
+__credits__ = ["Brandon Waldon"]
+
+# --------------------------------------------------------------------------------
+
+# Import built-in modules first
+# followed by third-party modules
+# followed by any changes to the path
+# your own modules.
+
+import math
+import wave
+import numpy as np
+
+# number of zero crossings of the sinc on either side of the resampling filter,
+# the shape parameter of its Kaiser window, and its cutoff (as a fraction of
+# the lower Nyquist frequency, leaving room for the transition band)
+FILTER_ZEROS = 32
+KAISER_BETA = 8.6
+CUTOFF = 0.95
+# number of frames converted at a time by load
+BLOCK = 1 << 19
+
+
+def read(filename):
+    """reads a PCM WAV file; returns the samples as an integer array of
+    shape (frames, channels) and the sampling rate
+
+    Raises wave.Error for files the wave module cannot read (e.g. floating
+    point WAV files)."""
+    with wave.open(filename, 'rb') as f:
+        params = f.getparams()
+        frames = f.readframes(params.nframes)
+    return _decode(frames, params.sampwidth, params.nchannels), params.framerate
+
+
+def load(filename, rate=None, mono=True):
+    """reads a PCM WAV file and converts it to 16-bit samples at the given
+    sampling rate, mixed down to one channel if mono is set; returns an
+    int16 array of shape (frames,) for mono, (frames, channels) otherwise.
+    The file is converted BLOCK frames at a time, so that converting a long
+    recording takes little more memory than the result."""
+    with wave.open(filename, 'rb') as f:
+        params = f.getparams()
+        if (params.sampwidth == 2 and (rate is None or rate == params.framerate)
+                and (params.nchannels == 1 or not mono)):
+            # fast path:  nothing to convert
+            frames = f.readframes(params.nframes)
+            samples = np.frombuffer(frames, dtype='<i2').reshape(-1, params.nchannels)
+            return samples[:, 0] if mono else samples
+
+        def portion(first, last):
+            # frames first to last, in single precision floating point on
+            # the scale of 16-bit samples
+            f.setpos(first)
+            samples = _decode(f.readframes(last - first), params.sampwidth, params.nchannels)
+            samples = samples.astype(np.float32) * np.float32(2.0 ** (16 - 8 * params.sampwidth))
+            return mix(samples) if mono else samples
+
+        shape = () if mono else (params.nchannels,)
+        if rate is None or rate == params.framerate:
+            out = np.empty((params.nframes,) + shape, dtype='<i2')
+            for first in range(0, params.nframes, BLOCK):
+                last = min(first + BLOCK, params.nframes)
+                out[first:last] = to_int16(portion(first, last))
+            return out
+        (up, down) = _ratio(params.framerate, rate)
+        h = _lowpass(up, down)
+        n_out = -(-params.nframes * up // down)
+        out = np.empty((n_out,) + shape, dtype='<i2')
+        for start in range(0, n_out, BLOCK):
+            end = min(start + BLOCK, n_out)
+            # the input frames under the filter for these output frames
+            (first, last) = _support(h, up, down, start, end)
+            (first, last) = (max(first, 0), min(last, params.nframes))
+            out[start:end] = to_int16(_resample(
+                portion(first, last), first, up, down, h, start, end))
+    return out
+
+
+def mix(samples):
+    """averages the channels of an array of shape (frames, channels)"""
+    if samples.ndim == 1:
+        return samples
+    if samples.shape[1] == 1:
+        return samples[:, 0].astype(float)
+    return samples.mean(axis=1)
+
+
+def resample(samples, rate_in, rate_out):
+    """resamples a signal (along its first axis) from rate_in to rate_out with
+    a polyphase Kaiser-windowed sinc filter"""
+    (up, down) = _ratio(rate_in, rate_out)
+    samples = np.asarray(samples, dtype=float)
+    if up == down:
+        return samples.copy()
+    n_out = -(-samples.shape[0] * up // down)
+    return _resample(samples, 0, up, down, _lowpass(up, down), 0, n_out)
+
+
+def _ratio(rate_in, rate_out):
+    """the factors (up, down) of resampling from rate_in to rate_out"""
+    g = math.gcd(int(rate_in), int(rate_out))
+    return int(rate_out) // g, int(rate_in) // g
+
+
+def _support(h, up, down, start, end):
+    """the input frames (first, last + 1) under the filter h for the output
+    frames start to end - 1 (output n sits at position n * down + half of
+    the upsampled signal, whose last input frame under the filter is
+    position // up)"""
+    half = (len(h) - 1) // 2
+    taps = -(-len(h) // up)
+    return ((start * down + half) // up - taps + 1, ((end - 1) * down + half) // up + 1)
+
+
+def _resample(x, offset, up, down, h, start, end):
+    """the output frames start to end - 1 of resampling by up/down with the
+    filter h, from the input frames offset to offset + len(x) - 1 (all others
+    being zero)"""
+    half = (len(h) - 1) // 2
+    (first, last) = _support(h, up, down, start, end)
+    # the input under the filter, padded with zeros
+    padded = np.zeros((last - first,) + x.shape[1:], dtype=x.dtype)
+    (a, b) = (max(first, offset), min(last, offset + len(x)))
+    if a < b:
+        padded[a - first:b - first] = x[a - offset:b - offset]
+    out = np.empty((end - start,) + x.shape[1:], dtype=x.dtype)
+    # all outputs with the same n % up use the same phase of the filter
+    for r in range(min(up, end - start)):
+        k = np.arange(r, end - start, up)
+        position = (start + k) * down + half  # in the upsampled, filtered signal
+        # the input frames under the filter (from the last one back) advance
+        # by down frames from one output of the group to the next
+        coefficients = h[position[0] % up::up].astype(x.dtype)
+        base = position[0] // up - first - len(coefficients) + 1
+        windows = np.lib.stride_tricks.as_strided(
+            padded[base:], shape=(len(k), len(coefficients)) + x.shape[1:],
+            strides=(down * padded.strides[0],) + padded.strides, writeable=False)
+        out[k] = np.tensordot(windows, coefficients[::-1], axes=([1], [0]))
+    return out
+
+
+def to_int16(samples):
+    """rounds and clips floating point samples to 16-bit integers"""
+    return np.clip(np.rint(samples), -32768, 32767).astype('<i2')
+
+
+def write(filename, samples, rate):
+    """writes 16-bit samples of shape (frames,) or (frames, channels) to a PCM
+    WAV file that HTK and Praat can read"""
+    samples = np.asarray(samples, dtype='<i2')
+    with wave.open(filename, 'wb') as f:
+        f.setnchannels(1 if samples.ndim == 1 else samples.shape[1])
+        f.setsampwidth(2)
+        f.setframerate(int(rate))
+        f.writeframes(samples.tobytes())
+
+
+def convert(infile, outfile, rate, mono=True):
+    """converts a WAV file to 16-bit samples at the given sampling rate
+    (mono by default); returns the sampling rate"""
+    write(outfile, load(infile, rate, mono), rate)
+    return rate
+
+
+def extract(infile, outfile, beg, end):
+    """copies the portion between beg and end (in seconds) of a WAV file to
+    a new file, without changing the sample format"""
+    with wave.open(infile, 'rb') as f:
+        params = f.getparams()
+        first = min(max(int(round(beg * params.framerate)), 0), params.nframes)
+        last = min(max(int(round(end * params.framerate)), first), params.nframes)
+        f.setpos(first)
+        frames = f.readframes(last - first)
+    with wave.open(outfile, 'wb') as f:
+        f.setnchannels(params.nchannels)
+        f.setsampwidth(params.sampwidth)
+        f.setframerate(params.framerate)
+        f.writeframes(frames)
+
+
+def pauses(samples, rate, min_pause=0.15, window=0.01):
+    """finds the pauses in a mono signal:  stretches of at least min_pause
+    seconds in which the energy of every window (in seconds) is low, i.e.
+    closer to the quiet than to the loud parts of the signal (the 10th and
+    90th percentiles of the energies of all windows, in dB).  Returns an
+    array of the start and end of each pause in seconds, shape (pauses, 2)"""
+    size = max(1, int(round(window * rate)))
+    n = len(samples) // size
+    if n == 0:
+        return np.zeros((0, 2))
+    frames = np.asarray(samples[:n * size], dtype=float).reshape(n, size)
+    energy = 10 * np.log10(np.mean(frames * frames, axis=1) + 1.0)
+    (low, high) = np.percentile(energy, [10, 90])
+    quiet = np.concatenate([[False], energy < low + (high - low) / 3, [False]])
+    # runs of quiet windows
+    edges = np.flatnonzero(np.diff(quiet.astype(int)))
+    (starts, ends) = (edges[0::2], edges[1::2])
+    long_enough = (ends - starts) * size >= min_pause * rate
+    return np.stack([starts[long_enough], ends[long_enough]], axis=1) * size / rate
+
+
+def _decode(frames, sampwidth, nchannels):
+    """converts raw little-endian PCM frames to an integer array of shape
+    (frames, channels)"""
+    if sampwidth == 1:  # 8-bit WAV is unsigned
+        samples = np.frombuffer(frames, dtype='u1').astype('i2') - 128
+    elif sampwidth == 2:
+        samples = np.frombuffer(frames, dtype='<i2')
+    elif sampwidth == 3:
+        raw = np.frombuffer(frames, dtype='u1').reshape(-1, 3).astype('<i4')
+        samples = (raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)) << 8 >> 8
+    elif sampwidth == 4:
+        samples = np.frombuffer(frames, dtype='<i4')
+    else:
+        raise wave.Error("unsupported sample width: %d" % sampwidth)
+    return samples.reshape(-1, nchannels)
+
+
+def _lowpass(up, down):
+    """Kaiser-windowed sinc lowpass filter for resampling by up/down, designed
+    at the upsampled rate (gain up, to make up for the inserted zeros), with
+    its cutoff at CUTOFF of the lower Nyquist frequency"""
+    ratio = max(up, down)
+    half = FILTER_ZEROS * ratio
+    t = np.arange(-half, half + 1) / ratio
+    return np.sinc(CUTOFF * t) * np.kaiser(2 * half + 1, KAISER_BETA) * CUTOFF * up / ratio
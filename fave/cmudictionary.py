@@ -32,7 +32,12 @@ __credits__ = ["Brandon Waldon"]
 
 import re
 import os
+import sys
 import logging
+import mmap
+import struct
+from functools import lru_cache
+from collections.abc import MutableMapping
 
 
 class CMU_Dictionary():
@@ -87,6 +92,9 @@ class CMU_Dictionary():
         'UW']
     # file for collecting uploaded additions to the dictionary
     DICT_ADDITIONS = "added_dict_entries.txt"
+    # entries for silence and noise that the aligner may need besides the
+    # words of the transcription
+    SPECIAL_ENTRIES = ["sp", "sil", "{NS}", "{BR}", "{CG}", "{LG}", "{LS}"]
     STYLE_ENTRIES = [
         "R",
         "N",
@@ -117,14 +125,11 @@ class CMU_Dictionary():
             Whether this is an alignment or transcript check.
         """
         self.logger = logging.getLogger(__name__)
-        logging.basicConfig(
-            format='%(levelname)s:%(message)s',
-            level=kwargs['verbose'])
 
         self.__config_flags(**kwargs)
 
         self.dict_dir = dictionary_file
-        self.cmu_dict = self.read(dictionary_file)
+        self.cmu_dict = self.read(dictionary_file, snapshot=True)
         # check that cmudict has entries
         if len(self.cmu_dict) == 0:
             self.logger.warning('Dictionary %s is empty', dictionary_file)
@@ -148,28 +153,46 @@ class CMU_Dictionary():
         except KeyError:
             self.logger.debug('No check argument; default to false.')
 
-    def read(self, dictionary_file):
+    def read(self, dictionary_file, snapshot=False):
         """
         @author Keelan Evanini
+
+        If snapshot is set, the dictionary is loaded from a compiled snapshot
+        next to dictionary_file (see CompiledDictionary), which is created
+        or brought up to date first if necessary.  If the snapshot cannot be
+        written, the compiled dictionary is kept in memory instead.
         """
+        if snapshot:
+            cmu_dict = CompiledDictionary.load(dictionary_file)
+            if cmu_dict is not None:
+                self.logger.info(f'Read compiled snapshot of dictionary {dictionary_file}')
+                return cmu_dict
         self.logger.info(f'Reading dictionary from {dictionary_file}')
         cmu_dict = {}
         pat = re.compile('  *')  # two spaces separating CMU dict entries
         # CMU dictionary should be converted to a unicode format
         with open(dictionary_file, 'r', encoding="latin1") as cmu_dict_file:
-            for line in cmu_dict_file.readlines():
+            for line in cmu_dict_file:
                 line = line.rstrip()
-                line = re.sub(pat, ' ', line)  # reduce all spaces to one
-                self.logger.debug(f'Dictionary line: {line}')
-                word = line.split(' ')[0]  # orthographic transcription
-                self.logger.debug(f'Word: {str(word)}')
-                phones = line.split(' ')[1:]  # phonemic transcription
-                self.logger.debug(f'Phones: {str(phones)}')
+                line = pat.sub(' ', line).split(' ')  # reduce all spaces to one
+                word = line[0]  # orthographic transcription
+                phones = line[1:]  # phonemic transcription
                 if word not in cmu_dict:
-                    cmu_dict[word] = []
-                if phones not in cmu_dict[word]:
+                    cmu_dict[word] = [phones]
+                elif phones not in cmu_dict[word]:
                     # add pronunciation to list of pronunciations
                     cmu_dict[word].append(phones)
+        if snapshot:
+            try:
+                data = CompiledDictionary.compile(dictionary_file, cmu_dict)
+            except ValueError as err:
+                self.logger.debug(f'Could not compile dictionary: {err}')
+                return cmu_dict
+            try:
+                CompiledDictionary.save(dictionary_file, data)
+            except OSError as err:
+                self.logger.debug(f'Could not write dictionary snapshot: {err}')
+            return CompiledDictionary(data)
         return cmu_dict
 
     def add_dictionary_entries(self, infile, path='.'):
@@ -179,6 +202,7 @@ class CMU_Dictionary():
         @param string infile
         @param string path
         @raises IndexError
+        @returns dict of the entries added (see add_entries)
         """
 
         cmu_dict = self.cmu_dict
@@ -209,14 +233,16 @@ class CMU_Dictionary():
                 # word might be in dict but transcriber might want to add
                 # alternative pronunciation
             else:
+                prons = cmu_dict[word]
                 for t in transcriptions:
                     # check that new transcription is not already in dictionary
-                    if t not in cmu_dict[word]:
-                        cmu_dict[word].append(t)
+                    if t not in prons:
+                        prons.append(t)
                     if word not in add_dict:
                         add_dict[word] = []
                     if t not in add_dict[word]:
                         add_dict[word].append(t)
+                cmu_dict[word] = prons
 
         if self.verbose:
             self.logger.debug(
@@ -237,6 +263,21 @@ class CMU_Dictionary():
             self.logger.debug(
                 "Added new entries from file %s to file %s.",
                 os.path.basename(infile), self.DICT_ADDITIONS)
+        return add_dict
+
+    def add_entries(self, entries):
+        """adds the pronunciations of entries (a dict of lists of
+        pronunciations by word) to the dictionary in memory, as
+        add_dictionary_entries does, but without writing any file"""
+        for (word, transcriptions) in entries.items():
+            if word not in self.cmu_dict:
+                self.cmu_dict[word] = list(transcriptions)
+                continue
+            prons = self.cmu_dict[word]
+            for t in transcriptions:
+                if t not in prons:
+                    prons.append(t)
+            self.cmu_dict[word] = prons
 
     def check_transcription(self, transcription):
         """checks that the transcription entered for a word conforms to the Arpabet style"""
@@ -336,7 +377,7 @@ class CMU_Dictionary():
         inDict = bool(self.__check_word(word, next_word))
 
         cmudict = self.cmu_dict
-        clue = next_word.strip().lstrip('+').upper()
+        clue = self.clue(next_word)
 
         if not inDict and word not in self.STYLE_ENTRIES:
             # don't do anything if word itself is a clue word
@@ -377,7 +418,9 @@ class CMU_Dictionary():
                             if not inDict:
                                 self.cmu_dict[word] = []
                             if new_transcription not in cmudict[gword]:
-                                self.cmu_dict[word].append(new_transcription)
+                                prons = self.cmu_dict[word]
+                                prons.append(new_transcription)
+                                self.cmu_dict[word] = prons
                     return unknown
             # if "check transcription" option is selected, add word to list of
             # unknown words
@@ -386,7 +429,7 @@ class CMU_Dictionary():
                     self.logger.info(f"Unknown word '{word}'")
                 else:
                     self.logger.warning(f"Unknown word '{word}'")
-                unknown[word] = ("", clue.lstrip('+'), line)
+                unknown[word] = ("", clue, line)
                 return unknown
         if word in self.STYLE_ENTRIES:
             self.logger.info(f"Style entry: {word}")
@@ -396,6 +439,11 @@ class CMU_Dictionary():
             self.logger.warning(f"No transcription for '{word}'")
         return unknown
 
+    @staticmethod
+    def clue(next_word):
+        """returns the clue recorded for an unknown word from the word after it"""
+        return next_word.strip().lstrip('+').upper()
+
     @staticmethod
     def merge_dicts(d1, d2):
         """merges two versions of the CMU pronouncing dictionary"""
@@ -412,33 +460,29 @@ class CMU_Dictionary():
                         d1[word].append(t)
         return d1
 
-    def write_dict(self, fname, dictionary=None):
-        """writes the new version of the CMU dictionary (or any other dictionary) to file"""
+    def write_dict(self, fname, dictionary=None, words=None):
+        """writes the new version of the CMU dictionary (or any other dictionary) to file;
+        if words is given, only the entries for those words are written"""
 
         # default functionality is to write the CMU pronunciation dictionary back to file,
         # but other dictionaries or parts of dictionaries can also be
         # written/appended
         if not dictionary:
             dictionary = self.cmu_dict
-        out_string = ''
+        if words is None:
+            words = dictionary
+        lines = []
         # sort dictionary before writing to file
-        keys = sorted(dictionary)
-        # self.logger.debug(keys)
-        for word in keys:
+        for word in sorted(w for w in words if w in dictionary):
             # make a separate entry for each pronunciation in case of
             # alternative entries
-            if len(dictionary[word]) < 1:
-                continue
             for transcription in dictionary[word]:
                 # two spaces separating CMU dict entries from phonetic
-                # transcriptions
-                out_string += word + '  '
-                for phone in transcription:
-                    out_string += phone + ' '  # list of phones, separated by spaces
-                out_string += '\n'  # end of entry line
+                # transcriptions, phones separated by spaces
+                lines.append(word + '  ' + ''.join([phone + ' ' for phone in transcription]) + '\n')
 
         with open(fname, 'w') as f:
-            f.write(out_string)
+            f.write(''.join(lines))
 
     @staticmethod
     def _write_words(unknown):
@@ -463,6 +507,186 @@ class CMU_Dictionary():
         with open(fname, 'w') as f:
             f.write(self._write_words(unknown))
 
+class CompiledDictionary(MutableMapping):
+    """
+    A compact, read-only image of a pronunciation dictionary, saved next to
+    the dictionary file as <dictionary file>.snapshot.  Phones are interned
+    as small integers:  each word's pronunciations are stored as one byte
+    per phone (with 0 between pronunciations) in a single buffer, found
+    through tables of offsets, and the sorted words are stored the same way.
+    The snapshot is memory mapped, so loading it reads no entries and forked
+    workers share its pages; words are found by binary search and their
+    pronunciations are decoded only when they are looked up, and the most
+    recent lookups are cached.  Changes are kept in memory on top of the
+    image; the lists returned by a lookup are new every time, so a changed
+    entry has to be assigned back.
+    """
+    SUFFIX = ".snapshot"
+    MAGIC = b"FAVEDICT"
+    VERSION = 2
+    # magic, version, mtime (ns) and size of the dictionary file, number of
+    # words, size of the phone table
+    HEADER = struct.Struct('<8sIqqII')
+    # phone ids are single bytes; 0 separates pronunciations
+    MAX_PHONES = 255
+    # the offsets are little-endian 32-bit integers:  on hosts with the same
+    # native unsigned ints they are read in place, on others decoded
+    NATIVE_OFFSETS = sys.byteorder == 'little' and struct.calcsize('I') == 4
+    # number of decoded lookups kept
+    CACHE_SIZE = 4096
+
+    def __init__(self, data):
+        (_, _, _, _, n, phone_table) = self.HEADER.unpack_from(data)
+        self.__data = data
+        self.__n = n
+        start = self.HEADER.size
+        if self.NATIVE_OFFSETS:
+            offsets = memoryview(data)[start:start + 8 * (n + 1)].cast('I')
+        else:
+            offsets = struct.unpack_from('<%dI' % (2 * (n + 1)), data, start)
+        self.__word_offsets = offsets[:n + 1]
+        self.__pron_offsets = offsets[n + 1:]
+        start += 8 * (n + 1)
+        phones = bytes(data[start:start + phone_table]).decode('latin1')
+        self.__phones = (None,) + tuple(phones.split('\n') if phones else ())
+        self.__changed = {}  # added or changed entries
+        self.__added = set()  # words of self.__changed that are not in the image
+        self.__deleted = set()  # words of the image that have been deleted
+        self.__lookup = lru_cache(maxsize=self.CACHE_SIZE)(self.__decode)
+
+    def __word(self, i):
+        return self.__data[self.__word_offsets[i]:self.__word_offsets[i + 1]]
+
+    def __find(self, word):
+        """returns the index of word in the image, or None"""
+        try:
+            key = word.encode('latin1')
+        except (UnicodeEncodeError, AttributeError):
+            return None
+        lo, hi = 0, self.__n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.__word(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.__n and self.__word(lo) == key:
+            return lo
+        return None
+
+    def __decode(self, word):
+        """returns the pronunciations of word in the image as tuples, or None"""
+        i = self.__find(word)
+        if i is None:
+            return None
+        phones = self.__phones
+        blob = self.__data[self.__pron_offsets[i]:self.__pron_offsets[i + 1]]
+        return tuple(tuple(phones[p] for p in pron) for pron in blob.split(b'\0'))
+
+    def __getitem__(self, word):
+        if word in self.__changed:
+            return self.__changed[word]
+        prons = self.__lookup(word) if word not in self.__deleted else None
+        if prons is None:
+            raise KeyError(word)
+        return [list(pron) for pron in prons]
+
+    def __setitem__(self, word, prons):
+        if word not in self.__changed and (word in self.__deleted or self.__find(word) is None):
+            self.__added.add(word)
+        self.__changed[word] = prons
+
+    def __delitem__(self, word):
+        if word not in self:
+            raise KeyError(word)
+        self.__changed.pop(word, None)
+        if word in self.__added:
+            self.__added.discard(word)
+        else:
+            self.__deleted.add(word)
+
+    def __contains__(self, word):
+        if word in self.__changed:
+            return True
+        return word not in self.__deleted and self.__lookup(word) is not None
+
+    def __iter__(self):
+        for i in range(self.__n):
+            word = self.__word(i).decode('latin1')
+            if word not in self.__deleted:
+                yield word
+        yield from self.__added
+
+    def __len__(self):
+        return self.__n - len(self.__deleted) + len(self.__added)
+
+    @classmethod
+    def __stamp(cls, dictionary_file):
+        """identifies the version of the dictionary file an image is made from"""
+        stat = os.stat(dictionary_file)
+        return (cls.MAGIC, cls.VERSION, stat.st_mtime_ns, stat.st_size)
+
+    @classmethod
+    def compile(cls, dictionary_file, dictionary):
+        """returns the compact image of dictionary (as read from
+        dictionary_file); raises ValueError if it uses too many phones"""
+        ids = {}
+        words = []
+        prons = []
+        word_offsets = [0]
+        pron_offsets = [0]
+        for word in sorted(dictionary):
+            blob = bytearray()
+            for k, pron in enumerate(dictionary[word]):
+                if k:
+                    blob.append(0)
+                for phone in pron:
+                    if phone not in ids:
+                        ids[phone] = len(ids) + 1
+                        if ids[phone] > cls.MAX_PHONES:
+                            raise ValueError("more than %d different phones" % cls.MAX_PHONES)
+                    blob.append(ids[phone])
+            words.append(word.encode('latin1'))
+            prons.append(bytes(blob))
+            word_offsets.append(word_offsets[-1] + len(words[-1]))
+            pron_offsets.append(pron_offsets[-1] + len(prons[-1]))
+        phones = '\n'.join(ids).encode('latin1')
+        # offsets are absolute positions in the image
+        start = cls.HEADER.size + 4 * (len(word_offsets) + len(pron_offsets)) + len(phones)
+        word_offsets = [start + o for o in word_offsets]
+        pron_offsets = [word_offsets[-1] + o for o in pron_offsets]
+        return b''.join([
+            cls.HEADER.pack(*cls.__stamp(dictionary_file), len(words), len(phones)),
+            struct.pack('<%dI' % len(word_offsets), *word_offsets),
+            struct.pack('<%dI' % len(pron_offsets), *pron_offsets),
+            phones] + words + prons)
+
+    @classmethod
+    def load(cls, dictionary_file):
+        """returns the snapshot of dictionary_file, or None if there is no
+        snapshot or it is out of date"""
+        try:
+            with open(str(dictionary_file) + cls.SUFFIX, 'rb') as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if len(data) < cls.HEADER.size or \
+                    cls.HEADER.unpack_from(data)[:4] != cls.__stamp(dictionary_file):
+                data.close()
+                return None
+        except (OSError, ValueError):
+            return None
+        return cls(data)
+
+    @classmethod
+    def save(cls, dictionary_file, data):
+        """writes the compiled image data of dictionary_file to its snapshot"""
+        snapshot = str(dictionary_file) + cls.SUFFIX
+        temp = snapshot + '.%d' % os.getpid()
+        with open(temp, 'wb') as f:
+            f.write(data)
+        # replace atomically, in case another process is reading it
+        os.replace(temp, snapshot)
+
+
 #
 # !!! This is NOT the original cmu.py file !!!             ##
 #
@@ -73,6 +73,7 @@ import pkg_resources
 import csv
 import pickle
 import subprocess
+import wave
 from itertools import tee, islice
 from bisect import bisect_left
 
@@ -85,6 +86,7 @@ from fave.extract import esps
 from fave.extract import plotnik
 from fave.extract import vowel
 from fave import praat
+from fave import audio
 from fave import cmudictionary as cmu
 from fave.extract.remeasure import remeasure
 from fave.extract.mahalanobis import mahalanobis
@@ -564,6 +566,13 @@ def detectMonophthong(formants, measurementPoint, index):
 def extractPortion(wavFile, vowelWavFile, beg, end, soundEditor):
     """extracts a single vowel (or any other part) from the main sound file"""
 
+    # copy the samples directly if the wave module can read the file;
+    # SoX or Praat are only needed for other formats
+    try:
+        audio.extract(wavFile, os.path.join(SCRIPTS_HOME, vowelWavFile), beg, end)
+        return
+    except (wave.Error, EOFError):
+        pass
     if soundEditor == 'sox':  # this is the default setting, since it's faster
         # force output format because there have been issues with some sound
         # files where Praat could not read the extracted portion
@@ -884,21 +893,21 @@ def getVowelMeasurement(vowelFileStem, p, w, speechSoftware, formantPredictionMe
             nFormants = 3
             while nFormants <= 6:
                 os.system(os.path.join(PRAATPATH, PRAATNAME) + ' ' + os.path.join(SCRIPTS_HOME, 'extractFormants.praat') + ' ' +
-                          vowelWavFile + ' ' + str(nFormants) + ' ' + str(maxFormant) + ' ' ' ' + str(windowSize) + ' ' + str(preEmphasis) + ' burg')
+                          vowelWavFile + ' ' + str(nFormants) + ' ' + str(maxFormant) + ' ' ' ' + str(windowSize) + ' ' + str(preEmphasis) + ' burg ' + praatFormat)
                 lpc = praat.Formant()
                 lpc.read(os.path.join(SCRIPTS_HOME, vowelFileStem + '.Formant'))
                 LPCs.append(lpc)
                 nFormants += 1
         else:
             os.system(os.path.join(PRAATPATH, PRAATNAME) + ' ' + os.path.join(SCRIPTS_HOME, 'extractFormants.praat') + ' ' +
-                      vowelWavFile + ' ' + str(nFormants) + ' ' + str(maxFormant) + ' ' + str(windowSize) + ' ' + str(preEmphasis) + ' burg')
+                      vowelWavFile + ' ' + str(nFormants) + ' ' + str(maxFormant) + ' ' + str(windowSize) + ' ' + str(preEmphasis) + ' burg ' + praatFormat)
             fmt = praat.Formant()
             fmt.read(os.path.join(SCRIPTS_HOME, vowelFileStem + '.Formant'))
         os.remove(os.path.join(SCRIPTS_HOME, vowelFileStem + '.Formant'))
         # get Intensity object for intensity cutoff
         # (only for those vowels where we need it)
         if (p.label[:-1] in ["AY", "EY", "OW", "AW"]) or (p.label[:-1] == "UW" and p.cd == "73"):
-            os.system(os.path.join(PRAATPATH, PRAATNAME) + ' ' + os.path.join(SCRIPTS_HOME, 'getIntensity.praat') + ' ' + vowelWavFile)
+            os.system(os.path.join(PRAATPATH, PRAATNAME) + ' ' + os.path.join(SCRIPTS_HOME, 'getIntensity.praat') + ' ' + vowelWavFile + ' ' + praatFormat)
             intensity = praat.Intensity()
             intensity.read(os.path.join(SCRIPTS_HOME, vowelFileStem + '.Intensity'))
             os.remove(os.path.join(SCRIPTS_HOME, vowelFileStem + '.Intensity'))
@@ -1814,6 +1823,8 @@ def setup_parser():
     parser.add_argument("--onlyMeasureStressed", action="store_true")
     parser.add_argument("--outputFormat",   "-o",  choices = ['txt', 'text', 'plotnik', 'Plotnik', 'plt', 'both'], default="txt",
                         help = "Output format. Tab delimited file, plotnik file, or both.")
+    parser.add_argument("--praatFormat", choices = ['text', 'binary'], default="text",
+                        help="File format for the Formant and Intensity objects passed from Praat (Praat writes binary files much faster than text files).")
     parser.add_argument("--preEmphasis", type=float, default=50,
                         help="The cut-off value in Hz for the application of a 6 dB/octave low-pass filter.")
     parser.add_argument("--phoneset", "-p",  default = pkg_resources.resource_filename('fave.extract', 'config/cmu_phoneset.txt'))
@@ -2029,6 +2040,7 @@ def writeLog(filename, wavFile, maxTime, meansFile, covsFile, opts):
     f.write("- windowSize:\t\t\t%.3f\n" % opts.windowSize)
     f.write("- preEmphasis:\t\t\t%i\n" % opts.preEmphasis)
     f.write("- speechSoftware:\t\t%s\n" % opts.speechSoftware)
+    f.write("- praatFormat:\t\t\t%s\n" % opts.praatFormat)
     f.write("- outputFormat:\t\t\t%s\n" % opts.outputFormat)
     f.write("- outputHeader:\t\t\t%s\n" % (not opts.noOutputHeader))
     f.write("- case:\t\t\t\t%s\n" % opts.case)
@@ -2122,6 +2134,7 @@ def extractFormants(wavInput, tgInput, output, opts, SPATH='', PPATH=''):
     # necessary
     global case, outputHeader, outputFormat, formantPredictionMethod, measurementMethod, measurementPointMethod, nFormants#, maxFormant
     global nSmoothing, removeStopWords, measureUnstressed, minVowelDuration, windowSize, preEmphasis, multipleFiles, remeasurement, candidates, vowelSystem, tracks
+    global praatFormat
     case = opts.case
     outputFormat = opts.outputFormat
     outputHeader = not opts.noOutputHeader
@@ -2137,6 +2150,7 @@ def extractFormants(wavInput, tgInput, output, opts, SPATH='', PPATH=''):
     minVowelDuration = opts.minVowelDuration
     windowSize = opts.windowSize
     preEmphasis = opts.preEmphasis
+    praatFormat = opts.praatFormat
     multipleFiles = opts.multipleFiles
     remeasurement = opts.remeasurement
     candidates = opts.candidates
@@ -2192,8 +2206,10 @@ def extractFormants(wavInput, tgInput, output, opts, SPATH='', PPATH=''):
 
         # load the information from the TextGrid file with the word and phone
         # alignments
+        # (tiers are only parsed once they are accessed, so the phone tiers
+        # of all other speakers are never read)
         tg = praat.TextGrid()
-        tg.read(tgFile)
+        tg.read(tgFile, lazy=True)
         if opts.speaker:
             speaker = readSpeakerFile(opts.speaker)
             print("Read speaker background information from .speaker file.")
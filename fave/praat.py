@@ -12,6 +12,12 @@
 # - improved reading of long TextGrid format                                         ##
 #
 
+import logging
+import struct
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
 
 class Formant:
 
@@ -64,8 +70,11 @@ class Formant:
         return self.__bandwidths
 
     def read(self, file):
-        """reads Formant from Praat .Formant file (either short or long file format)"""
-        text = open(file, 'rU')
+        """reads Formant from Praat .Formant file (short or long text format, or binary format)"""
+        if _is_binary(file):
+            self.__read_binary(file)
+            return
+        text = open(file, 'r')
         text.readline()  # header
         text.readline()
         text.readline()
@@ -148,6 +157,47 @@ class Formant:
         self.__nx = len(self.__formants)
         text.close()
 
+    def __read_binary(self, file):
+        """reads Formant from a Praat binary .Formant file"""
+        data = _BinaryReader(file, "Formant 2")
+        self.__xmin = round(data.r64(), 3)  # start time
+        self.__xmax = round(data.r64(), 3)  # end time
+        self.__nx = data.i32()  # number of frames
+        self.__dx = round(data.r64(), 3)  # frame duration
+        self.__x1 = round(data.r64(), 3)  # time of first frame
+        self.__maxFormants = data.i16()  # maximum number of formants
+        self.__intensities, self.__formants, self.__bandwidths = data.formant_frames(self.__nx)
+        self.__times = [round((i * self.__dx + self.__x1), 3) for i in range(self.__nx)]
+        self.__nx = len(self.__formants)
+
+    def write(self, file, format="short"):
+        """writes Formant to a Praat .Formant file (short text format or binary format)"""
+        if format == "binary":
+            out = _BinaryWriter("Formant 2")
+            out.r64(self.__xmin)
+            out.r64(self.__xmax)
+            out.i32(self.__nx)
+            out.r64(self.__dx)
+            out.r64(self.__x1)
+            out.i16(self.__maxFormants)
+            for intensity, F, B in zip(self.__intensities, self.__formants, self.__bandwidths):
+                out.r64(intensity)
+                out.i16(len(F))
+                out.r64s([x for fb in zip(F, B) for x in fb])
+            out.save(file)
+        else:
+            lines = ['File type = "ooTextFile"', 'Object class = "Formant 2"', '',
+                     repr(self.__xmin), repr(self.__xmax), str(self.__nx),
+                     repr(self.__dx), repr(self.__x1), str(self.__maxFormants)]
+            for intensity, F, B in zip(self.__intensities, self.__formants, self.__bandwidths):
+                lines.append(repr(intensity))
+                lines.append(str(len(F)))
+                for f, b in zip(F, B):
+                    lines.append(repr(f))
+                    lines.append(repr(b))
+            with open(file, 'w') as text:
+                text.write('\n'.join(lines) + '\n')
+
 
 class LPC:
 
@@ -185,7 +235,7 @@ class LPC:
 
     def read(self, file):
         """reads LPC object from Praat .LPC file (saved as a short text file) """
-        text = open(file, 'rU')
+        text = open(file, 'r')
         text.readline()  # header
         text.readline()
         text.readline()
@@ -263,7 +313,7 @@ class MFCC:
 
     def read(self, file):
         """reads MFCC object from Praat .MFCC file (saved as a short text file) """
-        text = open(file, 'rU')
+        text = open(file, 'r')
         text.readline()  # header
         text.readline()
         text.readline()
@@ -336,8 +386,11 @@ class Intensity:
         self.__times = [t + offset for t in self.__times]
 
     def read(self, filename):
-        """reads an intensity object from a (short or long) text file"""
-        text = open(filename, 'rU')
+        """reads an intensity object from a (short or long) text file or a binary file"""
+        if _is_binary(filename):
+            self.__read_binary(filename)
+            return
+        text = open(filename, 'r')
         text.readline()  # "File type = ..."
         text.readline()  # "Object class = ..."
         text.readline()
@@ -387,7 +440,7 @@ class Intensity:
             text.readline()  # (y1)
             text.readline()  # "z [] []: "
             text.readline()  # "z [1]: "
-            for i in range(self.__nx):  # for each frame:
+            for i in range(self.__n):  # for each frame:
                 time = round((i * self.__dx + self.__x1), 3)
                 intensity = float(text.readline().rstrip().split(' = ')[1])
                 self.__times.append(time)
@@ -397,6 +450,43 @@ class Intensity:
         self.__nx = len(self.__intensities)
         text.close()
 
+    def __read_binary(self, filename):
+        """reads an intensity object from a Praat binary file"""
+        data = _BinaryReader(filename, "Intensity 2")
+        self.__xmin = round(data.r64(), 3)  # start time (xmin)
+        self.__xmax = round(data.r64(), 3)  # end time (xmax)
+        self.__n = data.i32()  # number of frames (nx)
+        self.__dx = round(data.r64(), 3)  # frame duration (dx)
+        self.__x1 = round(data.r64(), 3)  # time of first frame (x1)
+        data.r64()  # (ymin)
+        data.r64()  # (ymax)
+        ny = data.i32()  # (ny)
+        data.r64()  # (dy)
+        data.r64()  # (y1)
+        # all frames of the (single) intensity channel in one go
+        self.__intensities = data.r64s(ny * self.__n)[:self.__n].tolist()
+        self.__times = [round((i * self.__dx + self.__x1), 3) for i in range(self.__n)]
+        self.__nx = len(self.__intensities)
+
+    def write(self, filename, format="short"):
+        """writes an intensity object to a short text file or a binary file"""
+        header = [self.__xmin, self.__xmax, self.__n, self.__dx, self.__x1, 1, 1, 1, 1, 1]
+        if format == "binary":
+            out = _BinaryWriter("Intensity 2")
+            for value, kind in zip(header, "rrirrrrirr"):
+                if kind == "i":
+                    out.i32(value)
+                else:
+                    out.r64(value)
+            out.r64s(self.__intensities)
+            out.save(filename)
+        else:
+            lines = ['File type = "ooTextFile"', 'Object class = "Intensity 2"', '']
+            lines.extend(repr(value) for value in header)
+            lines.extend(repr(value) for value in self.__intensities)
+            with open(filename, 'w') as text:
+                text.write('\n'.join(lines) + '\n')
+
 
 class TextGrid:
 
@@ -408,6 +498,7 @@ class TextGrid:
         self.__xmin = 0
         self.__xmax = 0
         self.__name = name
+        self.__index = {}  # tiers by name, for merge()
 
     def __str__(self):
         return '<TextGrid with %d tiers>' % self.__n
@@ -447,155 +538,217 @@ class TextGrid:
         self.__xmin = beg
         self.__xmax = end
 
-    def read(self, filename):
-        """reads TextGrid from Praat .TextGrid file (long or short format)"""
-        text = open(filename, 'rU')
+    def merge(self, tiers, prefix=''):
+        """adds the intervals of each IntervalTier or TierView in tiers to the
+        tier named prefix + its name, creating that tier if necessary"""
+        for tier in tiers:
+            name = prefix + tier.name()
+            existing = self.__index.get(name)
+            if existing is None or existing.name() != name:
+                # tiers may have been appended or renamed since the last merge
+                self.__index = dict((t.name(), t) for t in self.__tiers)
+                existing = self.__index.get(name)
+            if existing is None:
+                existing = IntervalTier(name, tier.xmin(), tier.xmax())
+                self.append(existing)
+                self.__index[name] = existing
+            existing.concatenate(tier)
+            self.__xmax = max(existing.xmax(), self.__xmax)
+            self.__xmin = min(existing.xmin(), self.__xmin)
+
+    def read(self, filename, tiers=None, lazy=False):
+        """reads TextGrid from Praat .TextGrid file (long or short format)
+
+        If lazy is set, the first pass over the file only builds an index of
+        the tiers (name, class, time extent, size and byte offset); the
+        intervals or points of a tier are parsed the first time that tier's
+        contents are accessed.  tiers is an optional list of tier names or
+        indices that are parsed right away even if lazy is set."""
+        if tiers is None:
+            tiers = []
+        if _is_binary(filename):
+            self.__read_binary(filename)
+            return
+        text = open(filename, 'rb')
         text.readline()
                       # header                            ## line reads 'File
                       # type = "ooTextFile"'
         text.readline()  # line reads 'Object class = "TextGrid"'
         text.readline()  # blank line
-        # short or long Formant format?
+        # short or long TextGrid format?
         line = text.readline().strip().split()  # read fields in next line
-        if len(line) == 3 and line[0] == "xmin":  # line reads "xmin = xxx.xxxxx"
+        if len(line) == 3 and line[0] == b"xmin":  # line reads "xmin = xxx.xxxxx"
             format = "long"
-        elif len(line) == 1 and line[0] != '':  # line reads "xxx.xxxxx"
+        elif len(line) == 1 and line[0] != b'':  # line reads "xxx.xxxxx"
             format = "short"
         else:
-            print("WARNING!!!  Unknown format for Formant file!")
+            print("WARNING!!!  Unknown format for TextGrid file!")
+            text.close()
+            return
 
         if format == "short":  # SHORT TEXTGRID FORMAT
             self.__xmin = round(
                 float(line[0]), 3)  # round to 3 digits; line reads "xxx.xxxxx"
             self.__xmax = round(
-                float(text.readline().rstrip()), 3)  # line reads "xxx.xxxxx"
+                float(text.readline()), 3)  # line reads "xxx.xxxxx"
             text.readline()  # line reads "<exists>" (tiers exist)
-            m = int(text.readline().rstrip())
+            m = int(text.readline())
                     # line reads "x" (number of tiers)
-            for i in range(m):  # loop over tiers
-                # [1:-1] strips off the quote characters surrounding all labels
-                if text.readline().strip()[1:-1] == 'IntervalTier':  # line reads '"IntervalTier"'
-                    inam = text.readline().rstrip()[
-                        1:-1]  # line reads '"abcdefg"' (tier label)
-                    imin = round(float(text.readline().strip()), 3)
-                                 # line reads "xxx.xxxxx" (beginning of tier)
-                    imax = round(float(text.readline().strip()), 3)
-                                 # line reads "xxx.xxxxx" (end of tier)
-                    itier = IntervalTier(inam, imin, imax)
-                    n = int(text.readline().rstrip())
-                            # line reads "xxxxx" (number of intervals in tier)
-                    for j in range(n):
-                        jmin = round(float(text.readline().strip()), 3)
-                                     # line reads "xxx.xxxxx" (beginning of
-                                     # interval)
-                        jmax = round(float(text.readline().strip()), 3)
-                                     # line reads "xxx.xxxxx" (end of interval)
-                        jmrk = text.readline().strip()[
-                            1:-1]  # line reads '"abcdefg"' (interval label)
-                        itier.append(Interval(jmin, jmax, jmrk))
-                    self.append(itier)  # automatically updates self.__n
-                else:  # pointTier
-                    inam = text.readline().rstrip()[1:-1]
-                    imin = round(float(text.readline().rstrip()), 3)
-                    imax = round(float(text.readline().rstrip()), 3)
-                    itier = PointTier(inam, imin, imax)
-                    n = int(text.readline().rstrip())
-                    for j in range(n):
-                        jtim = round(float(text.readline().rstrip()), 3)
-                        jmrk = text.readline().rstrip()[1:-1]
-                        itier.append(Point(jtim, jmrk))
-                    self.append(itier)
-            if self.__n != m:
-                print("In TextGrid.IntervalTier.read:  Error in number of tiers!")
-            text.close()
-        elif format == "long":  # LONG TEXTGRID FORMAT
+        else:  # LONG TEXTGRID FORMAT
             self.__xmin = round(
                 float(line[2]), 3)  # line reads "xmin = xxx.xxxxx"
             self.__xmax = round(
-                float(text.readline().strip().split(' = ')[1]), 3)  # line reads "xmax = xxx.xxxxx"
+                float(_value(text.readline())), 3)  # line reads "xmax = xxx.xxxxx"
             text.readline()  # line reads "tiers? <exists>"
-            m = int(text.readline().strip().split(
-                ' = ')[1])  # line reads "size = x"
+            m = int(_value(text.readline()))  # line reads "size = x"
             text.readline()  # line reads "item []:"
-            for i in range(m):  # loop over tiers
+
+        for i in range(m):  # loop over tiers
+            if format == "short":
+                # [1:-1] strips off the quote characters surrounding all labels
+                tclass = _label(text.readline())  # line reads '"IntervalTier"'
+                inam = _label(text.readline())  # line reads '"abcdefg"' (tier label)
+                imin = round(float(text.readline()), 3)
+                                 # line reads "xxx.xxxxx" (beginning of tier)
+                imax = round(float(text.readline()), 3)
+                                 # line reads "xxx.xxxxx" (end of tier)
+                n = int(text.readline())
+                        # line reads "xxxxx" (number of intervals in tier)
+            else:
                 text.readline()  # line reads "item [x]:"
-                if text.readline().rstrip().split()[2] == '"IntervalTier"':  # line reads "class = 'IntervalTier"'
-                    inam = text.readline().strip().split('=')[
-                        1].strip()[1:-1]  # line reads 'name = "xyz"'
-                    imin = round(
-                        float(text.readline().strip().split('=')[1].strip()), 3)  # line reads "xmin = xxx.xxxxx"
-                    imax = round(
-                        float(text.readline().strip().split('=')[1].strip()), 3)  # line reads "xmax = xxx.xxxxx"
-                    itier = IntervalTier(inam, imin, imax)
-                    n = int(text.readline().strip().split('=')[
-                            1].strip())  # line reads "intervals: size = xxxxx"
-                    for j in range(n):
-                        text.readline()
-                                      # header junk
-                                      # ## line reads "intervals [x]:"
-                        jmin = round(
-                            float(text.readline().strip().split('=')[1].strip()), 3)  # line reads "xmin = xxx.xxxxx"
-                        jmax = round(
-                            float(text.readline().strip().split('=')[1].strip()), 3)  # line reads "xmax = xxx.xxxxx"
-                        jmrk = text.readline().strip().split('=')[
-                            1].strip()[1:-1]  # line reads 'text = "xyz"'
-                        itier.append(Interval(jmin, jmax, jmrk))
-                    self.append(itier)  # automatically updates self.__n
-                else:  # pointTier
-                    inam = text.readline().strip().split('=')[1].strip()[1:-1]
-                    imin = round(
-                        float(text.readline().strip().split('=')[1].strip()), 3)
-                    imax = round(
-                        float(text.readline().strip().split('=')[1].strip()), 3)
-                    itier = PointTier(inam, imin, imax)
-                    n = int(text.readline().strip().split('=')[1].strip())
-                    for j in range(n):
-                        text.readline()  # header junk
-                        jtim = round(
-                            float(text.readline().strip().split('=')[1].strip()), 3)
-                        jmrk = text.readline().strip().split(
-                            '=')[1].strip()[1:-1]
-                        itier.append(Point(jtim, jmrk))
-                    self.append(itier)
-            if self.__n != m:
-                print("In TextGrid.IntervalTier.read:  Error in number of tiers!")
-            text.close()
+                tclass = _label(_value(text.readline()))  # line reads 'class = "IntervalTier"'
+                inam = _label(_value(text.readline()))  # line reads 'name = "xyz"'
+                imin = round(float(_value(text.readline())), 3)  # line reads "xmin = xxx.xxxxx"
+                imax = round(float(_value(text.readline())), 3)  # line reads "xmax = xxx.xxxxx"
+                n = int(_value(text.readline()))  # line reads "intervals: size = xxxxx"
+            if tclass == 'IntervalTier':
+                itier = IntervalTier(inam, imin, imax)
+            else:  # pointTier
+                itier = PointTier(inam, imin, imax)
+            if lazy and i not in tiers and inam not in tiers:
+                # only remember where the tier starts, then skip its entries
+                itier._defer(_tier_loader(filename, text.tell(), format, itier.__class__, n), n)
+                _skip_lines(text, n * _LINES_PER_ENTRY[format, itier.__class__])
+            else:
+                for entry in _read_entries(text, format, itier.__class__, n):
+                    itier.append(entry)
+            self.append(itier)  # automatically updates self.__n
+        if self.__n != m:
+            print("In TextGrid.IntervalTier.read:  Error in number of tiers!")
+        text.close()
 
-    def write(self, text):
-        """ write TextGrid into a text file that Praat can read """
+    def __read_binary(self, filename):
+        """reads TextGrid from a Praat binary .TextGrid file"""
+        data = _BinaryReader(filename, "TextGrid")
+        self.__xmin = round(data.r64(), 3)
+        self.__xmax = round(data.r64(), 3)
+        data.u8()  # tiers exist
+        m = data.i32()  # number of tiers
+        for i in range(m):
+            tclass = data.w8()  # "IntervalTier" or "TextTier"
+            inam = data.w16()
+            imin = round(data.r64(), 3)
+            imax = round(data.r64(), 3)
+            n = data.i32()
+            if tclass == 'IntervalTier':
+                itier = IntervalTier(inam, imin, imax)
+                for jmin, jmax, jmrk in data.entries(_INTERVAL, n):
+                    itier.append(Interval(round(jmin, 3), round(jmax, 3), jmrk))
+            else:
+                itier = PointTier(inam, imin, imax)
+                for jtim, jmrk in data.entries(_POINT, n):
+                    itier.append(Point(round(jtim, 3), jmrk))
+            self.append(itier)
+        if self.__n != m:
+            print("In TextGrid.IntervalTier.read:  Error in number of tiers!")
+
+    def write(self, text, format="long", precision=6):
+        """ write TextGrid into a file that Praat can read
+
+        format is "long" (Praat's long text format), "short" (short text
+        format) or "binary"; precision is the number of decimals written
+        for times in the text formats """
+        if format == "binary":
+            self.__write_binary(text)
+            return
         text = open(text, 'w')
         text.write('File type = "ooTextFile"\n')
         text.write('Object class = "TextGrid"\n\n')
-        text.write('xmin = %f\n' % self.__xmin)
-        text.write('xmax = %f\n' % self.__xmax)
-        text.write('tiers? <exists>\n')
-        text.write('size = %d\n' % self.__n)
-        text.write('item []:\n')
+        if format == "short":
+            text.write('%.*f\n' % (precision, self.__xmin))
+            text.write('%.*f\n' % (precision, self.__xmax))
+            text.write('<exists>\n')
+            text.write('%d\n' % self.__n)
+        else:
+            text.write('xmin = %.*f\n' % (precision, self.__xmin))
+            text.write('xmax = %.*f\n' % (precision, self.__xmax))
+            text.write('tiers? <exists>\n')
+            text.write('size = %d\n' % self.__n)
+            text.write('item []:\n')
         for (tier, n) in zip(self.__tiers, range(1, self.__n + 1)):
+            if tier.__class__ == IntervalTier:
+                tclass = "IntervalTier"
+            else:  # PointTier
+                tclass = "TextTier"
+            if format == "short":
+                text.write('"%s"\n' % tclass)
+                text.write('"%s"\n' % tier.name())
+                text.write('%.*f\n' % (precision, tier.xmin()))
+                text.write('%.*f\n' % (precision, tier.xmax()))
+                text.write('%d\n' % len(tier))
+                if tier.__class__ == IntervalTier:
+                    for interval in tier:
+                        text.write('%.*f\n' % (precision, interval.xmin()))
+                        text.write('%.*f\n' % (precision, interval.xmax()))
+                        text.write('"%s"\n' % interval.mark())
+                else:
+                    for point in tier:
+                        text.write('%.*f\n' % (precision, point.time()))
+                        text.write('"%s"\n' % point.mark())
+                continue
             text.write('\titem [%d]:\n' % n)
+            text.write('\t\tclass = "%s"\n' % tclass)
+            text.write('\t\tname = "%s"\n' % tier.name())
+            text.write('\t\txmin = %.*f\n' % (precision, tier.xmin()))
+            text.write('\t\txmax = %.*f\n' % (precision, tier.xmax()))
             if tier.__class__ == IntervalTier:
-                text.write('\t\tclass = "IntervalTier"\n')
-                text.write('\t\tname = "%s"\n' % tier.name())
-                text.write('\t\txmin = %f\n' % tier.xmin())
-                text.write('\t\txmax = %f\n' % tier.xmax())
                 text.write('\t\tintervals: size = %d\n' % len(tier))
                 for (interval, o) in zip(tier, range(1, len(tier) + 1)):
                     text.write('\t\t\tintervals [%d]:\n' % o)
-                    text.write('\t\t\t\txmin = %f\n' % interval.xmin())
-                    text.write('\t\t\t\txmax = %f\n' % interval.xmax())
+                    text.write('\t\t\t\txmin = %.*f\n' % (precision, interval.xmin()))
+                    text.write('\t\t\t\txmax = %.*f\n' % (precision, interval.xmax()))
                     text.write('\t\t\t\ttext = "%s"\n' % interval.mark())
             else:  # PointTier
-                text.write('\t\tclass = "TextTier"\n')
-                text.write('\t\tname = "%s"\n' % tier.name())
-                text.write('\t\txmin = %f\n' % tier.xmin())
-                text.write('\t\txmax = %f\n' % tier.xmax())
                 text.write('\t\tpoints: size = %d\n' % len(tier))
                 for (point, o) in zip(tier, range(1, len(tier) + 1)):
                     text.write('\t\t\tpoints [%d]:\n' % o)
-                    text.write('\t\t\t\ttime = %f\n' % point.time())
+                    text.write('\t\t\t\ttime = %.*f\n' % (precision, point.time()))
                     text.write('\t\t\t\tmark = "%s"\n' % point.mark())
         text.close()
 
+    def __write_binary(self, filename):
+        """writes TextGrid to a Praat binary .TextGrid file"""
+        out = _BinaryWriter("TextGrid")
+        out.r64(self.__xmin)
+        out.r64(self.__xmax)
+        out.u8(1)  # tiers exist
+        out.i32(self.__n)
+        for tier in self.__tiers:
+            if tier.__class__ == IntervalTier:
+                out.w8("IntervalTier")
+            else:
+                out.w8("TextTier")
+            out.w16(tier.name())
+            out.r64(tier.xmin())
+            out.r64(tier.xmax())
+            out.i32(len(tier))
+            if tier.__class__ == IntervalTier:
+                out.entries(_INTERVAL, [(interval.xmin(), interval.xmax(), interval.mark())
+                                        for interval in tier])
+            else:
+                out.entries(_POINT, [(point.time(), point.mark()) for point in tier])
+        out.save(filename)
+
 
 class IntervalTier:
 
@@ -607,11 +760,14 @@ class IntervalTier:
         self.__name = name
         self.__xmin = xmin
         self.__xmax = xmax
+        self.__loader = None  # parses the intervals of a lazily read tier
 
     def __str__(self):
         return '<IntervalTier "%s" with %d intervals>' % (self.__name, self.__n)
 
     def __iter__(self):
+        if self.__loader is not None:
+            self.__load()
         return iter(self.__intervals)
 
     def __len__(self):
@@ -619,8 +775,24 @@ class IntervalTier:
 
     def __getitem__(self, i):
         """returns the (i+1)th interval"""
+        if self.__loader is not None:
+            self.__load()
         return self.__intervals[i]
 
+    def _defer(self, loader, n):
+        """postpones reading the n intervals of this tier until they are first needed"""
+        self.__loader = loader
+        self.__n = n
+
+    def __load(self):
+        loader, self.__loader = self.__loader, None
+        for interval in loader():
+            self.append(interval)
+
+    def loaded(self):
+        """returns False if the intervals of a lazily read tier have not been parsed yet"""
+        return self.__loader is None
+
     def xmin(self):
         return self.__xmin
 
@@ -631,6 +803,8 @@ class IntervalTier:
         return self.__name
 
     def append(self, interval):
+        if self.__loader is not None:
+            self.__load()
         self.__intervals.append(interval)
         self.__xmax = max(interval.xmax(), self.__xmax)  # changed
         self.__xmin = min(interval.xmin(), self.__xmin)  # added
@@ -653,17 +827,19 @@ class IntervalTier:
         text.close()
         self.__n = len(self.__intervals)
 
-    def write(self, file):
+    def write(self, file, precision=6):
+        if self.__loader is not None:
+            self.__load()
         text = open(file, 'w')
         text.write('File type = "ooTextFile"\n')
         text.write('Object class = "IntervalTier"\n\n')
-        text.write('xmin = %f\n' % self.__xmin)
-        text.write('xmax = %f\n' % self.__xmax)
+        text.write('xmin = %.*f\n' % (precision, self.__xmin))
+        text.write('xmax = %.*f\n' % (precision, self.__xmax))
         text.write('intervals: size = %d\n' % self.__n)
         for (interval, n) in zip(self.__intervals, range(1, self.__n + 1)):
             text.write('intervals [%d]:\n' % n)
-            text.write('\txmin = %f\n' % interval.xmin())
-            text.write('\txmax = %f\n' % interval.xmax())
+            text.write('\txmin = %.*f\n' % (precision, interval.xmin()))
+            text.write('\txmax = %.*f\n' % (precision, interval.xmax()))
             text.write('\ttext = "%s"\n' % interval.mark())
         text.close()
 
@@ -673,6 +849,8 @@ class IntervalTier:
 
     def sort_intervals(self, par="xmin"):
         """sorts intervals according to given parameter values.  Parameter can be xmin (default), xmax, or text."""
+        if self.__loader is not None:
+            self.__load()
         # function generating key used for sorting
         if par == "xmin":
             def f(i):
@@ -688,6 +866,8 @@ class IntervalTier:
         self.__intervals.sort(key=f)
 
     def extend(self, newmin, newmax):
+        if self.__loader is not None:
+            self.__load()
         # check that this is really an expansion
         if newmin > self.__xmin:
             raise ValueError("New minimum of tier %f exceeds old minimum %f." % (newmin, self.__xmin))
@@ -696,9 +876,8 @@ class IntervalTier:
         # add new intervals at beginning and end
         self.sort_intervals()
         if newmin != self.__intervals[0].xmin():
-            self.__intervals.append(
-                Interval(newmin, self.__intervals[0].xmin(), "sp"))
-        self.sort_intervals()
+            self.__intervals.insert(
+                0, Interval(newmin, self.__intervals[0].xmin(), "sp"))
         if newmax != self.__intervals[-1].xmax():
             self.__intervals.append(
                 Interval(self.__intervals[-1].xmax(), newmax, "sp"))
@@ -709,37 +888,117 @@ class IntervalTier:
         self.__xmax = newmax
 
     def tidyup(self):
-        """inserts empty intervals in the gaps between transcription intervals"""
+        """inserts empty intervals in the gaps between transcription intervals;
+        returns a list of (interval, next interval, tier name) for overlapping
+        intervals"""
+        if self.__loader is not None:
+            self.__load()
         self.sort_intervals()
-        z = 0
-        end = len(self.__intervals) - 1
         overlaps = []
-        while z < end:  # (only go up to second-to-last interval)
-            i = self.__intervals[z]
-            if i.xmax() != self.__intervals[z + 1].xmin():
+        if not self.__intervals:
+            return overlaps
+        # build the new list of intervals in a single pass
+        intervals = [self.__intervals[0]]
+        for i in self.__intervals[1:]:
+            previous = intervals[-1]
+            if previous.xmax() < i.xmin():
                 # insert empty interval if xmax of interval and xmin of
                 # following interval do not coincide
-                if i.xmax() < self.__intervals[z + 1].xmin():
-                    self.__intervals.append(
-                        Interval(i.xmax(), self.__intervals[z + 1].xmin(), "sp"))
-                    print("tidyup:  Added new interval %f:%f to tier %s." % (i.xmax(), self.__intervals[z + 1].xmin(), self.__name))
-                    self.__n = len(self.__intervals)
-                    self.sort_intervals()
-                    # update iteration range
-                    end = len(self.__intervals) - 1
-                else:  # overlapping interval boundaries
-                    overlaps.append((i, self.__intervals[z + 1], self.__name))
-                    print("WARNING!!!  Overlapping intervals!!!")
-                    print("%s and %s on tier %s." % (i, self.__intervals[z + 1], self.__name))
-            z += 1
+                intervals.append(Interval(previous.xmax(), i.xmin(), "sp"))
+                logger.debug("tidyup:  Added new interval %f:%f to tier %s.",
+                             previous.xmax(), i.xmin(), self.__name)
+            elif previous.xmax() > i.xmin():  # overlapping interval boundaries
+                overlaps.append((previous, i, self.__name))
+                logger.warning("Overlapping intervals %s and %s on tier %s.",
+                               previous, i, self.__name)
+            intervals.append(i)
+        self.__intervals = intervals
+        self.__n = len(intervals)
         return overlaps
 
     def change_offset(self, offset):
+        if self.__loader is not None:
+            self.__load()
         self.__xmin += offset
         self.__xmax += offset
         for i in self.__intervals:
             i.change_offset(offset)
 
+    def view(self, offset=0, xmin=None, xmax=None):
+        """returns a TierView of this tier shifted by offset and cropped to xmin:xmax"""
+        return TierView(self, offset, xmin, xmax)
+
+    def concatenate(self, intervals):
+        """appends a sequence of intervals (e.g. another tier or a TierView) in bulk"""
+        if self.__loader is not None:
+            self.__load()
+        new = list(intervals)
+        if not new:
+            return
+        self.__intervals.extend(new)
+        self.__xmin = min(self.__xmin, min(i.xmin() for i in new))
+        self.__xmax = max(self.__xmax, max(i.xmax() for i in new))
+        self.__n = len(self.__intervals)
+
+
+class TierView:
+
+    """a read-only view of an IntervalTier, shifted by a time offset and
+    cropped to a time window (given in the time of the underlying tier);
+    intervals are only copied when the view is iterated"""
+
+    def __init__(self, tier, offset=0, xmin=None, xmax=None):
+        self.__tier = tier
+        self.__offset = offset
+        self.__window = (tier.xmin() if xmin is None else xmin,
+                         tier.xmax() if xmax is None else xmax)
+        self.__cropped = xmin is not None or xmax is not None
+
+    def __str__(self):
+        return '<TierView of "%s" %f:%f>' % (self.__tier.name(), self.xmin(), self.xmax())
+
+    def __iter__(self):
+        offset = self.__offset
+        if not self.__cropped:
+            for i in self.__tier:
+                yield Interval(i.xmin() + offset, i.xmax() + offset, i.mark())
+            return
+        (beg, end) = self.__window
+        for i in self.__tier:
+            if i.xmax() > beg and i.xmin() < end:
+                yield Interval(max(i.xmin(), beg) + offset, min(i.xmax(), end) + offset, i.mark())
+
+    def __len__(self):
+        if not self.__cropped:
+            return len(self.__tier)
+        (beg, end) = self.__window
+        return sum(1 for i in self.__tier if i.xmax() > beg and i.xmin() < end)
+
+    def xmin(self):
+        return self.__window[0] + self.__offset
+
+    def xmax(self):
+        return self.__window[1] + self.__offset
+
+    def name(self):
+        return self.__tier.name()
+
+    def offset(self):
+        return self.__offset
+
+    def shift(self, offset):
+        """returns a new view with offset added to the current one"""
+        (beg, end) = self.__window
+        if self.__cropped:
+            return TierView(self.__tier, self.__offset + offset, beg, end)
+        return TierView(self.__tier, self.__offset + offset)
+
+    def tier(self):
+        """copies the intervals of the view into a new IntervalTier"""
+        tier = IntervalTier(self.name(), self.xmin(), self.xmax())
+        tier.concatenate(self)
+        return tier
+
 
 class PointTier:
 
@@ -751,11 +1010,14 @@ class PointTier:
         self.__xmax = xmax
         self.__points = []
         self.__n = len(self.__points)
+        self.__loader = None  # parses the points of a lazily read tier
 
     def __str__(self):
         return '<PointTier "%s" with %d points>' % (self.__name, self.__n)
 
     def __iter__(self):
+        if self.__loader is not None:
+            self.__load()
         return iter(self.__points)
 
     def __len__(self):
@@ -763,8 +1025,24 @@ class PointTier:
 
     def __getitem__(self, i):
         """returns the (i+1)th point"""
+        if self.__loader is not None:
+            self.__load()
         return self.__points[i]
 
+    def _defer(self, loader, n):
+        """postpones reading the n points of this tier until they are first needed"""
+        self.__loader = loader
+        self.__n = n
+
+    def __load(self):
+        loader, self.__loader = self.__loader, None
+        for point in loader():
+            self.append(point)
+
+    def loaded(self):
+        """returns False if the points of a lazily read tier have not been parsed yet"""
+        return self.__loader is None
+
     def name(self):
         return self.__name
 
@@ -775,6 +1053,8 @@ class PointTier:
         return self.__xmax
 
     def append(self, point):
+        if self.__loader is not None:
+            self.__load()
         self.__points.append(point)
         self.__xmax = max(self.__xmax, point.time())
         self.__xmin = min(self.__xmin, point.time())
@@ -795,16 +1075,18 @@ class PointTier:
             self.__points.append(Point(imrk, itim))
         text.close()
 
-    def write(self, file):
+    def write(self, file, precision=6):
+        if self.__loader is not None:
+            self.__load()
         text = open(file, 'w')
         text.write('File type = "ooTextFile"\n')
         text.write('Object class = "TextTier"\n\n')
-        text.write('xmin = %f\n' % self.__xmin)
-        text.write('xmax = %f\n' % self.__xmax)
+        text.write('xmin = %.*f\n' % (precision, self.__xmin))
+        text.write('xmax = %.*f\n' % (precision, self.__xmax))
         text.write('points: size = %d\n' % self.__n)
         for (point, n) in zip(self.__points, range(1, self.__n + 1)):
             text.write('points [%d]:\n' % n)
-            text.write('\ttime = %f\n' % point.time())
+            text.write('\ttime = %.*f\n' % (precision, point.time()))
             text.write('\tmark = "%s"\n' % point.mark())
         text.close()
 
@@ -854,3 +1136,252 @@ class Point:
 
     def mark(self):
         return self.__mark
+
+
+#
+# helper functions for reading TextGrid files                                      ##
+#
+
+# number of lines taken up by a single interval or point in each file format
+_LINES_PER_ENTRY = {("short", IntervalTier): 3, ("short", PointTier): 2,
+                    ("long", IntervalTier): 4, ("long", PointTier): 3}
+
+
+def _value(line):
+    """returns the value of a 'key = value' line (long file format)"""
+    return line.split(b'=', 1)[1]
+
+
+def _label(field):
+    """strips the quote characters surrounding a label"""
+    return field.strip()[1:-1].decode('utf-8')
+
+
+def _skip_lines(text, n):
+    """advances an open file by n lines without parsing them"""
+    for _ in range(n):
+        text.readline()
+
+
+def _read_entries(text, format, tierclass, n):
+    """parses the next n intervals or points of a TextGrid file"""
+    if format == "short":
+        if tierclass == IntervalTier:
+            for j in range(n):
+                jmin = round(float(text.readline()), 3)
+                             # line reads "xxx.xxxxx" (beginning of interval)
+                jmax = round(float(text.readline()), 3)
+                             # line reads "xxx.xxxxx" (end of interval)
+                jmrk = _label(text.readline())  # line reads '"abcdefg"' (interval label)
+                yield Interval(jmin, jmax, jmrk)
+        else:
+            for j in range(n):
+                jtim = round(float(text.readline()), 3)
+                jmrk = _label(text.readline())
+                yield Point(jtim, jmrk)
+    else:
+        if tierclass == IntervalTier:
+            for j in range(n):
+                text.readline()  # header junk ## line reads "intervals [x]:"
+                jmin = round(float(_value(text.readline())), 3)  # line reads "xmin = xxx.xxxxx"
+                jmax = round(float(_value(text.readline())), 3)  # line reads "xmax = xxx.xxxxx"
+                jmrk = _label(_value(text.readline()))  # line reads 'text = "xyz"'
+                yield Interval(jmin, jmax, jmrk)
+        else:
+            for j in range(n):
+                text.readline()  # header junk
+                jtim = round(float(_value(text.readline())), 3)
+                jmrk = _label(_value(text.readline()))
+                yield Point(jtim, jmrk)
+
+
+def _tier_loader(filename, offset, format, tierclass, n):
+    """returns a function that parses the n entries of a tier starting at byte offset"""
+    def load():
+        with open(filename, 'rb') as text:
+            text.seek(offset)
+            return list(_read_entries(text, format, tierclass, n))
+    return load
+
+
+#
+# Praat binary files ("ooBinaryFile")                                                ##
+# all numbers are big-endian; strings are preceded by their length (8 or 16 bit)     ##
+# and are stored as UTF-16 if they contain non-ASCII characters                      ##
+#
+
+_BINARY_HEADER = b"ooBinaryFile"
+
+# the time(s) of an interval or point of a tier, followed by the 16-bit length of its label
+_INTERVAL = struct.Struct('>ddH')
+_POINT = struct.Struct('>dH')
+_LENGTH16 = struct.Struct('>H')
+
+
+def _is_binary(filename):
+    """checks whether a file is a Praat binary file"""
+    with open(filename, 'rb') as f:
+        return f.read(len(_BINARY_HEADER)) == _BINARY_HEADER
+
+
+class _BinaryReader:
+
+    """reads the fields of a Praat binary file one after the other"""
+
+    def __init__(self, filename, objectclass):
+        with open(filename, 'rb') as f:
+            self.data = f.read()
+        self.pos = len(_BINARY_HEADER)
+        found = self.w8()
+        if found != objectclass:
+            raise ValueError("%s contains a %s object, not a %s object" % (filename, found, objectclass))
+
+    def __unpack(self, fmt):
+        values = struct.unpack_from(fmt, self.data, self.pos)
+        self.pos += struct.calcsize(fmt)
+        return values[0]
+
+    def u8(self):
+        return self.__unpack('>B')
+
+    def i16(self):
+        return self.__unpack('>h')
+
+    def i32(self):
+        return self.__unpack('>i')
+
+    def r64(self):
+        return self.__unpack('>d')
+
+    def r64s(self, n):
+        """returns the next n doubles as an array"""
+        values = np.frombuffer(self.data, '>f8', count=n, offset=self.pos)
+        self.pos += 8 * n
+        return values
+
+    def entries(self, layout, n):
+        """returns the times and the label of the next n intervals (layout _INTERVAL)
+        or points (layout _POINT) of a tier, as tuples"""
+        data, pos, size = self.data, self.pos, layout.size
+        unpack = layout.unpack_from
+        entries = []
+        for j in range(n):
+            values = unpack(data, pos)
+            pos += size
+            length = values[-1]
+            if length == 0xFFFF:  # UTF-16 string
+                length = 2 * _LENGTH16.unpack_from(data, pos)[0]
+                pos += 2
+                mark = data[pos:pos + length].decode('utf-16-be')
+            else:
+                mark = data[pos:pos + length].decode('ascii')
+            pos += length
+            entries.append(values[:-1] + (mark,))
+        self.pos = pos
+        return entries
+
+    def w8(self):
+        """returns a string preceded by an 8-bit length"""
+        length = self.u8()
+        if length == 0xFF:  # UTF-16 string
+            return self.__utf16(self.u8())
+        return self.__ascii(length)
+
+    def w16(self):
+        """returns a string preceded by a 16-bit length"""
+        length = self.__unpack('>H')
+        if length == 0xFFFF:  # UTF-16 string
+            return self.__utf16(self.__unpack('>H'))
+        return self.__ascii(length)
+
+    def __ascii(self, length):
+        value = self.data[self.pos:self.pos + length].decode('ascii')
+        self.pos += length
+        return value
+
+    def __utf16(self, length):
+        value = self.data[self.pos:self.pos + 2 * length].decode('utf-16-be')
+        self.pos += 2 * length
+        return value
+
+    def formant_frames(self, nx):
+        """returns lists of intensities, formant frequencies and bandwidths for nx frames"""
+        if nx == 0:
+            return [], [], []
+        # every frame:  intensity (double), number of formants (int16),
+        # and a frequency/bandwidth pair (doubles) for each formant
+        nf = struct.unpack_from('>h', self.data, self.pos + 8)[0]
+        size = 10 + 16 * nf
+        if len(self.data) - self.pos == nx * size:
+            # decode all frames at once if they have the same number of formants
+            frames = np.frombuffer(self.data, np.dtype(
+                [('intensity', '>f8'), ('n', '>i2'), ('fb', '>f8', (nf, 2))]), count=nx, offset=self.pos)
+            if (frames['n'] == nf).all():
+                self.pos += nx * size
+                return (frames['intensity'].tolist(),
+                        frames['fb'][:, :, 0].tolist(), frames['fb'][:, :, 1].tolist())
+        intensities, formants, bandwidths = [], [], []
+        for i in range(nx):
+            intensities.append(self.r64())
+            fb = self.r64s(2 * self.i16())
+            formants.append(fb[0::2].tolist())
+            bandwidths.append(fb[1::2].tolist())
+        return intensities, formants, bandwidths
+
+
+class _BinaryWriter:
+
+    """collects the fields of a Praat binary file"""
+
+    def __init__(self, objectclass):
+        self.chunks = [_BINARY_HEADER]
+        self.w8(objectclass)
+
+    def u8(self, value):
+        self.chunks.append(struct.pack('>B', value))
+
+    def i16(self, value):
+        self.chunks.append(struct.pack('>h', value))
+
+    def i32(self, value):
+        self.chunks.append(struct.pack('>i', value))
+
+    def r64(self, value):
+        self.chunks.append(struct.pack('>d', value))
+
+    def r64s(self, values):
+        self.chunks.append(np.asarray(values, dtype='>f8').tobytes())
+
+    def w8(self, value):
+        if value.isascii():
+            self.chunks.append(struct.pack('>B', len(value)) + value.encode('ascii'))
+        else:
+            encoded = value.encode('utf-16-be')
+            self.chunks.append(struct.pack('>BB', 0xFF, len(encoded) // 2) + encoded)
+
+    def w16(self, value):
+        if value.isascii():
+            self.chunks.append(struct.pack('>H', len(value)) + value.encode('ascii'))
+        else:
+            encoded = value.encode('utf-16-be')
+            self.chunks.append(struct.pack('>HH', 0xFFFF, len(encoded) // 2) + encoded)
+
+    def entries(self, layout, entries):
+        """writes the times and the label of intervals (layout _INTERVAL) or points
+        (layout _POINT), given as tuples"""
+        pack = layout.pack
+        chunks = []
+        for *times, mark in entries:
+            if mark.isascii():
+                chunks.append(pack(*times, len(mark)))
+                chunks.append(mark.encode('ascii'))
+            else:
+                encoded = mark.encode('utf-16-be')
+                chunks.append(pack(*times, 0xFFFF))
+                chunks.append(_LENGTH16.pack(len(encoded) // 2))
+                chunks.append(encoded)
+        self.chunks.append(b''.join(chunks))
+
+    def save(self, filename):
+        with open(filename, 'wb') as f:
+            f.write(b''.join(self.chunks))
@@ -0,0 +1,284 @@
+import concurrent.futures
+import os
+import shutil
+import numpy as np
+import pkg_resources
+import pytest
+from fave import audio
+from fave import praat
+from fave.align.aligner import Aligner
+
+ALIGNED_MLF = """#!MLF!#
+"*/tmp1.rec"
+0 1250000 sp -1.0 sp
+1250000 2500000 T -50.0 TEST
+2500000 3000000 EH1 -20.0
+.
+"/scratch/batch1/tmp2.rec"
+0 500000 sp -1.0 sp
+.
+"""
+
+
+def test_read_aligned_mlf(tmp_path):
+    mlf = tmp_path / "aligned.mlf"
+    mlf.write_text(ALIGNED_MLF)
+    aligned = Aligner.read_aligned_mlf(str(mlf))
+    assert sorted(aligned) == ["tmp1", "tmp2"]
+    assert [line.split()[2] for line in aligned["tmp1"]] == ["sp", "T", "EH1"]
+    assert aligned["tmp2"] == ["0 500000 sp -1.0 sp\n"]
+
+
+def test_aligned_to_TextGrid():
+    lines = [
+        "0 1250000 sp -1.0 sp\n",
+        "1250000 1250000 sp -1.0\n",
+        "1250000 2500000 T -50.0 TEST\n",
+        "2500000 3000000 EH1 -20.0\n",
+        "3000000 4000000 S -20.0\n",
+        "4000000 5000000 sp -1.0 sp\n",
+    ]
+    tg = Aligner.aligned_to_TextGrid(lines, 16000)
+    assert [tier.name() for tier in tg] == ["phone", "word"]
+    # times are shifted by 12.5 ms and rounded to ms (as binary floats, so
+    # 0.3125 -> 0.312 but 0.1375 -> 0.138)
+    assert (tg.xmin(), tg.xmax()) == (0.013, 0.512)
+    assert [(i.xmin(), i.xmax(), i.mark()) for i in tg[0]] == [
+        (0.013, 0.138, "sp"), (0.138, 0.263, "T"), (0.263, 0.312, "EH1"),
+        (0.312, 0.413, "S"), (0.413, 0.512, "sp")]
+    assert [(i.xmin(), i.xmax(), i.mark()) for i in tg[1]] == [
+        (0.013, 0.138, "sp"), (0.138, 0.413, "TEST"), (0.413, 0.512, "sp")]
+
+    tg = Aligner.aligned_to_TextGrid(lines, 11025)
+    assert tg[0][1].xmin() == round(0.125 * 11000.0 / 11025.0 + 0.0125, 3)
+
+
+def reinsert_uncertain_quadratic(tg, text, dictionary):
+    """the original implementation, which rescans the transcription for
+    every word"""
+    uncertain = Aligner.uncertain
+    tgwords = []
+    for (n, interval) in enumerate(tg[1]):
+        if interval.mark() not in ["sp", "SP"]:
+            tgwords.append((interval.mark(), n))
+    for (n, (tgword, tgposition)) in enumerate(tgwords):
+        i = 0
+        while i <= n:
+            if (uncertain.sub(r'\1', text[i]).lstrip('*') not in dictionary
+                    and text[i] != "((xxxx))"):
+                n += 1
+            i += 1
+        if text[n] == "((xxxx))":
+            if tgword == "{NS}":
+                tg[1][tgposition].change_text(text[n])
+        elif uncertain.search(text[n]):
+            if tgword == uncertain.sub(r'\1', text[n]).lstrip('*'):
+                tg[1][tgposition].change_text(text[n])
+        elif text[n][0] == "*":
+            if tgword == text[n].lstrip('*'):
+                tg[1][tgposition].change_text(text[n])
+    return tg
+
+
+def word_tier_textgrid(words):
+    tg = praat.TextGrid()
+    tg.append(praat.IntervalTier("phone", 0, len(words)))
+    tier = praat.IntervalTier("word", 0, len(words))
+    for (n, word) in enumerate(words):
+        tier.append(praat.Interval(n, n + 1, word))
+    tg.append(tier)
+    return tg
+
+
+def test_reinsert_uncertain_matches_quadratic():
+    dictionary = {"TEST", "TESTED", "TESTER", "{NS}", "TESTING"}
+    text = ["TEST", "((TESTED))", "UNKNOWN", "*TESTER", "((xxxx))",
+            "((*TESTING))", "NOPE", "TEST", "((UNKNOWN))", "TESTED"]
+    # the aligner drops unknown words and may put "sp" between words
+    aligned = ["sp", "TEST", "TESTED", "sp", "TESTER", "{NS}", "TESTING",
+               "TEST", "sp", "TESTED", "sp"]
+    expected = reinsert_uncertain_quadratic(word_tier_textgrid(aligned), text, dictionary)
+    tg = Aligner.reinsert_uncertain(word_tier_textgrid(aligned), text, dictionary)
+    assert [i.mark() for i in tg[1]] == [i.mark() for i in expected[1]] == [
+        "sp", "TEST", "((TESTED))", "sp", "*TESTER", "((xxxx))", "((*TESTING))",
+        "TEST", "sp", "TESTED", "sp"]
+
+
+def test_select_model_rate():
+    rates = [16000, 8000, 11025]
+    # telephone recordings are aligned with the 8 kHz models, without resampling
+    assert Aligner.select_model_rate(8000, rates) == 8000
+    assert Aligner.select_model_rate(11025, rates) == 11025
+    assert Aligner.select_model_rate(12000, rates) == 11025
+    assert Aligner.select_model_rate(44100, rates) == 16000
+    # never below the lowest models
+    assert Aligner.select_model_rate(6000, rates) == 8000
+
+
+def test_split_chunk():
+    pauses = [(2.0, 2.2), (4.9, 5.1), (9.0, 9.4)]
+    assert Aligner.split_points(6.0, pauses, 10.0) == []
+    assert Aligner.split_points(12.0, pauses, 4.0) == [2.1, 5.0, 9.2]
+    assert Aligner.split_points(12.0, pauses, 8.0) == [5.0]
+    words = ["A", "BB", "CCC", "DD", "E", "FF"]
+    assert Aligner.split_text(words, [4.5, 4.5]) == [["A", "BB", "CCC"], ["DD", "E", "FF"]]
+    assert Aligner.split_text(words, [1.0, 1.0, 9.0]) == [["A"], ["BB"], ["CCC", "DD", "E", "FF"]]
+    assert Aligner.split_text(["A"], [1.0, 1.0]) is None
+
+
+def test_resplit_and_join_pieces():
+    plan = [(10.0, 1.0, ["A", "B"]), (11.0, 1.0, ["C"])]
+    fits = [
+        ["0 5000000 A1 -1.0 A\n", "5000000 9000000 B1 -1.0 B\n", "9000000 9500000 sp -1.0 sp\n"],
+        ["0 1000000 sp -1.0 sp\n", "1000000 9500000 C1 -1.0 C\n"],
+    ]
+    assert Aligner.resplit_text(plan, fits) is None
+    # the first piece ends with speech, the second begins with silence
+    wrong = [fits[0][:2], fits[1]]
+    assert Aligner.resplit_text(plan, wrong) == [(10.0, 1.0, ["A"]), (11.0, 1.0, ["B", "C"])]
+    assert Aligner.join_pieces(plan, fits) == [
+        "0 5000000 A1 -1.0 A\n", "5000000 9000000 B1 -1.0 B\n", "9000000 10000000 sp -1.0 sp\n",
+        "10000000 11000000 sp -1.0 sp\n", "11000000 19500000 C1 -1.0 C\n"]
+    assert Aligner.join_pieces(plan, [fits[0], None]) is None
+
+
+def test_join_pieces_11025():
+    # the second piece begins 30 s into the chunk, 0.1 s after its own beginning
+    plan = [(10.0, 1.0, ["A"]), (40.0, 1.0, ["C"])]
+    pieces = [["0 5000000 A1 -1.0 A\n"], ["1000000 5000000 C1 -1.0 C\n"]]
+    for SR in (16000, 11025):
+        tg = Aligner.aligned_to_TextGrid(Aligner.join_pieces(plan, pieces, SR), SR)
+        (a, c) = [i for i in tg[1] if i.mark()]
+        assert a.xmax() == c.xmin()
+        # (as aligned_to_TextGrid converts the time stamps of a single piece)
+        assert c.xmin() == pytest.approx(
+            30.0 + Aligner.aligned_to_TextGrid(pieces[1], SR)[1][0].xmin(), abs=0.001)
+
+
+def synthetic_models(directory):
+    """copies the configuration of the 16 kHz models to directory, with
+    random HMMs for all monophones"""
+    model = pkg_resources.resource_filename("fave.align", "model")
+    os.makedirs(os.path.join(directory, "16000"))
+    for name in ("16000/config", "16000/macros", "monophones"):
+        shutil.copy(os.path.join(model, name), os.path.join(directory, name))
+    rng = np.random.default_rng(0)
+    vector = lambda values: " ".join("%.3f" % v for v in values) + "\n"
+    with open(os.path.join(directory, "monophones")) as f:
+        phones = f.read().split()
+    with open(os.path.join(directory, "16000", "hmmdefs"), "w") as f:
+        for phone in phones:
+            states = 1 if phone == "sp" else 3
+            f.write('~h "%s"\n<BEGINHMM>\n<NUMSTATES> %i\n' % (phone, states + 2))
+            for state in range(2, states + 2):
+                f.write("<STATE> %i\n<MEAN> 39\n" % state + vector(rng.normal(size=39)) +
+                        "<VARIANCE> 39\n" + vector([4.0] * 39))
+            transitions = np.zeros((states + 2, states + 2))
+            transitions[0, 1] = 1.0
+            for state in range(1, states + 1):
+                transitions[state, state:state + 2] = (0.6, 0.4)
+            if phone == "sp":
+                transitions[0, 1:3] = (0.7, 0.3)
+            f.write("<TRANSP> %i\n" % (states + 2) + "".join(vector(row) for row in transitions) +
+                    "<ENDHMM>\n")
+
+
+def synthetic_aligner(directory, lines, **options):
+    """an Aligner for a noise recording and a transcript of lines, with the
+    random models in directory/fave/align/model"""
+    synthetic_models(str(directory / "fave" / "align" / "model"))
+    (directory / "dict").write_text(
+        "TEST  T EH1 S T\nTESTER  T EH1 S T ER0\nsil  sil\nsp  sp\n")
+    (directory / "interview.txt").write_text("".join(lines))
+    rng = np.random.default_rng(1)
+    audio.write(str(directory / "interview.wav"),
+                rng.normal(0, 1000, 16000 * (2 * len(lines) + 1)), 16000)
+    kwargs = {"verbose": 0, "dict": str(directory / "dict"), "import": None, "check": None,
+              "htktoolspath": "", "features": "numpy", "backend": "numpy",
+              "scratch": str(directory)}
+    kwargs.update(options)
+    aligner = Aligner(str(directory / "interview.wav"), str(directory / "interview.txt"),
+                      str(directory / "interview.TextGrid"), **kwargs)
+    aligner.read_transcript()
+    aligner.check_transcript()
+    aligner.check_against_dictionary()
+    return aligner
+
+
+def test_align_reentrant(tmp_path):
+    aligner = synthetic_aligner(tmp_path, [
+        "A\tAnn\t0.5\t2.0\tTEST ((TESTER)) TEST\n",
+        "B\tBob\t2.5\t4.0\tTESTER TEST\n"])
+    model_dir = aligner.model_dir
+    fadir = str(tmp_path / "fave")
+    single = aligner.align(FADIR=fadir, textgrid=str(tmp_path / "single.TextGrid"),
+                           logfile=str(tmp_path / "single.FAAVlog"))
+    assert not single.failed_alignment
+    assert sum(single.count_beams.values()) == single.count_chunks == 2
+
+    # the same Aligner aligns in several threads at once, each run with its
+    # own results, models and output files
+    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(
+            lambda n: aligner.align(FADIR=fadir, textgrid=str(tmp_path / ("%i.TextGrid" % n)),
+                                    logfile=str(tmp_path / ("%i.FAAVlog" % n))),
+            range(4)))
+    assert len({id(result) for result in results}) == 4
+    for (n, result) in enumerate(results):
+        assert result.model_dir == str(tmp_path / "fave" / "align" / "model")
+        assert (result.count_words, result.count_uncertain, result.count_chunks) == (5, 1, 2)
+        assert result.sampling_rate == 16000
+        assert not result.failed_alignment
+        assert result.count_beams == single.count_beams
+        assert result.textgrid == str(tmp_path / ("%i.TextGrid" % n))
+        assert (tmp_path / ("%i.TextGrid" % n)).read_text() == (
+            tmp_path / "single.TextGrid").read_text()
+        assert (tmp_path / ("%i.FAAVlog" % n)).read_text().split("\n")[1:] == (
+            tmp_path / "single.FAAVlog").read_text().split("\n")[1:]
+    assert aligner.model_dir == model_dir
+    # nothing is left behind but the TextGrids and the logs
+    assert sorted(os.listdir(tmp_path)) == sorted(
+        ["dict", "dict.snapshot", "fave", "interview.txt", "interview.wav",
+         "single.TextGrid", "single.FAAVlog"] +
+        ["%i.%s" % (n, ext) for n in range(4) for ext in ("TextGrid", "FAAVlog")])
+
+
+def test_align_jobs(tmp_path):
+    lines = ["%s\t%s\t%.1f\t%.1f\t%s\n" % (
+        "AB"[n % 2], ("Ann", "Bob")[n % 2], 2 * n + 0.5, 2 * n + 2.0,
+        " ".join(["TEST", "TESTER", "TEST"][:n % 3 + 1])) for n in range(7)]
+    textgrids = []
+    for jobs in (1, 3):
+        (tmp_path / str(jobs)).mkdir()
+        aligner = synthetic_aligner(tmp_path / str(jobs), lines, jobs=jobs)
+        result = aligner.align(FADIR=str(tmp_path / str(jobs) / "fave"))
+        assert not result.failed_alignment and result.count_chunks == 7
+        textgrids.append((tmp_path / str(jobs) / "interview.TextGrid").read_text())
+    # the batches aligned in parallel come back in the order of the transcript
+    assert textgrids[0] == textgrids[1]
+    tg = praat.TextGrid()
+    tg.read(str(tmp_path / "3" / "interview.TextGrid"))
+    words = sorted((i.xmin(), i.mark()) for tier in tg if tier.name().endswith("word")
+                   for i in tier if i.mark() not in ("", "sp"))
+    assert [w for (_, w) in words] == [w for line in lines for w in line.split("\t")[4].split()]
+
+
+def test_align_pruning_retries(tmp_path, monkeypatch):
+    # too narrow a beam for any chunk, then wide enough for all of them
+    monkeypatch.setitem(Aligner.PRUNING, "test", (0.0, 1.0e6, None))
+    aligner = synthetic_aligner(tmp_path, [
+        "A\tAnn\t0.5\t2.0\tTEST ((TESTER)) TEST\n",
+        "B\tBob\t2.5\t4.0\tTESTER TEST\n"], pruning="test")
+    result = aligner.align(FADIR=str(tmp_path / "fave"))
+    assert not result.failed_alignment
+    assert result.count_beams == {1.0e6: 2}
+    log = (tmp_path / "interview.FAAVlog").read_text()
+    assert "Pruning:\t\t\t\ttest\n->\tbreath groups aligned with beam 1000000.0:\t2\n" in log
+
+
+def test_align_precision_zero(tmp_path):
+    aligner = synthetic_aligner(tmp_path, ["A\tAnn\t0.5\t2.0\tTEST\n"], precision=0)
+    aligner.align(FADIR=str(tmp_path / "fave"))
+    lines = (tmp_path / "interview.TextGrid").read_text().splitlines()
+    assert "xmin = 0" in lines
+    assert not [line for line in lines if "xmin =" in line and "." in line]
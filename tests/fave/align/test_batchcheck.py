@@ -0,0 +1,78 @@
+import logging
+import multiprocessing
+import pytest
+from fave.align import batchcheck
+
+CMU_EXCERPT = """TEST  T EH1 S T 
+TESTERS  T EH1 S T ER0 Z 
+"""
+
+TRANSCRIPTS = {
+    "a.txt": "A\tSpeaker\t0.0\t1.0\ttest foo\nA\tSpeaker\t1.0\t2.0\tfoo bar\n",
+    "b.txt": "B\tSpeaker\t0.0\t1.0\ttesters bar foo\n",
+    "c.txt": "C\tSpeaker\t0.0\t1.0\ttest testers\n",
+}
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    (tmp_path / "cmu.dict").write_text(CMU_EXCERPT)
+    corpus_dir = tmp_path / "corpus"
+    corpus_dir.mkdir()
+    for (name, text) in TRANSCRIPTS.items():
+        (corpus_dir / name).write_text(text)
+    return tmp_path
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_check_corpus(corpus, jobs):
+    report = corpus / "corpus" / "unknown.txt"
+    (unknown, counts) = batchcheck.check_corpus(
+        str(corpus / "corpus"), str(report), str(corpus / "cmu.dict"), jobs=jobs,
+        verbose=logging.WARNING)
+    assert list(unknown) == ["FOO", "BAR"]
+    assert report.read_text() == (
+        "FOO\t\t\ttesters bar foo\n"
+        "BAR\t\tFOO\ttesters bar foo\n")
+
+    a = str(corpus / "corpus" / "a.txt")
+    b = str(corpus / "corpus" / "b.txt")
+    assert counts["FOO"] == {a: (2, "foo bar"), b: (1, "testers bar foo")}
+    assert (corpus / "corpus" / "unknown_files.txt").read_text() == (
+        "FOO\t%s\t2\tfoo bar\n" % a +
+        "FOO\t%s\t1\ttesters bar foo\n" % b +
+        "BAR\t%s\t1\tfoo bar\n" % a +
+        "BAR\t%s\t1\ttesters bar foo\n" % b)
+
+    # the reports are not checked as transcripts on the next run
+    assert batchcheck.check_corpus(
+        str(corpus / "corpus"), str(report), str(corpus / "cmu.dict"), jobs=jobs)[1] == counts
+
+
+def test_transcript_files_manifest(corpus):
+    manifest = corpus / "manifest"
+    manifest.write_text("# transcripts\ncorpus/c.txt\n\ncorpus/a.txt\n")
+    assert batchcheck.transcript_files(str(manifest)) == [
+        str(corpus / "corpus" / "c.txt"), str(corpus / "corpus" / "a.txt")]
+
+
+def test_check_corpus_spawned_workers_import_nothing(corpus, monkeypatch):
+    # workers that do not inherit the dictionary (as on macOS and Windows)
+    get_context = multiprocessing.get_context
+    monkeypatch.setattr(batchcheck.multiprocessing, "get_all_start_methods", lambda: ["spawn"])
+    monkeypatch.setattr(batchcheck.multiprocessing, "get_context",
+                        lambda *args: get_context("spawn"))
+    monkeypatch.chdir(corpus)
+    (corpus / "import.txt").write_text("FOO\tF UW1\n")
+    (unknown, _) = batchcheck.check_corpus(
+        str(corpus / "corpus"), str(corpus / "unknown.txt"), str(corpus / "cmu.dict"),
+        jobs=2, import_file=str(corpus / "import.txt"))
+    assert list(unknown) == ["BAR"]
+    # the entries are imported (and recorded) once, by the main process
+    assert (corpus / "added_dict_entries.txt").read_text() == "FOO  F UW1 \n"
+
+    (corpus / "added_dict_entries.txt").unlink()
+    monkeypatch.setattr(batchcheck, "_dictionary", None)
+    batchcheck._init_worker(str(corpus / "cmu.dict"), {"FOO": [["F", "UW1"]]}, logging.WARNING)
+    assert batchcheck._dictionary.cmu_dict["FOO"] == [["F", "UW1"]]
+    assert not (corpus / "added_dict_entries.txt").exists()
@@ -0,0 +1,70 @@
+import os
+from fave.align import cache
+
+
+def test_key():
+    assert cache.key(b"ab", "c") == cache.key(b"ab", "c")
+    # parts are kept apart
+    assert cache.key(b"ab", b"c") != cache.key(b"a", b"bc")
+    assert cache.key({"a": 1, "b": [2]}) == cache.key({"b": [2], "a": 1})
+    assert len(cache.key()) == 64
+
+
+def test_file_digest(tmp_path):
+    path = tmp_path / "hmmdefs"
+    assert cache.file_digest(str(path)) is None
+    path.write_text("one")
+    first = cache.file_digest(str(path))
+    path.write_text("two!")
+    assert cache.file_digest(str(path)) != first
+
+
+def test_disk_cache(tmp_path):
+    store = cache.DiskCache(str(tmp_path / "alignments"))
+    key = cache.key("line")
+    assert store.get(key) is None
+    store.put(key, b"0 100000 sp -1.0 sp\n")
+    assert store.get(key) == b"0 100000 sp -1.0 sp\n"
+    # (in a shared cache, by another instance)
+    store.put(key, b"")
+    assert cache.DiskCache(str(tmp_path / "alignments")).get(key) == b""
+    assert os.listdir(os.path.dirname(store.path(key))) == [key]
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    store = cache.DiskCache(str(tmp_path / "features"), max_size=250)
+    keys = [cache.key(n) for n in range(3)]
+    for (n, key) in enumerate(keys):
+        store.put(key, b"x" * 100)
+        # (distinct times of last use)
+        os.utime(store.path(key), ns=(n * 10**9, n * 10**9))
+    # the first entry was removed to make room for the third
+    assert store.get(keys[0]) is None
+    assert store.get(keys[1]) == b"x" * 100
+    os.utime(store.path(keys[2]), ns=(0, 0))
+    store.put(cache.key(3), b"y" * 100)
+    # the second entry was used last, so the third one goes
+    assert store.get(keys[1]) is not None and store.get(keys[2]) is None
+    # the entries already there count as well
+    smaller = cache.DiskCache(str(tmp_path / "features"), max_size=150)
+    smaller.put(cache.key(4), b"z" * 50)
+    assert sum(size for (_, _, size) in smaller.entries()) <= 150
+    assert smaller.get(cache.key(4)) == b"z" * 50
+
+
+def test_disk_cache_evicts_below_max_size(tmp_path, monkeypatch):
+    store = cache.DiskCache(str(tmp_path / "features"), max_size=1000)
+    for n in range(11):
+        store.put(cache.key(n), b"x" * 100)
+        os.utime(store.path(cache.key(n)), ns=(n * 10**9, n * 10**9))
+    # the cache was full:  room was made for more than the new entry
+    assert sum(size for (_, _, size) in store.entries()) == 900
+    assert store.get(cache.key(1)) is None and store.get(cache.key(2)) == b"x" * 100
+    # so the next entry is added without scanning the directory
+    scans = []
+    entries = store.entries
+    monkeypatch.setattr(store, "entries", lambda: scans.append(1) or entries())
+    store.put(cache.key(11), b"x" * 100)
+    assert not scans
+    store.put(cache.key(12), b"x" * 100)
+    assert len(scans) == 1
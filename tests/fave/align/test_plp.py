@@ -0,0 +1,193 @@
+import math
+import os
+import numpy as np
+import pytest
+from fave import audio
+from fave.align import plp
+
+FAVE = os.path.join(os.path.dirname(__file__), "..", "..", "..", "fave")
+DATA = os.path.join(os.path.dirname(__file__), "..", "data")
+
+CONFIG = """# Coding parameters
+SOURCEKIND = WAVEFORM
+SOURCEFORMAT = WAVE
+SOURCERATE = 625.0
+TARGETKIND = {kind}
+TARGETRATE = 100000.0
+SAVECOMPRESSED = T
+SAVEWITHCRC = T
+WINDOWSIZE = 250000.0
+ZMEANSOURCE = T
+USEHAMMING = T
+PREEMCOEF = 0.97
+NUMCHANS = 20
+LPCORDER = 12 
+USEPOWER = T
+"""
+
+
+def htk_plp_frame(s, num_chans=20, order=12, num_ceps=12, lifter=22, compress=0.33):
+    """PLP cepstra c1..c12 and c0 of a 16 kHz frame, transliterated loop by
+    loop from HTK's HSigP.c (with 1-based arrays)"""
+    n = len(s)
+    s = [0.0] + list(s)
+    mean = sum(s[1:]) / n
+    for i in range(1, n + 1):
+        s[i] -= mean
+    for i in range(n, 1, -1):
+        s[i] -= s[i - 1] * 0.97
+    s[1] *= 1.0 - 0.97
+    for i in range(1, n + 1):
+        s[i] *= 0.54 - 0.46 * math.cos(2 * math.pi / (n - 1) * (i - 1))
+    fft_n = 512
+    nby2 = fft_n // 2
+    fres = 1.0e7 / (625.0 * fft_n * 700.0)
+    mel = lambda k: 1127 * math.log(1 + (k - 1) * fres)
+    max_chan = num_chans + 1
+    cf = [0.0] + [chan / max_chan * mel(nby2 + 1) for chan in range(1, max_chan + 1)]
+    lo_chan = [0] * (nby2 + 1)
+    lo_wt = [0.0] * (nby2 + 1)
+    chan = 1
+    for k in range(1, nby2 + 1):
+        if k < 2:
+            lo_chan[k] = -1
+        else:
+            while chan <= max_chan and cf[chan] < mel(k):
+                chan += 1
+            lo_chan[k] = chan - 1
+    for k in range(2, nby2 + 1):
+        c = lo_chan[k]
+        if c > 0:
+            lo_wt[k] = (cf[c + 1] - mel(k)) / (cf[c + 1] - cf[c])
+        else:
+            lo_wt[k] = (cf[1] - mel(k)) / cf[1]
+    spectrum = np.fft.fft(np.concatenate([s[1:], np.zeros(fft_n - n)]))
+    fbank = [0.0] * (num_chans + 2)
+    for k in range(2, nby2 + 1):
+        ek = abs(spectrum[k - 1]) ** 2
+        b = lo_chan[k]
+        t1 = lo_wt[k] * ek
+        if b > 0:
+            fbank[b] += t1
+        if b < num_chans:
+            fbank[b + 1] += ek - t1
+    # InitPLP and FBank2ASpec
+    n_freq = num_chans + 2
+    aspec = [0.0] * (n_freq + 1)
+    for i in range(1, num_chans + 1):
+        f = 700 * (math.exp(cf[i] / 1127) - 1)
+        fsq = f * f
+        fsub = fsq / (fsq + 1.6e5)
+        eql = fsub * fsub * ((fsq + 1.44e6) / (fsq + 9.61e6))
+        aspec[i + 1] = (max(fbank[i], 1.0) * eql) ** compress
+    aspec[1] = aspec[2]
+    aspec[n_freq] = aspec[n_freq - 1]
+    # ASpec2LPCep
+    base = math.pi / (n_freq - 1)
+    ac = [0.0] * (order + 2)
+    for i in range(order + 1):
+        acc = aspec[1]
+        for j in range(1, n_freq - 1):
+            acc += 2.0 * math.cos(base * i * j) * aspec[j + 1]
+        acc += math.cos(base * i * (n_freq - 1)) * aspec[n_freq]
+        ac[i + 1] = acc / (2.0 * (n_freq - 1))
+    a = [0.0] * (order + 1)
+    e = ac[1]
+    for i in range(1, order + 1):
+        ki = ac[i + 1]
+        for j in range(1, i):
+            ki += a[j] * ac[i - j + 1]
+        ki /= e
+        e *= 1 - ki * ki
+        new = list(a)
+        new[i] = -ki
+        for j in range(1, i):
+            new[j] = a[j] - ki * a[i - j]
+        a = new
+    c = [0.0] * (num_ceps + 1)
+    for m in range(1, num_ceps + 1):
+        total = 0.0
+        for i in range(1, m):
+            total += (m - i) * a[i] * c[m - i]
+        c[m] = -(a[m] + total / m)
+    for i in range(1, num_ceps + 1):
+        c[i] *= 1.0 + lifter / 2.0 * math.sin(i * math.pi / lifter)
+    return c[1:] + [math.log(e)]
+
+
+@pytest.fixture
+def config(tmp_path):
+    def make(kind):
+        path = tmp_path / (kind + ".config")
+        path.write_text(CONFIG.format(kind=kind))
+        return plp.read_config(str(path))
+    return make
+
+
+def test_plp_matches_hsigp_transliteration(config):
+    rng = np.random.default_rng(0)
+    t = np.arange(720) / 16000
+    samples = np.rint(3000 * np.sin(2 * np.pi * 440 * t) + rng.normal(0, 300, len(t)))
+    cepstra = plp.features(samples, config("PLP_0"))
+    assert cepstra.shape == (3, 13)
+    for (i, start) in enumerate([0, 160, 320]):
+        assert np.allclose(cepstra[i], htk_plp_frame(samples[start:start + 400]), atol=1e-9)
+
+
+def test_plp_matches_hcopy():
+    # made by HTK 3.4.1 with the aligner's 11025 Hz config:
+    #   HCopy -C fave/align/model/11025/config fave/align/examples/test/BREY00538.wav \
+    #       tests/fave/data/BREY00538.plp
+    reference = os.path.join(DATA, "BREY00538.plp")
+    if not os.path.exists(reference):
+        pytest.skip("no HCopy output to compare with")
+    (samples, rate) = audio.read(os.path.join(FAVE, "align", "examples", "test", "BREY00538.wav"))
+    cepstra = plp.features(samples[:, 0], plp.read_config(
+        os.path.join(FAVE, "align", "model", "11025", "config")))
+    (vectors, period, kind) = plp.read(reference)
+    assert cepstra.shape == vectors.shape
+    # (HCopy computes in single precision and stores 16-bit integers)
+    assert (np.abs(cepstra - vectors).max(axis=0) <= 0.01 * np.ptp(vectors, axis=0)).all()
+
+
+def test_plp_deltas_and_normalization(config):
+    rng = np.random.default_rng(1)
+    samples = np.rint(rng.normal(0, 1000, 16000))
+    static = plp.features(samples, config("PLP_0"))
+    full = plp.features(samples, config("PLP_0_D_A_Z"))
+    assert full.shape == (98, 39)
+    assert np.allclose(full[:, :13], static - static.mean(axis=0))
+    assert np.allclose(full[:, 13:26], plp.deltas(full[:, :13], 2))
+    assert np.allclose(full[:, 26:], plp.deltas(full[:, 13:26], 2))
+    ramp = np.arange(10.0)[:, None]
+    assert np.allclose(plp.deltas(ramp, 2)[2:-2], 1.0)
+    with pytest.raises(ValueError):
+        plp.features(samples, config("MFCC_0_D_A"))
+
+
+def test_htk_parameter_file(tmp_path, config):
+    samples = np.rint(np.random.default_rng(2).normal(0, 1000, 8000))
+    cfg = config("PLP_0_D_A_Z")
+    plp.convert(samples, str(tmp_path / "chunk.plp"), cfg)
+    data = (tmp_path / "chunk.plp").read_bytes()
+    # 48 frames of 39 big-endian floats, every 10 ms, PLP_0_D_A_Z
+    assert data[:12] == bytes.fromhex("00000030 000186a0 009c 2b0b")
+    (vectors, period, kind) = plp.read(str(tmp_path / "chunk.plp"))
+    assert (period, kind) == (100000, 11019)
+    assert np.allclose(vectors, plp.features(samples, cfg), atol=1e-5)
+
+
+def test_compressed_htk_parameter_file(tmp_path):
+    vectors = np.array([[1.0, -2.0], [0.5, 4.0], [-1.0, 0.0]])
+    (low, high) = (vectors.min(axis=0), vectors.max(axis=0))
+    scale = 2 * 32767 / (high - low)
+    offset = (high + low) * 32767 / (high - low)
+    compressed = np.rint(vectors * scale - offset)
+    kind = plp.parameter_kind("PLP") | plp.QUALIFIERS['C'] | plp.QUALIFIERS['K']
+    (tmp_path / "chunk.plp").write_bytes(
+        plp.HEADER.pack(3 + 4, 100000, 4, kind) +
+        scale.astype('>f4').tobytes() + offset.astype('>f4').tobytes() +
+        compressed.astype('>i2').tobytes() + b"\0\0")
+    (read, period, read_kind) = plp.read(str(tmp_path / "chunk.plp"))
+    assert (period, read_kind) == (100000, kind)
+    assert np.allclose(read, vectors, atol=1e-3)
@@ -145,3 +145,54 @@ def provide_value_error_file():
 
     ]
 
+
+def test_check_dictionary_entries_by_type(tmp_path):
+    dict_file = tmp_path / "cmu.dict"
+    dict_file.write_text(CMU_EXCERPT + "GOING  G OW1 IH0 NG \n")
+    lines = [
+        "test testers foo",
+        "foo bar goin' ((test)) ((baz))",
+        "tes- +test foo",
+        "*qux test bar goin' testin'",
+    ]
+    flags = {'prompt': False, 'check': str(tmp_path / "unknown.txt"), 'verbose': logging.DEBUG}
+
+    def processor():
+        tp_obj = transcriptprocessor.TranscriptProcessor(
+            tmp_path / "transcript.txt",
+            cmudictionary.CMU_Dictionary(dict_file, **KWARGS),
+            **flags)
+        tp_obj.trans_lines = list(lines)
+        return tp_obj
+
+    tp_obj = processor()
+    tp_obj.check_dictionary_entries("interview.wav")
+    assert "GOIN'" in tp_obj.dictionary.cmu_dict
+
+    # check every word in turn, as check_dictionary_entries used to
+    reference = processor()
+    unknown = {}
+    for line in lines:
+        words = reference.preprocess_transcription(line.strip().upper())
+        for i, w in enumerate(words):
+            next_word = words[i + 1] if i < len(words) - 1 else ''
+            unknown = reference.dictionary.check_word(w, next_word, unknown, line)
+    # listed in order of first appearance, with their last clue and line
+    assert list(unknown) == ["FOO", "BAR", "TEST", "TES-", "TESTIN'"]
+    assert unknown["FOO"] == ("", "", lines[2])
+    assert unknown["BAR"] == ("", "GOIN'", lines[3])
+    assert (tmp_path / "unknown.txt").read_text() == reference.dictionary._write_words(unknown)
+
+@pytest.mark.parametrize("line, expected", [
+    ("DAUGHTER-IN-LAW, UH-HUH-UH.", ["DAUGHTER", "IN", "LAW", "UH", "HUH", "UH"]),
+    ("'CAUSE I'M GOIN' - TES- +TEST", ["CAUSE", "I'M", "GOIN'", "TES-", "+TEST"]),
+    ("WES2T SIDE 100% -- \"YEAH\"?!", ["WES", "SIDE", "YEAH"]),
+    ("I ((THINK SO)) (( )) OK", ["I", "((THINK))", "((SO))", "((xxxx))", "OK"]),
+])
+def test_preprocess_transcription(line, expected):
+    tp_obj = transcriptprocessor.TranscriptProcessor(
+        "transcript.txt",
+        cmudictionary.CMU_Dictionary.__new__(cmudictionary.CMU_Dictionary),
+        prompt=False, check='', verbose=logging.DEBUG)
+    assert tp_obj.preprocess_transcription(line) == expected
+    assert not tp_obj.flag_uncertain
@@ -0,0 +1,165 @@
+import numpy as np
+import pytest
+from fave.align import plp
+from fave.align import viterbi
+from fave.align.aligner import Aligner
+
+LEFT_TO_RIGHT = """<TRANSP> 5
+ 0 1 0 0 0
+ 0 0.6 0.4 0 0
+ 0 0 0.6 0.4 0
+ 0 0 0 0.6 0.4
+ 0 0 0 0 0"""
+
+MACROS = """~o
+<STREAMINFO> 1 1
+<VECSIZE> 1<NULLD><USER><DIAGC>
+~v "varFloor1"
+<VARIANCE> 1
+ 1.0e-02
+"""
+
+HMMDEFS = """~s "silst"
+<MEAN> 1
+ 0.0
+<VARIANCE> 1
+ 0.1
+~t "lr"
+""" + LEFT_TO_RIGHT + """
+~h "sil"
+<BEGINHMM>
+<NUMSTATES> 5
+<STATE> 2
+<MEAN> 1
+ 0.0
+<VARIANCE> 1
+ 0.1
+<STATE> 3
+~s "silst"
+<STATE> 4
+<MEAN> 1
+ 0.0
+<VARIANCE> 1
+ 0.1
+~t "lr"
+<ENDHMM>
+~h "A"
+<BEGINHMM>
+<NUMSTATES> 5
+""" + "".join("""<STATE> %i
+<NUMMIXES> 2
+<MIXTURE> 1 0.5
+<MEAN> 1
+ 4.5
+<VARIANCE> 1
+ 0.5
+<GCONST> %f
+<MIXTURE> 2 0.5
+<MEAN> 1
+ 5.5
+<VARIANCE> 1
+ 0.5
+""" % (i, np.log(2 * np.pi * 0.5)) for i in (2, 3, 4)) + LEFT_TO_RIGHT + """
+<ENDHMM>
+~h "B"
+<BEGINHMM>
+<NUMSTATES> 5
+""" + "".join("""<STATE> %i
+<MEAN> 1
+ 10.0
+~v "varFloor1"
+""" % i for i in (2, 3, 4)) + LEFT_TO_RIGHT + """
+<ENDHMM>
+~h "sp"
+<BEGINHMM>
+<NUMSTATES> 3
+<STATE> 2
+~s "silst"
+<TRANSP> 3
+ 0 0.7 0.3
+ 0 0.6 0.4
+ 0 0 0
+<ENDHMM>
+"""
+
+DICT = """A  A
+B  B
+NO  B
+NO  A
+YES  A B
+sp  sp
+"""
+
+
+@pytest.fixture
+def models(tmp_path):
+    (tmp_path / "macros").write_text(MACROS)
+    (tmp_path / "hmmdefs").write_text(HMMDEFS)
+    return viterbi.read_models(str(tmp_path / "macros"), str(tmp_path / "hmmdefs"))
+
+
+def test_read_models(models, monkeypatch):
+    assert sorted(models) == ["A", "B", "sil", "sp"]
+    # tied states and transitions are shared
+    assert models["sp"].states[0] is models["sil"].states[1]
+    assert models["A"].transitions is not models["sil"].transitions
+    assert np.exp(models["sp"].transitions[0, 2]) == pytest.approx(0.3)
+    (state,) = models["B"].states[:1]
+    assert state.precisions.tolist() == [[100.0]]
+    features = np.array([[5.0], [10.0]])
+    # the density of a single Gaussian with GCONST computed, and of a mixture
+    expected = -0.5 * (np.log(2 * np.pi * 0.01) + np.array([2500.0, 0.0]))
+    assert np.allclose(viterbi.log_likelihoods(features, [state])[:, 0], expected)
+    mixture = 0.5 * (np.exp(-0.5 * 0.25 / 0.5) + np.exp(-0.5 * 0.25 / 0.5)) / np.sqrt(np.pi)
+    assert viterbi.log_likelihoods(features, models["A"].states[:1])[0, 0] == pytest.approx(
+        np.log(mixture))
+
+    # computed in blocks of frames
+    features = np.linspace(0.0, 10.0, 25)[:, None]
+    states = models["A"].states + models["B"].states
+    expected = viterbi.log_likelihoods(features, states)
+    monkeypatch.setattr(viterbi, "BLOCK", 4)
+    assert np.allclose(viterbi.log_likelihoods(features, states), expected)
+
+
+def test_align(tmp_path, models):
+    (tmp_path / "dict").write_text(DICT)
+    dictionary = viterbi.read_dictionary(str(tmp_path / "dict"))
+    assert dictionary["NO"] == [("B",), ("A",)]
+    features = np.array([0.0] * 3 + [5.0] * 6 + [10.0] * 6 + [5.0] * 6 + [0.0] * 3)[:, None]
+    lines = viterbi.align(features, ["sp", "YES", "sp", "NO", "sp"], dictionary, models, 100000)
+    assert [line.split()[:3] + line.split()[4:] for line in lines] == [
+        ["0", "300000", "sp", "sp"],
+        ["300000", "900000", "A", "YES"],
+        ["900000", "1500000", "B"],
+        # the short pause between the words is skipped
+        ["1500000", "1500000", "sp", "sp"],
+        ["1500000", "2100000", "A", "NO"],
+        ["2100000", "2400000", "sp", "sp"],
+    ]
+    assert float(lines[3].split()[3]) == pytest.approx(np.log(0.3))
+    # pruning
+    words = ["sp", "YES", "sp", "NO", "sp"]
+    assert viterbi.align(features, words, dictionary, models, 100000, beam=10.0) == lines
+    assert viterbi.align(features, words, dictionary, models, 100000, beam=0.1) is None
+    # too few frames for the phones
+    assert viterbi.align(features[:4], ["YES"], dictionary, models, 100000) is None
+
+
+def test_align_files(tmp_path, models):
+    (tmp_path / "dict").write_text(DICT)
+    (tmp_path / "tmp.mlf").write_text(
+        '#!MLF!#\n"*/tmp1.lab"\nsp\nYES\nsp\n.\n"*/tmp2.lab"\nsp\nB\nsp\n.\n')
+    plp.write(str(tmp_path / "tmp1.plp"), [[0.0]] * 2 + [[5.0]] * 3 + [[10.0]] * 4, 100000, "PLP")
+    plp.write(str(tmp_path / "tmp2.plp"), [[10.0]] * 2, 100000, "PLP")
+    (tmp_path / "test.scp").write_text(
+        '"%s"\n"%s"\n' % (tmp_path / "tmp1.plp", tmp_path / "tmp2.plp"))
+    viterbi.align_files(
+        str(tmp_path / "tmp.mlf"), str(tmp_path / "test.scp"), str(tmp_path / "aligned.mlf"),
+        str(tmp_path / "dict"), [str(tmp_path / "macros"), str(tmp_path / "hmmdefs")])
+    aligned = Aligner.read_aligned_mlf(str(tmp_path / "aligned.mlf"))
+    # the second utterance is too short for its phones
+    assert list(aligned) == ["tmp1"]
+    tg = Aligner.aligned_to_TextGrid(aligned["tmp1"], 16000)
+    assert [(i.mark(), i.xmin(), i.xmax()) for i in tg[1]] == [
+        ("sp", 0.013, 0.033), ("YES", 0.033, 0.102)]
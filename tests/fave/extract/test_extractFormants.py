@@ -1,6 +1,8 @@
 
 from cmath import nan
 import logging
+import shutil
+import wave
 import pytest
 import numpy as np
 from fave import extractFormants
@@ -56,3 +58,32 @@ def provide_valuelist():
 
     
 
+
+
+@pytest.mark.skipif(shutil.which("sox") is None, reason="SoX is not installed")
+def test_extractPortion_matches_sox(tmp_path, monkeypatch):
+    rng = np.random.default_rng(0)
+    with wave.open(str(tmp_path / "main.wav"), "wb") as f:
+        f.setnchannels(2)
+        f.setsampwidth(2)
+        f.setframerate(22050)
+        f.writeframes(rng.integers(-3000, 3000, (22050, 2)).astype("<i2").tobytes())
+    monkeypatch.setattr(extractFormants, "SCRIPTS_HOME", str(tmp_path))
+    monkeypatch.setattr(extractFormants, "SOXPATH", "", raising=False)
+
+    def read(name):
+        with wave.open(str(tmp_path / name)) as f:
+            return (f.getframerate(), f.getnchannels(), f.getsampwidth(),
+                    f.readframes(f.getnframes()))
+
+    # the samples are copied in memory ...
+    extractFormants.extractPortion(str(tmp_path / "main.wav"), "memory.wav", 0.2, 0.6, "sox")
+    # ... as SoX copies them for files the wave module cannot read
+    def unreadable(*args):
+        raise wave.Error("unknown format")
+    monkeypatch.setattr(extractFormants.audio, "extract", unreadable)
+    extractFormants.extractPortion(str(tmp_path / "main.wav"), "sox.wav", 0.2, 0.6, "sox")
+    (rate, channels, width, frames) = read("memory.wav")
+    assert (rate, channels, width) == (22050, 2, 2)
+    assert len(frames) == round(0.4 * 22050) * channels * width
+    assert read("sox.wav") == (rate, channels, width, frames)
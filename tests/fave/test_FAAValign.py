@@ -0,0 +1,24 @@
+import argparse
+import pytest
+from fave import FAAValign
+
+
+def test_jobs_must_be_positive(capsys):
+    parser = FAAValign.defineArguments(argparse.ArgumentParser())
+    assert parser.parse_args(["--jobs", "4", "interview.wav"]).jobs == 4
+    for jobs in ("0", "-2", "two"):
+        with pytest.raises(SystemExit):
+            parser.parse_args(["--jobs", jobs, "interview.wav"])
+    err = capsys.readouterr().err
+    assert "0 is not a positive number" in err and "-2 is not a positive number" in err
+
+
+def test_check_writes_unknown_words(tmp_path):
+    (tmp_path / "cmu.dict").write_text("TEST  T EH1 S T \nsp  sp \n")
+    (tmp_path / "interview.txt").write_text("A\tAnn\t0.5\t2.0\ttest foo\n")
+    parser = FAAValign.defineArguments(argparse.ArgumentParser())
+    args = parser.parse_args([
+        "--check", str(tmp_path / "unknown.txt"), "--dict", str(tmp_path / "cmu.dict"),
+        str(tmp_path / "interview.txt")])
+    FAAValign.main(**FAAValign.parseArgs(**vars(args)))
+    assert (tmp_path / "unknown.txt").read_text().startswith("FOO\t")
@@ -0,0 +1,105 @@
+import shutil
+import subprocess
+import wave
+import numpy as np
+import pytest
+from fave import audio
+
+
+def write_wav(path, samples, rate, sampwidth=2):
+    samples = np.asarray(samples)
+    with wave.open(str(path), 'wb') as f:
+        f.setnchannels(1 if samples.ndim == 1 else samples.shape[1])
+        f.setsampwidth(sampwidth)
+        f.setframerate(rate)
+        f.writeframes(samples.astype('<i%d' % sampwidth).tobytes())
+
+
+@pytest.mark.parametrize("rate_in, rate_out", [(44100, 16000), (8000, 16000), (22050, 11025)])
+def test_resample_sine(rate_in, rate_out):
+    x = 10000 * np.sin(2 * np.pi * 440 * np.arange(rate_in) / rate_in)
+    y = audio.resample(x, rate_in, rate_out)
+    assert len(y) == rate_out
+    ideal = 10000 * np.sin(2 * np.pi * 440 * np.arange(rate_out) / rate_out)
+    # ignore the edges, where the filter runs into the zero padding
+    assert np.abs(y[100:-100] - ideal[100:-100]).max() < 10
+
+
+def test_resample_attenuates_above_nyquist():
+    def gain(frequency):
+        x = 10000 * np.sin(2 * np.pi * frequency * np.arange(44100) / 44100)
+        y = audio.resample(x, 44100, 16000)[1000:-1000]
+        return np.sqrt(2 * np.mean(y * y)) / 10000
+    assert gain(7000) > 0.99
+    # (would alias to 7800 Hz)
+    assert gain(8200) < 0.01
+
+
+def test_load_in_blocks(tmp_path, monkeypatch):
+    rng = np.random.default_rng(0)
+    stereo = rng.integers(-2 ** 23, 2 ** 23, (44100, 2))
+    with wave.open(str(tmp_path / "stereo.wav"), 'wb') as f:
+        f.setnchannels(2)
+        f.setsampwidth(3)
+        f.setframerate(44100)
+        # (the lower three bytes of each little-endian 32-bit sample)
+        f.writeframes(stereo.astype('<i4').view('u1').reshape(-1, 4)[:, :3].tobytes())
+    whole = audio.to_int16(audio.resample(audio.mix(stereo / 256.0), 44100, 16000))
+    monkeypatch.setattr(audio, "BLOCK", 1000)
+    assert np.abs(audio.load(str(tmp_path / "stereo.wav"), 16000).astype(int) - whole).max() <= 1
+    both = audio.load(str(tmp_path / "stereo.wav"), 44100, mono=False)
+    assert both.shape == (44100, 2)
+    assert np.abs(both.astype(int) - audio.to_int16(stereo / 256.0)).max() <= 1
+
+
+@pytest.mark.skipif(shutil.which("sox") is None, reason="SoX is not installed")
+def test_load_matches_sox(tmp_path):
+    t = np.arange(44100 * 2) / 44100
+    signal = sum(3000 * np.sin(2 * np.pi * f * t + f) for f in (220, 1300, 4100, 6500))
+    write_wav(tmp_path / "in.wav", np.column_stack([signal, 0.5 * signal]), 44100)
+    subprocess.run(["sox", str(tmp_path / "in.wav"), "-D", "-c", "1", "-r", "16000",
+                    str(tmp_path / "sox.wav")], check=True)
+    (expected, rate) = audio.read(str(tmp_path / "sox.wav"))
+    samples = audio.load(str(tmp_path / "in.wav"), 16000)
+    assert rate == 16000 and len(samples) == len(expected)
+    difference = samples[500:-500] - expected[500:-500, 0].astype(float)
+    assert np.sqrt(np.mean(difference ** 2)) < 0.01 * np.sqrt(np.mean(samples[500:-500] ** 2.0))
+
+
+def test_load_fast_path(tmp_path):
+    samples = np.arange(-500, 500, dtype='<i2')
+    write_wav(tmp_path / "mono.wav", samples, 16000)
+    assert np.array_equal(audio.load(str(tmp_path / "mono.wav"), 16000), samples)
+
+
+def test_load_mixes_channels(tmp_path):
+    stereo = np.column_stack([np.full(1000, 100 << 16), np.full(1000, 300 << 16)])
+    write_wav(tmp_path / "stereo.wav", stereo, 16000, sampwidth=4)
+    mono = audio.load(str(tmp_path / "stereo.wav"), 16000)
+    assert mono.dtype == np.int16
+    # 32-bit samples are scaled down to 16 bits
+    assert np.array_equal(mono, np.full(1000, 200))
+
+
+def test_convert_and_extract(tmp_path):
+    x = 10000 * np.sin(2 * np.pi * 440 * np.arange(44100) / 44100)
+    write_wav(tmp_path / "in.wav", x, 44100)
+    assert audio.convert(str(tmp_path / "in.wav"), str(tmp_path / "out.wav"), 16000) == 16000
+    with wave.open(str(tmp_path / "out.wav")) as f:
+        assert (f.getframerate(), f.getnchannels(), f.getsampwidth(), f.getnframes()) == (16000, 1, 2, 16000)
+
+    audio.extract(str(tmp_path / "out.wav"), str(tmp_path / "part.wav"), 0.25, 0.5)
+    (part, rate) = audio.read(str(tmp_path / "part.wav"))
+    (full, _) = audio.read(str(tmp_path / "out.wav"))
+    assert rate == 16000
+    assert np.array_equal(part, full[4000:8000])
+
+
+def test_pauses():
+    rng = np.random.default_rng(0)
+    loud = lambda seconds: rng.normal(0, 3000, int(seconds * 16000))
+    quiet = lambda seconds: rng.normal(0, 30, int(seconds * 16000))
+    samples = np.concatenate([loud(1.0), quiet(0.3), loud(1.0), quiet(0.1), loud(1.0)])
+    # the short gap is not a pause
+    assert audio.pauses(samples, 16000).tolist() == [[1.0, 1.3]]
+    assert audio.pauses(samples, 16000, min_pause=0.05).tolist() == [[1.0, 1.3], [2.3, 2.4]]
@@ -65,3 +65,79 @@ def test_add_dictionary_entries(tmp_path):
     dict_obj.add_dictionary_entries(old_word_file, path=d)
 
     assert old_word.replace("\t", "  ") in added_entries_file.read_text()
+
+def test_write_dict_subset(tmp_path):
+    p = tmp_path / "cmu_dictionary.txt"
+    p.write_text(CMU_EXCERPT)
+    dict_obj = cmudictionary.CMU_Dictionary(p, **KWARGS)
+
+    full = tmp_path / "full.txt"
+    dict_obj.write_dict(full)
+    # the empty first line of the excerpt is read as an empty entry
+    assert full.read_text() == "  " + CMU_EXCERPT
+
+    subset = tmp_path / "subset.txt"
+    dict_obj.write_dict(subset, words={"TESTERS", "TEST", "NOT_IN_DICT", "sp"})
+    assert subset.read_text() == (
+        "TEST  T EH1 S T \n"
+        "TESTERS  T EH1 S T ER0 Z \n"
+        "TESTERS  T EH1 S T AH0 Z \n")
+
+def test_dictionary_snapshot(tmp_path):
+    p = tmp_path / "cmu_dictionary.txt"
+    p.write_text(CMU_EXCERPT)
+    parsed = cmudictionary.CMU_Dictionary(p, **KWARGS).cmu_dict
+    assert (tmp_path / "cmu_dictionary.txt.snapshot").exists()
+
+    compiled = cmudictionary.CMU_Dictionary(p, **KWARGS).cmu_dict
+    assert isinstance(compiled, cmudictionary.CompiledDictionary)
+    assert len(compiled) == len(parsed)
+    assert sorted(compiled) == sorted(parsed)
+    assert all(compiled[w] == parsed[w] for w in parsed)
+    assert "NOT_IN_DICT" not in compiled
+
+    # lookups return new lists, which are changed by assigning them back
+    prons = compiled["TEST"]
+    prons.append(["T", "EH1", "S"])
+    assert compiled["TEST"] == [["T", "EH1", "S", "T"]]
+    compiled["TEST"] = prons
+    compiled["LINGUISTICS"] = [["L", "IH0", "NG"]]
+    del compiled["TESTA"]
+    assert compiled["TEST"] == [["T", "EH1", "S", "T"], ["T", "EH1", "S"]]
+    assert "LINGUISTICS" in compiled and "TESTA" not in compiled
+    assert len(compiled) == len(parsed)
+    del compiled["LINGUISTICS"]
+    compiled["TESTA"] = [["T", "EH1", "S", "T", "AH0"]]
+    assert len(compiled) == len(parsed)
+    assert sorted(compiled) == sorted(parsed)
+
+    # a changed dictionary file makes the snapshot out of date
+    p.write_text(CMU_EXCERPT + "TESTING  T EH1 S T IH0 NG \n")
+    assert "TESTING" in cmudictionary.CMU_Dictionary(p, **KWARGS).cmu_dict
+    assert "TESTING" in cmudictionary.CMU_Dictionary(p, **KWARGS).cmu_dict
+
+def test_compiled_dictionary_interns_phones(tmp_path):
+    p = tmp_path / "cmu_dictionary.txt"
+    p.write_text(CMU_EXCERPT)
+    entries = {"A": [["AH0"], ["EY1"]], "AA": [["EY2", "EY1"]], "B": [[]]}
+    data = cmudictionary.CompiledDictionary.compile(p, entries)
+    # one byte per phone and per pronunciation boundary
+    assert data.endswith(b"A" + b"AA" + b"B" + b"\x01\x00\x02" + b"\x03\x02")
+    compiled = cmudictionary.CompiledDictionary(data)
+    assert dict(compiled.items()) == entries
+
+    # (as read on a big-endian host)
+    with pytest.MonkeyPatch.context() as m:
+        m.setattr(cmudictionary.CompiledDictionary, "NATIVE_OFFSETS", False)
+        assert dict(cmudictionary.CompiledDictionary(data).items()) == entries
+
+    # (with lookups dropped from the cache)
+    with pytest.MonkeyPatch.context() as m:
+        m.setattr(cmudictionary.CompiledDictionary, "CACHE_SIZE", 2)
+        compiled = cmudictionary.CompiledDictionary(data)
+        assert [compiled[w] for w in ["A", "AA", "B", "A"]] == [
+            entries["A"], entries["AA"], entries["B"], entries["A"]]
+
+    too_many = {"W%d" % i: [["P%d" % i]] for i in range(300)}
+    with pytest.raises(ValueError):
+        cmudictionary.CompiledDictionary.compile(p, too_many)
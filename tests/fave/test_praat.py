@@ -0,0 +1,288 @@
+import os
+import pytest
+from fave import praat
+
+DATA = os.path.join(os.path.dirname(__file__), "data")
+
+SHORT_TEXTGRID = """File type = "ooTextFile short"
+"TextGrid"
+
+0.0
+3.0
+<exists>
+3
+"IntervalTier"
+"A - phone"
+0.0
+3.0
+3
+0.0
+1.0
+"sp"
+1.0
+2.5
+"T"
+2.5
+3.0
+"AE1"
+"IntervalTier"
+"A - word"
+0.0
+3.0
+2
+0.0
+1.0
+"sp"
+1.0
+3.0
+"TAT"
+"TextTier"
+"events"
+0.0
+3.0
+2
+0.5
+"click"
+2.0
+"cough"
+"""
+
+
+def make_textgrid():
+    tg = praat.TextGrid()
+    phone = praat.IntervalTier("A - phone", 0, 3.0)
+    for xmin, xmax, mark in [(0.0, 1.0, "sp"), (1.0, 2.5, "T"), (2.5, 3.0, "AE1")]:
+        phone.append(praat.Interval(xmin, xmax, mark))
+    word = praat.IntervalTier("A - word", 0, 3.0)
+    for xmin, xmax, mark in [(0.0, 1.0, "sp"), (1.0, 3.0, "TAT")]:
+        word.append(praat.Interval(xmin, xmax, mark))
+    events = praat.PointTier("events", 0, 3.0)
+    events.append(praat.Point(0.5, "click"))
+    events.append(praat.Point(2.0, "cough"))
+    tg.append(phone)
+    tg.append(word)
+    tg.append(events)
+    return tg
+
+
+def contents(tg):
+    out = []
+    for tier in tg:
+        if isinstance(tier, praat.IntervalTier):
+            entries = [(i.xmin(), i.xmax(), i.mark()) for i in tier]
+        else:
+            entries = [(p.time(), p.mark()) for p in tier]
+        out.append((tier.name(), tier.xmin(), tier.xmax(), len(tier), entries))
+    return out
+
+
+@pytest.fixture(params=["long", "short"])
+def textgrid_file(request, tmp_path):
+    path = tmp_path / "test.TextGrid"
+    if request.param == "long":
+        make_textgrid().write(str(path))
+    else:
+        path.write_text(SHORT_TEXTGRID)
+    return path
+
+
+def test_read(textgrid_file):
+    tg = praat.TextGrid()
+    tg.read(textgrid_file)
+    assert len(tg) == 3
+    assert contents(tg) == contents(make_textgrid())
+
+
+def test_lazy_read_defers_tiers(textgrid_file):
+    tg = praat.TextGrid()
+    tg.read(textgrid_file, lazy=True)
+    assert len(tg) == 3
+    assert [t.name() for t in tg] == ["A - phone", "A - word", "events"]
+    assert [len(t) for t in tg] == [3, 2, 2]
+    assert not any(t.loaded() for t in tg)
+
+    assert tg[1][1].mark() == "TAT"
+    assert tg[1].loaded()
+    assert not tg[0].loaded()
+    assert not tg[2].loaded()
+
+    assert contents(tg) == contents(make_textgrid())
+
+
+def test_lazy_read_selected_tiers(textgrid_file):
+    tg = praat.TextGrid()
+    tg.read(textgrid_file, tiers=["A - word", 2], lazy=True)
+    assert [t.loaded() for t in tg] == [False, True, True]
+    assert contents(tg) == contents(make_textgrid())
+
+
+def test_binary_textgrid_round_trip(textgrid_file, tmp_path):
+    tg = praat.TextGrid()
+    tg.read(textgrid_file)
+    tg[1][1].change_text("TÄT")  # non-ASCII labels are stored as UTF-16
+    binary_file = tmp_path / "binary.TextGrid"
+    tg.write(str(binary_file), format="binary")
+    assert binary_file.read_bytes().startswith(b"ooBinaryFile\x08TextGrid")
+
+    tg2 = praat.TextGrid()
+    tg2.read(binary_file)
+    assert contents(tg2) == contents(tg)
+
+
+
+def test_binary_textgrid_written_by_praat(tmp_path):
+    tg = praat.TextGrid()
+    tg.read(os.path.join(DATA, "words.TextGrid"))
+    assert [(i.xmin(), i.xmax(), i.mark()) for i in tg[0]] == [
+        (0.0, 0.25, ""), (0.25, 1.125, "CAFÉ"), (1.125, 1.5, "sp")]
+    assert [(p.time(), p.mark()) for p in tg[1]] == [(0.5, "click")]
+
+    tg.write(str(tmp_path / "copy.TextGrid"), format="binary")
+    with open(os.path.join(DATA, "words.TextGrid"), "rb") as f:
+        assert (tmp_path / "copy.TextGrid").read_bytes() == f.read()
+
+
+FORMANT_SHORT = """File type = "ooTextFile"
+Object class = "Formant 2"
+
+0
+0.05
+3
+0.01
+0.0125
+5
+0.002
+2
+712.5
+80.25
+1204.0
+120.5
+0.003
+2
+720.0
+85.0
+1190.5
+110.0
+0.001
+{n}
+730.0
+90.0
+1180.0
+100.0
+{extra}"""
+
+
+@pytest.mark.parametrize("n, extra", [(2, ""), (3, "2500.0\n300.0\n")])
+def test_formant_text_round_trip(tmp_path, n, extra):
+    text_file = tmp_path / "vowel.Formant"
+    text_file.write_text(FORMANT_SHORT.format(n=n, extra=extra))
+    fmt = praat.Formant()
+    fmt.read(text_file)
+    assert fmt.formants()[2][:2] == [730.0, 1180.0]
+    assert len(fmt.formants()[2]) == n
+
+    fmt.write(tmp_path / "copy.Formant")
+    fmt3 = praat.Formant()
+    fmt3.read(tmp_path / "copy.Formant")
+    assert fmt3.formants() == fmt.formants()
+
+
+def test_binary_formant_written_by_praat(tmp_path):
+    # the same Formant, saved by Praat as a binary and as a short text file
+    binary = praat.Formant()
+    binary.read(os.path.join(DATA, "vowel.Formant"))
+    text = praat.Formant()
+    text.read(os.path.join(DATA, "vowel_short.Formant"))
+    assert binary.n() == text.n() == 4
+    assert binary.formants()[0][:2] == pytest.approx([700.83, 1299.03], abs=0.01)
+    for attr in ["n", "xmin", "xmax", "times", "intensities", "formants", "bandwidths"]:
+        assert getattr(binary, attr)() == getattr(text, attr)()
+
+    # and written as Praat writes it
+    binary.write(tmp_path / "copy.Formant", format="binary")
+    with open(os.path.join(DATA, "vowel.Formant"), "rb") as f:
+        assert (tmp_path / "copy.Formant").read_bytes() == f.read()
+
+
+INTENSITY_SHORT = """File type = "ooTextFile"
+Object class = "Intensity 2"
+
+0
+0.004
+4
+0.001
+0.0005
+1
+1
+1
+1
+1
+61.5
+62.25
+60.0
+58.125
+"""
+
+
+def test_binary_intensity_round_trip(tmp_path):
+    text_file = tmp_path / "vowel.Intensity"
+    text_file.write_text(INTENSITY_SHORT)
+    intensity = praat.Intensity()
+    intensity.read(text_file)
+    assert intensity.intensities() == [61.5, 62.25, 60.0, 58.125]
+
+    binary_file = tmp_path / "binary.Intensity"
+    intensity.write(binary_file, format="binary")
+    intensity2 = praat.Intensity()
+    intensity2.read(binary_file)
+    assert intensity2.intensities() == intensity.intensities()
+    assert intensity2.times() == intensity.times()
+    assert intensity2.xmax() == intensity.xmax()
+
+
+def test_short_write_round_trip(tmp_path):
+    path = tmp_path / "short.TextGrid"
+    make_textgrid().write(str(path), format="short", precision=3)
+    assert path.read_text().splitlines()[3:8] == ["0.000", "3.000", "<exists>", "3", '"IntervalTier"']
+    tg = praat.TextGrid()
+    tg.read(path)
+    assert contents(tg) == contents(make_textgrid())
+
+
+def test_extend_and_tidyup():
+    tier = praat.IntervalTier("A - word", 0, 0)
+    for xmin, xmax, mark in [(4.0, 5.0, "C"), (1.0, 2.0, "A"), (2.0, 3.0, "B"), (4.5, 6.0, "D")]:
+        tier.append(praat.Interval(xmin, xmax, mark))
+    tier.extend(0, 8.0)
+    overlaps = tier.tidyup()
+    assert [(i.xmin(), i.xmax(), i.mark()) for i in tier] == [
+        (0, 1.0, "sp"), (1.0, 2.0, "A"), (2.0, 3.0, "B"), (3.0, 4.0, "sp"),
+        (4.0, 5.0, "C"), (4.5, 6.0, "D"), (6.0, 8.0, "sp")]
+    assert len(tier) == 7
+    assert [(a.mark(), b.mark(), name) for (a, b, name) in overlaps] == [("C", "D", "A - word")]
+
+
+def test_tier_view():
+    tier = make_textgrid()[0]
+    view = tier.view(10.0)
+    assert (view.name(), view.xmin(), view.xmax(), len(view)) == ("A - phone", 10.0, 13.0, 3)
+    assert [(i.xmin(), i.xmax(), i.mark()) for i in view] == [
+        (10.0, 11.0, "sp"), (11.0, 12.5, "T"), (12.5, 13.0, "AE1")]
+    assert tier[0].xmin() == 0.0  # the tier itself is not shifted
+
+    cropped = tier.view(xmin=1.5, xmax=2.75).shift(1.0)
+    assert (cropped.xmin(), cropped.xmax(), len(cropped)) == (2.5, 3.75, 2)
+    assert [(i.xmin(), i.xmax(), i.mark()) for i in cropped.tier()] == [
+        (2.5, 3.5, "T"), (3.5, 3.75, "AE1")]
+
+
+def test_merge():
+    main = praat.TextGrid()
+    for offset in [0, 5.0]:
+        chunk = make_textgrid()
+        main.merge([tier.view(offset) for tier in list(chunk)[:2]], "B - ")
+    assert [t.name() for t in main] == ["B - A - phone", "B - A - word"]
+    assert [len(t) for t in main] == [6, 4]
+    assert [(i.xmin(), i.mark()) for i in main[1]] == [
+        (0.0, "sp"), (1.0, "TAT"), (5.0, "sp"), (6.0, "TAT")]
+    assert (main.xmin(), main.xmax()) == (0, 8.0)